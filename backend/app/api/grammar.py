@@ -1,13 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 import logging
+from typing import List, Optional
 
-from app.models.grammar import GrammarRequest, GrammarResponse
+from app.models.grammar import GrammarRequest, GrammarResponse, GrammarBatchRequest, GrammarBatchItem, GrammarBatchResponse
+from app.config import settings
+from app.dependencies import check_batch_rate_limit
+from app.services.concurrency_limiter import UpstreamOverloadedError
 from app.services.grammar import grammar_service
+from app.utils.batch import check_batch_size, fan_out
+from app.utils.responses import EncodedJSONResponse
+from app.utils.streaming import STREAM_RESPONSES, stream_batch, stream_items
+from app.utils.timing import TimedRoute
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Batches are charged one rate limit token per item
+charge_batch = Depends(check_batch_rate_limit(GrammarBatchRequest))
 
 
 @router.post("/grammar", response_model=GrammarResponse)
@@ -16,12 +27,72 @@ async def create_grammar_lesson(request: GrammarRequest):
     Generate grammar lessons for a specific language learning context
     """
     try:
-        return await grammar_service.generate_grammar_lesson(
+        return EncodedJSONResponse(await grammar_service.generate_grammar_lesson_json(
             request.sourceLanguage,
             request.targetLanguage,
             request.purpose
-        )
+        ))
+    except UpstreamOverloadedError:
+        raise
     except Exception as e:
         logger.error(f"Error processing grammar lesson request: {str(e)}")
         raise HTTPException(
             status_code=500, detail="Failed to generate grammar lesson")
+
+
+@router.post("/grammar/stream", responses=STREAM_RESPONSES)
+async def create_grammar_lesson_stream(request: GrammarRequest, http_request: Request):
+    """
+    Stream grammar topics as they are generated
+
+    Emits NDJSON by default, or server-sent events when the client
+    accepts text/event-stream.
+    """
+    return stream_items(
+        grammar_service.stream_grammar_lesson(
+            request.sourceLanguage,
+            request.targetLanguage,
+            request.purpose
+        ),
+        http_request
+    )
+
+
+def _fan_out_grammars(request: GrammarBatchRequest):
+    """Generate the lessons of a batch with bounded concurrency"""
+    check_batch_size(request.items)
+    return fan_out(
+        request.items,
+        lambda item: grammar_service.generate_grammar_lesson(
+            item.sourceLanguage,
+            item.targetLanguage,
+            item.purpose
+        ),
+        settings.BATCH_MAX_CONCURRENCY,
+        "Failed to generate grammar lesson"
+    )
+
+
+@router.post("/grammar/batch", response_model=GrammarBatchResponse, dependencies=[charge_batch])
+async def create_grammar_batch(request: GrammarBatchRequest):
+    """
+    Generate grammar lessons for several contexts in one request
+
+    Items are generated concurrently, reusing cached and in-flight lessons;
+    a failed item is reported in its result without failing the batch.
+    """
+    items: List[Optional[GrammarBatchItem]] = [None] * len(request.items)
+    async for index, result, error in _fan_out_grammars(request):
+        items[index] = GrammarBatchItem(index=index, result=result, error=error)
+    return GrammarBatchResponse(items=items)
+
+
+@router.post("/grammar/batch/stream", responses=STREAM_RESPONSES, dependencies=[charge_batch])
+async def create_grammar_batch_stream(request: GrammarBatchRequest, http_request: Request):
+    """
+    Stream grammar lessons for several contexts as each one finishes
+
+    Emits NDJSON by default, or server-sent events when the client
+    accepts text/event-stream.
+    """
+    return stream_batch(_fan_out_grammars(request), http_request)
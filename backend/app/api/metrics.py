@@ -0,0 +1,100 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+import asyncio
+import logging
+
+from app.config import settings
+from app.dependencies import rate_limiter
+from app.services.cache import response_cache
+from app.services.gemini_service import gemini_service
+from app.services.image_cache import image_result_cache
+from app.services.image_preprocessor import image_preprocessor
+from app.services.metrics import metrics
+from app.services.single_flight import single_flight
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _collect_upstream():
+    """Bulkhead, circuit, retry and hedging state of the Gemini client"""
+    stats = gemini_service.stats()
+    bulkheads = [name for name in gemini_service.limiters]
+    yield ("gemini_in_flight", "gauge", "Gemini calls in flight, by bulkhead", ("bulkhead",),
+           {(name,): stats[name]["inFlight"] for name in bulkheads})
+    yield ("gemini_queue_depth", "gauge", "Gemini calls waiting for a slot, by bulkhead", ("bulkhead",),
+           {(name,): stats[name]["queueDepth"] for name in bulkheads})
+    yield ("gemini_concurrency_limit", "gauge", "Current adaptive concurrency limit, by bulkhead",
+           ("bulkhead",), {(name,): stats[name]["limit"] for name in bulkheads})
+    yield ("gemini_shed_total", "counter", "Gemini calls shed instead of queued, by bulkhead and reason",
+           ("bulkhead", "reason"),
+           {**{(name, "queue_full"): stats[name]["shedQueueFull"] for name in bulkheads},
+            **{(name, "timeout"): stats[name]["shedTimeout"] for name in bulkheads}})
+    yield ("gemini_circuit_open", "gauge", "Whether the circuit is open (1) or half open (0.5)",
+           ("bulkhead",),
+           {(name,): {"open": 1, "half_open": 0.5}.get(stats[name]["circuit"]["state"], 0)
+            for name in bulkheads})
+    retries = stats["retries"]
+    yield ("gemini_calls_total", "counter", "Gemini calls made, not counting retries", (),
+           {(): retries["calls"]})
+    yield ("gemini_retries_total", "counter", "Gemini calls retried, by whether the budget allowed it",
+           ("result",), {("retried",): retries["retries"], ("denied",): retries["denied"]})
+    yield ("gemini_hedges_total", "counter", "Hedge calls fired and won, by feature", ("feature", "result"),
+           {**{(feature, "fired"): hedging["hedged"] for feature, hedging in stats["hedging"].items()},
+            **{(feature, "won"): hedging["hedgeWins"] for feature, hedging in stats["hedging"].items()}})
+    if gemini_service.router is not None:
+        yield ("gemini_model_routing_total", "counter", "Model routing decisions, by feature, model and reason",
+               ("feature", "model", "reason"), dict(gemini_service.router.decisions))
+
+
+def _collect_caching():
+    """Cache hits, coalesced calls and rate limiting"""
+    cache = response_cache.stats()
+    yield ("response_cache_lookups_total", "counter", "Response cache lookups, by result", ("result",),
+           {("hit",): cache["hits"], ("stale",): cache["staleHits"], ("disk",): cache["diskHits"],
+            ("store",): cache["storeHits"], ("miss",): cache["misses"]})
+    yield ("response_cache_memory_bytes", "gauge", "Memory used by the response cache", (),
+           {(): cache["memoryBytes"]})
+    image_cache = image_result_cache.stats()
+    yield ("image_cache_lookups_total", "counter", "Word Cam result cache lookups, by result", ("result",),
+           {("exact",): image_cache["exactHits"], ("perceptual",): image_cache["perceptualHits"],
+            ("miss",): image_cache["misses"]})
+    coalescing = single_flight.stats()
+    yield ("coalesced_requests_total", "counter", "Requests that shared an in-flight upstream call", (),
+           {(): coalescing["coalesced"]})
+    limits = rate_limiter.stats()
+    yield ("rate_limit_checks_total", "counter", "Rate limit checks, by result", ("result",),
+           {("allowed",): limits["allowed"], ("rejected",): limits["rejected"]})
+
+
+def _collect_images():
+    """Image preprocessing byte counts"""
+    images = image_preprocessor.stats()
+    yield ("image_preprocess_bytes_total", "counter", "Bytes into and out of image downscaling",
+           ("direction",), {("in",): images["bytesIn"], ("out",): images["bytesOut"]})
+
+
+metrics.add_collector(_collect_upstream)
+metrics.add_collector(_collect_caching)
+metrics.add_collector(_collect_images)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Expose metrics in the Prometheus text format
+
+    With METRICS_DIR set, the metrics of all workers are merged.
+    """
+    snapshot = metrics.snapshot()
+    if settings.METRICS_DIR:
+        # Workers write every METRICS_FLUSH_SECONDS; older files are from workers that are gone
+        others = await asyncio.to_thread(
+            metrics.read_snapshots, settings.METRICS_DIR, 3 * settings.METRICS_FLUSH_SECONDS)
+        snapshot = metrics.merge([snapshot] + others)
+    return PlainTextResponse(metrics.render(snapshot), media_type=CONTENT_TYPE)
@@ -1,26 +1,51 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 import logging
 
 from app.models.slang_hang import SlangHangRequest, SlangHangResponse
+from app.services.concurrency_limiter import UpstreamOverloadedError
 from app.services.slang_hang import slang_hang_service
+from app.dependencies import get_client_id
+from app.utils.responses import EncodedJSONResponse
+from app.utils.streaming import STREAM_RESPONSES, stream_items
+from app.utils.timing import TimedRoute
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 @router.post("/conversation", response_model=SlangHangResponse)
-async def create_slang_conversation(request: SlangHangRequest):
+async def create_slang_conversation(request: SlangHangRequest, client_id: str = Depends(get_client_id)):
     """
     Generate a slang-based conversation in the target language
     """
     try:
-        return await slang_hang_service.generate_slang_conversation(
+        return EncodedJSONResponse(await slang_hang_service.generate_slang_conversation_json(
             request.sourceLanguage,
-            request.targetLanguage
-        )
+            request.targetLanguage,
+            client_id
+        ))
+    except UpstreamOverloadedError:
+        raise
     except Exception as e:
         logger.error(f"Error processing slang conversation request: {str(e)}")
         raise HTTPException(
             status_code=500, detail="Failed to generate slang conversation")
+
+
+@router.post("/conversation/stream", responses=STREAM_RESPONSES)
+async def create_slang_conversation_stream(request: SlangHangRequest, http_request: Request):
+    """
+    Stream a slang conversation line by line as it is generated
+
+    Emits NDJSON by default, or server-sent events when the client
+    accepts text/event-stream.
+    """
+    return stream_items(
+        slang_hang_service.stream_slang_conversation(
+            request.sourceLanguage,
+            request.targetLanguage
+        ),
+        http_request
+    )
@@ -0,0 +1,118 @@
+from fastapi import APIRouter
+import logging
+
+from app.dependencies import rate_limiter
+from app.services.cache import response_cache
+from app.services.gemini_service import gemini_service
+from app.services.image_cache import image_result_cache
+from app.services.image_preprocessor import image_preprocessor
+from app.services.image_store import image_store
+from app.services.purpose_index import purpose_index
+from app.services.single_flight import single_flight
+from app.services.slang_hang import conversation_pool
+from app.services.tiny_lesson import tiny_lesson_batcher
+from app.services.word_cam import descriptor_prefetcher
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/stats/cache")
+async def get_cache_stats():
+    """
+    Report response cache hit, miss and eviction counters
+    """
+    return response_cache.stats()
+
+
+@router.get("/stats/coalescing")
+async def get_coalescing_stats():
+    """
+    Report how many requests shared an in-flight upstream call
+    """
+    return single_flight.stats()
+
+
+@router.get("/stats/purpose-index")
+async def get_purpose_index_stats():
+    """
+    Report near-duplicate purpose matching counters
+    """
+    return purpose_index.stats()
+
+
+@router.get("/stats/conversation-pool")
+async def get_conversation_pool_stats():
+    """
+    Report slang conversation pool sizes and demand per language pair
+    """
+    return conversation_pool.stats()
+
+
+@router.get("/stats/image-cache")
+async def get_image_cache_stats():
+    """
+    Report Word Cam result cache hit rates and memory use
+    """
+    return image_result_cache.stats()
+
+
+@router.get("/stats/image-store")
+async def get_image_store_stats():
+    """
+    Report uploaded image store hits, evictions and memory use
+    """
+    return image_store.stats()
+
+
+@router.get("/stats/image-preprocessing")
+async def get_image_preprocessing_stats():
+    """
+    Report images downscaled before the vision call and bytes saved
+    """
+    return image_preprocessor.stats()
+
+
+@router.get("/stats/descriptor-prefetch")
+async def get_descriptor_prefetch_stats():
+    """
+    Report speculative descriptor generation hits and load shedding
+    """
+    return descriptor_prefetcher.stats()
+
+
+@router.get("/stats/micro-batching")
+async def get_micro_batching_stats():
+    """
+    Report how many /terms generations were merged into shared upstream calls
+    """
+    return tiny_lesson_batcher.stats()
+
+
+@router.get("/stats/rate-limit")
+async def get_rate_limit_stats():
+    """
+    Report allowed and rejected requests and tracked clients
+    """
+    return rate_limiter.stats()
+
+
+@router.get("/stats/upstream")
+async def get_upstream_stats():
+    """
+    Report limits, shed calls and circuit state per upstream bulkhead, and
+    retry and hedging counters
+    """
+    return gemini_service.stats()
+
+
+@router.get("/stats/model-routing")
+async def get_model_routing_stats():
+    """
+    Report model routing decisions and recent latency and errors per model
+    """
+    if gemini_service.router is None:
+        return {"enabled": False}
+    return gemini_service.router.stats()
@@ -1,13 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 import logging
+from typing import List, Optional
 
-from app.models.tiny_lesson import TinyLessonRequest, TinyLessonResponse
+from app.models.tiny_lesson import TinyLessonRequest, TinyLessonResponse, TinyLessonBatchRequest, TinyLessonBatchItem, TinyLessonBatchResponse
+from app.config import settings
+from app.dependencies import check_batch_rate_limit
+from app.services.concurrency_limiter import UpstreamOverloadedError
 from app.services.tiny_lesson import tiny_lesson_service
+from app.utils.batch import check_batch_size, fan_out
+from app.utils.responses import EncodedJSONResponse
+from app.utils.streaming import STREAM_RESPONSES, stream_batch, stream_items
+from app.utils.timing import TimedRoute
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+# Batches are charged one rate limit token per item
+charge_batch = Depends(check_batch_rate_limit(TinyLessonBatchRequest))
 
 
 @router.post("/terms", response_model=TinyLessonResponse)
@@ -16,12 +27,72 @@ async def create_tiny_lesson(request: TinyLessonRequest):
     Generate vocabulary and phrases for a specific language learning context
     """
     try:
-        return await tiny_lesson_service.generate_tiny_lesson(
+        return EncodedJSONResponse(await tiny_lesson_service.generate_tiny_lesson_json(
             request.sourceLanguage,
             request.targetLanguage,
             request.purpose
-        )
+        ))
+    except UpstreamOverloadedError:
+        raise
     except Exception as e:
         logger.error(f"Error processing tiny lesson request: {str(e)}")
         raise HTTPException(
             status_code=500, detail="Failed to generate tiny lesson")
+
+
+@router.post("/terms/stream", responses=STREAM_RESPONSES)
+async def create_tiny_lesson_stream(request: TinyLessonRequest, http_request: Request):
+    """
+    Stream vocabulary and phrases as they are generated
+
+    Emits NDJSON by default, or server-sent events when the client
+    accepts text/event-stream.
+    """
+    return stream_items(
+        tiny_lesson_service.stream_tiny_lesson(
+            request.sourceLanguage,
+            request.targetLanguage,
+            request.purpose
+        ),
+        http_request
+    )
+
+
+def _fan_out_tiny_lessons(request: TinyLessonBatchRequest):
+    """Generate the lessons of a batch with bounded concurrency"""
+    check_batch_size(request.items)
+    return fan_out(
+        request.items,
+        lambda item: tiny_lesson_service.generate_tiny_lesson(
+            item.sourceLanguage,
+            item.targetLanguage,
+            item.purpose
+        ),
+        settings.BATCH_MAX_CONCURRENCY,
+        "Failed to generate tiny lesson"
+    )
+
+
+@router.post("/terms/batch", response_model=TinyLessonBatchResponse, dependencies=[charge_batch])
+async def create_tiny_lesson_batch(request: TinyLessonBatchRequest):
+    """
+    Generate tiny lessons for several contexts in one request
+
+    Items are generated concurrently, reusing cached and in-flight lessons;
+    a failed item is reported in its result without failing the batch.
+    """
+    items: List[Optional[TinyLessonBatchItem]] = [None] * len(request.items)
+    async for index, result, error in _fan_out_tiny_lessons(request):
+        items[index] = TinyLessonBatchItem(index=index, result=result, error=error)
+    return TinyLessonBatchResponse(items=items)
+
+
+@router.post("/terms/batch/stream", responses=STREAM_RESPONSES, dependencies=[charge_batch])
+async def create_tiny_lesson_batch_stream(request: TinyLessonBatchRequest, http_request: Request):
+    """
+    Stream tiny lessons for several contexts as each one finishes
+
+    Emits NDJSON by default, or server-sent events when the client
+    accepts text/event-stream.
+    """
+    return stream_batch(_fan_out_tiny_lessons(request), http_request)
@@ -1,20 +1,120 @@
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
 import logging
-from typing import Optional
+from typing import Optional, Tuple
 
 from app.models.word_cam import (
+    Image,
+    ImageUploadRequest,
+    ImageUploadResponse,
     ObjectDescriptorRequest,
     ObjectDescriptorResponse,
     DetectObjectsRequest,
     DetectObjectsResponse
 )
+from app.config import settings
+from app.services.concurrency_limiter import UpstreamOverloadedError
+from app.services.image_store import image_store
 from app.services.word_cam import word_cam_service
-from app.utils.image_utils import validate_image
+from app.utils.image_utils import (
+    SNIFF_BYTES,
+    admit_image_data,
+    admit_image_header,
+    decode_image_data,
+    validate_image
+)
+from app.utils.timing import TimedRoute, phase
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
+
+
+async def load_image(image: Image) -> Tuple[bytes, str]:
+    """
+    Resolve an inline or previously uploaded image
+
+    Returns:
+        Decoded image bytes and MIME type
+
+    Raises:
+        HTTPException: If the image is invalid or the ID is unknown or expired
+    """
+    if image.imageId is not None:
+        with phase("image_store"):
+            stored = await image_store.get(image.imageId)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Image not found or expired")
+        return stored.data, stored.mime_type
+
+    return decode_inline_image(image.inlineData.data, image.inlineData.mimeType)
+
+
+def decode_inline_image(image_data: str, mime_type: str) -> Tuple[bytes, str]:
+    """
+    Admit, decode and validate base64 image data
+
+    Oversized or non-image data is rejected from its length and header
+    before the full decode.
+
+    Returns:
+        Decoded image bytes and the sniffed MIME type
+    """
+    with phase("validate"):
+        admit_image_data(image_data, mime_type)
+        image_bytes = decode_image_data(image_data)
+        info = validate_image(image_bytes, mime_type)
+    return image_bytes, info.mime_type
+
+
+async def read_upload(image: UploadFile) -> Tuple[bytes, str]:
+    """
+    Read a multipart image upload
+
+    The declared size and the header are checked first, and at most one
+    byte past the size limit is read, so oversized or non-image uploads are
+    rejected without being loaded.
+
+    Returns:
+        Image bytes and the sniffed MIME type
+
+    Raises:
+        HTTPException: If the image is invalid
+    """
+    max_bytes = settings.MAX_IMAGE_SIZE_MB * 1024 * 1024
+    if image.size is not None and image.size > max_bytes:
+        logger.warning(f"Image too large: {image.size / (1024 * 1024):.2f} MB")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Image too large. Maximum size: {settings.MAX_IMAGE_SIZE_MB} MB"
+        )
+    with phase("validate"):
+        admit_image_header(await image.read(SNIFF_BYTES), image.content_type or "")
+        await image.seek(0)
+        image_bytes = await image.read(max_bytes + 1)
+        info = validate_image(image_bytes, image.content_type or "")
+    return image_bytes, info.mime_type
+
+
+@router.post("/images", response_model=ImageUploadResponse)
+async def upload_image(request: ImageUploadRequest):
+    """
+    Store an image once for use by ID in Word Cam requests
+    """
+    image_bytes, mime_type = decode_inline_image(
+        request.inlineData.data, request.inlineData.mimeType)
+    image_id = await image_store.put(image_bytes, mime_type)
+    return ImageUploadResponse(imageId=image_id, expiresInSeconds=int(image_store.ttl))
+
+
+@router.post("/images/upload", response_model=ImageUploadResponse)
+async def upload_image_file(image: UploadFile = File(..., description="Image file")):
+    """
+    Store a binary multipart image upload for use by ID in Word Cam requests
+    """
+    image_bytes, mime_type = await read_upload(image)
+    image_id = await image_store.put(image_bytes, mime_type)
+    return ImageUploadResponse(imageId=image_id, expiresInSeconds=int(image_store.ttl))
 
 
 @router.post("/object-descriptors", response_model=ObjectDescriptorResponse)
@@ -23,18 +123,45 @@ async def create_object_descriptors(request: ObjectDescriptorRequest):
     Generate descriptors for an object in an image
     """
     try:
-        # Validate the image
-        image_data = request.image.inlineData.data
-        mime_type = request.image.inlineData.mimeType
-        validate_image(image_data, mime_type)
+        image_bytes, mime_type = await load_image(request.image)
 
         return await word_cam_service.generate_object_descriptors(
             request.sourceLanguage,
             request.targetLanguage,
             request.object,
-            image_data,
+            image_bytes,
+            mime_type
+        )
+    except (HTTPException, UpstreamOverloadedError):
+        raise
+    except Exception as e:
+        logger.error(f"Error processing object descriptors request: {str(e)}")
+        raise HTTPException(
+            status_code=500, detail="Failed to generate object descriptors")
+
+
+@router.post("/object-descriptors/upload", response_model=ObjectDescriptorResponse)
+async def create_object_descriptors_upload(
+    sourceLanguage: str = Form(..., description="The source language of the user"),
+    targetLanguage: str = Form(..., description="The target language the user wants to learn"),
+    object: str = Form(..., description="The object to describe"),
+    image: UploadFile = File(..., description="Image containing the object")
+):
+    """
+    Generate descriptors for an object in a binary multipart image upload
+    """
+    try:
+        image_bytes, mime_type = await read_upload(image)
+
+        return await word_cam_service.generate_object_descriptors(
+            sourceLanguage,
+            targetLanguage,
+            object,
+            image_bytes,
             mime_type
         )
+    except (HTTPException, UpstreamOverloadedError):
+        raise
     except Exception as e:
         logger.error(f"Error processing object descriptors request: {str(e)}")
         raise HTTPException(
@@ -47,19 +174,47 @@ async def detect_objects(request: DetectObjectsRequest):
     Detect objects in an image and provide translations
     """
     try:
-        # Validate the image
-        image_data = request.image.inlineData.data
-        mime_type = request.image.inlineData.mimeType
-        validate_image(image_data, mime_type)
+        image_bytes, mime_type = await load_image(request.image)
 
         return await word_cam_service.detect_objects(
             request.sourceLanguage,
             request.targetLanguage,
-            image_data,
+            image_bytes,
             mime_type,
             request.imageDimensions.width,
             request.imageDimensions.height
         )
+    except (HTTPException, UpstreamOverloadedError):
+        raise
+    except Exception as e:
+        logger.error(f"Error processing detect objects request: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to detect objects")
+
+
+@router.post("/detect-objects/upload", response_model=DetectObjectsResponse)
+async def detect_objects_upload(
+    sourceLanguage: str = Form(..., description="The source language of the user"),
+    targetLanguage: str = Form(..., description="The target language the user wants to learn"),
+    width: int = Form(..., gt=0, description="Image width in pixels"),
+    height: int = Form(..., gt=0, description="Image height in pixels"),
+    image: UploadFile = File(..., description="Image to detect objects in")
+):
+    """
+    Detect objects in a binary multipart image upload and provide translations
+    """
+    try:
+        image_bytes, mime_type = await read_upload(image)
+
+        return await word_cam_service.detect_objects(
+            sourceLanguage,
+            targetLanguage,
+            image_bytes,
+            mime_type,
+            width,
+            height
+        )
+    except (HTTPException, UpstreamOverloadedError):
+        raise
     except Exception as e:
         logger.error(f"Error processing detect objects request: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to detect objects")
@@ -15,15 +15,144 @@ class Settings(BaseSettings):
     GEMINI_VISION_MODEL: str = "gemini-1.5-flash"
 
     # Performance Settings
-    MAX_ATTEMPTS: int = 3  # Maximum retries for API calls
+    MAX_ATTEMPTS: int = 3  # Attempts per API call, including the first
     TIMEOUT_SECONDS: int = 30  # Timeout for API calls
+    # For all attempts of a call together, 2 x TIMEOUT_SECONDS when 0, so a
+    # call can still be retried after an attempt that timed out
+    UPSTREAM_DEADLINE_SECONDS: float = 0
+    # Retries wait a random delay up to a cap doubling from base to max
+    RETRY_BASE_DELAY_SECONDS: float = 0.5
+    RETRY_MAX_DELAY_SECONDS: float = 8.0
+    RETRY_BUDGET_RATIO: float = 0.1  # Retries allowed per call, process-wide
+    RETRY_BUDGET_MAX_TOKENS: float = 10.0  # Retries that can be saved up
+    # Fail fast after this many consecutive transient failures, probing again later
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_SECONDS: float = 10.0
+    # Endpoints whose slow calls get a second, hedge call: any of tiny_lesson,
+    # grammar, slang_hang, detect_objects and object_descriptors
+    HEDGE_ENDPOINTS: list = []
+    HEDGE_PERCENTILE: float = 0.95  # Of recent latency, after which to hedge
+    HEDGE_BUDGET_RATIO: float = 0.05  # Hedges allowed per call
+    HEDGE_MODEL: str = ""  # For text hedge calls, the routed model when empty
+
+    # Model Routing Settings
+    # Route text requests to a faster model on a client hint, for some
+    # features, or while GEMINI_MODEL is slow, failing or saturated
+    MODEL_ROUTING_ENABLED: bool = True
+    MODEL_ROUTING_FAST_MODEL: str = ""  # GEMINI_VISION_MODEL when empty
+    MODEL_ROUTING_FAST_FEATURES: list = []  # e.g. ["slang_hang"]
+    MODEL_ROUTING_MAX_LATENCY_SECONDS: float = 10.0  # Recent median
+    MODEL_ROUTING_MAX_ERROR_RATE: float = 0.2
+    MODEL_ROUTING_MAX_QUEUE: int = 16  # Text calls waiting for a slot
+    # Share of requests still sent to a struggling primary to notice recovery
+    MODEL_ROUTING_PROBE_RATIO: float = 0.05
+    MAX_CONCURRENT_UPSTREAM_CALLS: int = 32  # Max Gemini calls in flight
+    # Of which vision calls, so image work can't starve text lessons
+    UPSTREAM_VISION_MAX_CONCURRENCY: int = 8
+    # Lower each limit while Gemini is slow or overloaded
+    UPSTREAM_ADAPTIVE_ENABLED: bool = True
+    UPSTREAM_MIN_CONCURRENCY: int = 2  # Per bulkhead
+    UPSTREAM_LATENCY_TOLERANCE: float = 2.0  # Recent vs healthy latency
+    # Calls waiting for a slot per bulkhead, and for how long before a 503
+    UPSTREAM_QUEUE_MAX: int = 64
+    UPSTREAM_QUEUE_MAX_WAIT_SECONDS: float = 5.0
+    # Use the SDK's async client; False falls back to a thread pool
+    GEMINI_USE_ASYNC_CLIENT: bool = True
+
+    # Response Cache Settings
+    CACHE_ENABLED: bool = True
+    CACHE_TTL_SECONDS: int = 24 * 60 * 60  # Responses served as fresh
+    # Window after the TTL in which stale responses are served and refreshed
+    CACHE_STALE_TTL_SECONDS: int = 7 * 24 * 60 * 60
+    CACHE_MAX_MEMORY_BYTES: int = 64 * 1024 * 1024  # In-process tier size
+    CACHE_SQLITE_PATH: str = ""  # On-disk tier, disabled when empty
+
+    # Pre-generated lessons served without calling Gemini, disabled when empty
+    LESSON_STORE_PATH: str = ""
+
+    # Slang Conversation Pool Settings
+    CONVERSATION_POOL_ENABLED: bool = False
+    CONVERSATION_POOL_MIN_SIZE: int = 2  # Per language pair
+    CONVERSATION_POOL_MAX_SIZE: int = 20  # Per language pair
+    CONVERSATION_POOL_MAX_SERVES: int = 5  # Clients served per conversation
+
+    # Merge concurrent /terms generations for a language pair into one call
+    MICRO_BATCH_ENABLED: bool = False
+    MICRO_BATCH_MAX_SIZE: int = 4  # Requests per merged call
+    MICRO_BATCH_MAX_WAIT_MS: int = 50  # Wait for more requests after the first
+
+    # Batch Lesson Settings
+    BATCH_MAX_ITEMS: int = 100  # Items accepted per batch request
+    BATCH_MAX_CONCURRENCY: int = 8  # Items of one batch generated at once
+
+    # Purpose Matching Settings
+    PURPOSE_MATCH_ENABLED: bool = True  # Reuse lessons for similar purposes
+    PURPOSE_MATCH_THRESHOLD: float = 0.8  # Minimum Jaccard similarity
+    PURPOSE_INDEX_MAX_ENTRIES: int = 100_000
 
     # Image Processing Settings
     MAX_IMAGE_SIZE_MB: int = 5  # Maximum image size in MB
+    MAX_IMAGE_PIXELS: int = 64_000_000  # Maximum width x height
+    # Larger request bodies are rejected before they are read; fits the
+    # base64 of a MAX_IMAGE_SIZE_MB image plus JSON
+    MAX_REQUEST_BODY_BYTES: int = 8 * 1024 * 1024
     SUPPORTED_IMAGE_TYPES: list = ["image/jpeg", "image/png", "image/webp"]
 
+    # Downscale and re-encode images before the vision call (needs Pillow)
+    IMAGE_PREPROCESS_ENABLED: bool = True
+    IMAGE_MAX_EDGE_PX: int = 1024  # Longest edge sent upstream
+    IMAGE_REENCODE_FORMAT: str = "JPEG"  # JPEG or WEBP
+    IMAGE_REENCODE_QUALITY: int = 85
+    IMAGE_PREPROCESS_WORKERS: int = 2  # Processes for image work
+
+    # Speculative descriptor generation for detected objects (opt-in)
+    DESCRIPTOR_PREFETCH_ENABLED: bool = False
+    DESCRIPTOR_PREFETCH_MAX_CONCURRENCY: int = 4
+    DESCRIPTOR_PREFETCH_TTL_SECONDS: int = 5 * 60
+    # Stop prefetching while this share of vision slots serves requests
+    DESCRIPTOR_PREFETCH_MAX_LOAD_RATIO: float = 0.5
+
+    # Word Cam Result Cache Settings
+    IMAGE_CACHE_ENABLED: bool = True
+    IMAGE_CACHE_TTL_SECONDS: int = 60 * 60
+    IMAGE_CACHE_MAX_MEMORY_BYTES: int = 16 * 1024 * 1024
+    # Match recompressed or resized copies by perceptual hash (needs Pillow);
+    # similar-looking images of different scenes can share a response
+    IMAGE_CACHE_PERCEPTUAL_ENABLED: bool = False
+    IMAGE_CACHE_MAX_HASH_DISTANCE: int = 4  # Max differing dHash bits
+
+    # Uploaded Image Store Settings
+    IMAGE_STORE_TTL_SECONDS: int = 30 * 60  # Image IDs expire after this
+    IMAGE_STORE_MAX_MEMORY_BYTES: int = 128 * 1024 * 1024
+    IMAGE_STORE_SPILL_DIR: str = ""  # Directory for evicted images, disabled when empty
+
     # API Rate Limits
+    RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_PER_MINUTE: int = 60  # Requests per minute
+    RATE_LIMIT_BURST: int = 0  # Bucket size, RATE_LIMIT_PER_MINUTE when 0
+    RATE_LIMIT_MAX_CLIENTS: int = 200_000  # Buckets kept in memory
+    # Share buckets across workers through this SQLite file, in-process when empty
+    RATE_LIMIT_SQLITE_PATH: str = ""
+    # Identify clients by the first X-Forwarded-For address (behind a proxy)
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False
+
+    # Metrics Settings
+    # Directory where each worker writes its metrics for /metrics to merge,
+    # only this worker's metrics are served when empty
+    METRICS_DIR: str = ""
+    METRICS_FLUSH_SECONDS: float = 5.0
+
+    # Request Timing and Profiling Settings
+    # Log the phase timings of requests slower than this, all requests when 0
+    REQUEST_TIMING_LOG_THRESHOLD_SECONDS: float = 1.0
+    # Run some requests under a sampling profiler (opt-in)
+    PROFILING_ENABLED: bool = False
+    PROFILING_SAMPLE_RATE: float = 0.0  # Share of requests profiled at random
+    # Requests sending this token in X-Profile are profiled, disabled when empty
+    PROFILING_ADMIN_TOKEN: str = ""
+    PROFILING_DIR: str = "profiles"
+    PROFILING_INTERVAL_SECONDS: float = 0.005  # Between stack samples
+    PROFILING_MAX_FILES: int = 100
 
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
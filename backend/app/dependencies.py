@@ -1,9 +1,12 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
+import hashlib
 import logging
-import time
-from typing import Dict, Optional
+from typing import Awaitable, Callable, Type
+from pydantic import BaseModel
 
 from app.config import settings
+from app.services.model_router import prefer_fast
+from app.services.rate_limiter import MemoryRateLimitBackend, RateLimiter, SQLiteRateLimitBackend
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -11,57 +14,47 @@ logger = logging.getLogger(__name__)
 # Rate limiting
 
 
-class RateLimiter:
-    """
-    Simple in-memory rate limiter to protect API endpoints
-    """
-
-    def __init__(self):
-        self.requests = {}
-        self.window_size = 60  # Window size in seconds
-        self.limit = settings.RATE_LIMIT_PER_MINUTE
-
-    def _cleanup_old_requests(self, client_id: str):
-        """Remove requests older than the window size"""
-        current_time = time.time()
-        self.requests[client_id] = [
-            timestamp for timestamp in self.requests.get(client_id, [])
-            if current_time - timestamp < self.window_size
-        ]
-
-    def check_rate_limit(self, client_id: str) -> bool:
-        """Check if the client has exceeded the rate limit"""
-        if not client_id:
-            return True
-
-        self._cleanup_old_requests(client_id)
-
-        # Check if the client has exceeded the rate limit
-        if len(self.requests.get(client_id, [])) >= self.limit:
-            return False
-
-        # Add the current request
-        current_time = time.time()
-        if client_id not in self.requests:
-            self.requests[client_id] = []
-        self.requests[client_id].append(current_time)
-
-        return True
+def _create_rate_limiter() -> RateLimiter:
+    """Create the rate limiter with the configured backend"""
+    if settings.RATE_LIMIT_SQLITE_PATH:
+        backend = SQLiteRateLimitBackend(settings.RATE_LIMIT_SQLITE_PATH)
+    else:
+        backend = MemoryRateLimitBackend(settings.RATE_LIMIT_MAX_CLIENTS)
+    return RateLimiter(backend, settings.RATE_LIMIT_PER_MINUTE, settings.RATE_LIMIT_BURST)
 
 
 # Create global rate limiter
-rate_limiter = RateLimiter()
+rate_limiter = _create_rate_limiter()
 
 
-async def get_client_id(user_agent: Optional[str] = None) -> str:
+async def get_client_id(request: Request) -> str:
     """
-    Get a client ID from the request headers
-    
+    Get a client ID from the client address and user agent
+
+    The ID is a stable hash, so it is the same in every worker process.
+
     Note: In a production environment, you would use a more robust
     identification method, such as API keys or tokens.
     """
-    # Simple hash of the user agent as client ID
-    return str(hash(user_agent if user_agent else "unknown"))
+    address = request.client.host if request.client else "unknown"
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        if forwarded_for:
+            address = forwarded_for.split(",")[0].strip()
+    user_agent = request.headers.get("user-agent", "unknown")
+    return hashlib.blake2b(f"{address}|{user_agent}".encode("utf-8"), digest_size=8).hexdigest()
+
+
+async def _take_rate_limit(client_id: str, cost: float):
+    """Charge a client cost tokens, raising 429 when it has too few"""
+    allowed, retry_after = await rate_limiter.check_async(client_id, cost)
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for client: {client_id}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded. Please try again later.",
+            headers={"Retry-After": str(max(1, round(retry_after)))}
+        )
 
 
 async def check_rate_limit(client_id: str = Depends(get_client_id)):
@@ -74,13 +67,46 @@ async def check_rate_limit(client_id: str = Depends(get_client_id)):
     Raises:
         HTTPException: If rate limit is exceeded
     """
-    if not rate_limiter.check_rate_limit(client_id):
-        logger.warning(f"Rate limit exceeded for client: {client_id}")
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded. Please try again later."
-        )
+    if not settings.RATE_LIMIT_ENABLED:
+        return True
 
+    await _take_rate_limit(client_id, 1)
     return True
 
+
+def check_batch_rate_limit(batch_model: Type[BaseModel]) -> Callable[..., Awaitable[bool]]:
+    """
+    Create a dependency charging a batch request one token per item
+
+    check_rate_limit has already charged the request its first token, so
+    the dependency takes the rest. The dependency reads the same body as
+    the endpoint, declared as its request parameter.
+
+    Args:
+        batch_model: Request model of the batch endpoint, with an items list
+
+    Returns:
+        Dependency for the endpoint's dependencies list
+    """
+    async def check(request: batch_model, client_id: str = Depends(get_client_id)):
+        if settings.RATE_LIMIT_ENABLED and len(request.items) > 1:
+            await _take_rate_limit(client_id, len(request.items) - 1)
+        return True
+
+    return check
+
+
+async def read_model_hint(x_prefer_fast: bool = Header(False)):
+    """
+    Dependency to read the client's hint that it prefers a fast answer
+
+    With the X-Prefer-Fast header set, text requests are served by the
+    fast model when model routing is enabled.
+
+    Args:
+        x_prefer_fast: Value of the X-Prefer-Fast header
+    """
+    prefer_fast.set(x_prefer_fast)
+    return x_prefer_fast
+
 # Additional dependencies can be added here as needed
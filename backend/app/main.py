@@ -1,11 +1,24 @@
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+import asyncio
 import time
 import logging
 
-from app.api import tiny_lesson, grammar, slang_hang, word_cam
+from app.api import tiny_lesson, grammar, slang_hang, word_cam, stats, metrics
 from app.config import settings
+from app.dependencies import check_rate_limit, read_model_hint
+from app.services.concurrency_limiter import UpstreamOverloadedError
+from app.services.image_preprocessor import image_preprocessor
+from app.services.lesson_store import lesson_store
+from app.services.metrics import http_request_duration, http_requests_in_flight, metrics as metrics_registry
+from app.services.profiler import request_profiler
+from app.services.purpose_index import purpose_index, load_stored_purposes
+from app.services.slang_hang import conversation_pool
+from app.services.word_cam import descriptor_prefetcher
+from app.utils.body_limit import BodySizeLimitMiddleware
+from app.utils.timing import RequestTimings, current_timings
 
 # Configure logging
 logging.basicConfig(
@@ -14,10 +27,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prepare shared state before serving requests"""
+    if lesson_store is not None and settings.PURPOSE_MATCH_ENABLED:
+        loaded = load_stored_purposes(purpose_index, lesson_store)
+        logger.info(f"Loaded {loaded} pre-generated lesson purposes")
+    # Share this worker's metrics with the others through METRICS_DIR
+    metrics_writer = None
+    if settings.METRICS_DIR:
+        metrics_writer = asyncio.create_task(
+            metrics_registry.write_snapshots(settings.METRICS_DIR, settings.METRICS_FLUSH_SECONDS))
+    yield
+    if metrics_writer is not None:
+        metrics_writer.cancel()
+        metrics_registry.remove_snapshot(settings.METRICS_DIR)
+    await conversation_pool.close()
+    await descriptor_prefetcher.close()
+    image_preprocessor.close()
+
+
 app = FastAPI(
     title="Little Language Lessons API",
     description="AI-powered language learning application using Google Gemini API",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -29,17 +64,62 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Reject oversized request bodies before they are read
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_bytes=settings.MAX_REQUEST_BODY_BYTES
+)
+
 # Add middleware for request timing
 
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
+    start_time = time.perf_counter()
+    http_requests_in_flight.inc()
+    timings = RequestTimings()
+    timings_token = current_timings.set(timings)
+    profile_token = request.headers.get("x-profile")
+    profiler = request_profiler.start(profile_token) if request_profiler else None
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        http_requests_in_flight.dec()
+        current_timings.reset(timings_token)
+        # Until the response starts, which for streams is the first event
+        process_time = time.perf_counter() - start_time
+        # The route template, so that path parameters don't multiply series
+        route = request.scope.get("route")
+        route_path = route.path if route else "unmatched"
+        http_request_duration.observe(process_time, request.method, route_path, str(status_code))
+        if process_time >= settings.REQUEST_TIMING_LOG_THRESHOLD_SECONDS:
+            logger.info(
+                f"Request timing: method={request.method} route={route_path} "
+                f"status={status_code} {timings.log_fields(process_time)}")
+        if profiler is not None:
+            profile_name = await asyncio.to_thread(
+                request_profiler.finish, profiler, request.method, route_path, process_time)
+            logger.info(f"Saved profile of {request.method} {route_path}: {profile_name}")
     response.headers["X-Process-Time"] = str(process_time)
+    response.headers["Server-Timing"] = timings.server_timing(process_time)
+    if profiler is not None and request_profiler.is_admin(profile_token):
+        response.headers["X-Profile-Id"] = profile_name
     return response
 
+# Upstream over capacity: fail fast and tell the client when to come back
+
+
+@app.exception_handler(UpstreamOverloadedError)
+async def upstream_overloaded_handler(request: Request, exc: UpstreamOverloadedError):
+    logger.warning(f"Shed {request.url.path}: {str(exc)}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service is busy. Please try again later."},
+        headers={"Retry-After": str(int(exc.retry_after))}
+    )
+
 # Global exception handler
 
 
@@ -52,10 +132,15 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 # Include routers
-app.include_router(tiny_lesson.router, tags=["Tiny Lesson"])
-app.include_router(grammar.router, tags=["Grammar"])
-app.include_router(slang_hang.router, tags=["Slang Hang"])
-app.include_router(word_cam.router, tags=["Word Cam"])
+# Feature endpoints are rate limited per client and take the fast model
+# hint; monitoring endpoints are not
+feature_dependencies = [Depends(check_rate_limit), Depends(read_model_hint)]
+app.include_router(tiny_lesson.router, tags=["Tiny Lesson"], dependencies=feature_dependencies)
+app.include_router(grammar.router, tags=["Grammar"], dependencies=feature_dependencies)
+app.include_router(slang_hang.router, tags=["Slang Hang"], dependencies=feature_dependencies)
+app.include_router(word_cam.router, tags=["Word Cam"], dependencies=feature_dependencies)
+app.include_router(stats.router, tags=["Monitoring"])
+app.include_router(metrics.router, tags=["Monitoring"])
 
 
 @app.get("/", tags=["Health Check"])
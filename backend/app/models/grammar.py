@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from app.models.tiny_lesson import LanguageRequest
 
 
@@ -30,4 +30,25 @@ class GrammarTopic(BaseModel):
 class GrammarResponse(BaseModel):
     """Response model for Grammar endpoint"""
     relevantGrammar: List[GrammarTopic] = Field(
-        ..., description="List of relevant grammar topics")
+        ..., description="List of grammar topics relevant to the purpose")
+
+
+class GrammarBatchRequest(BaseModel):
+    """Request model for the batch Grammar endpoint"""
+    items: List[GrammarRequest] = Field(
+        ..., min_length=1, description="Grammar lesson requests to generate")
+
+
+class GrammarBatchItem(BaseModel):
+    """Result of one item of a batch Grammar request"""
+    index: int = Field(..., description="Position of the item in the request")
+    result: Optional[GrammarResponse] = Field(
+        None, description="The generated lesson, absent if the item failed")
+    error: Optional[str] = Field(
+        None, description="Why the item failed, absent if it succeeded")
+
+
+class GrammarBatchResponse(BaseModel):
+    """Response model for the batch Grammar endpoint"""
+    items: List[GrammarBatchItem] = Field(
+        ..., description="One result per requested item, in request order")
@@ -22,4 +22,4 @@ class SlangHangResponse(BaseModel):
     context: str = Field(...,
                          description="The conversational context or setting")
     dialogue: List[DialogueLine] = Field(...,
-                                         description="The dialogue between speakers")
+                                         description="The dialogue between speakers with slang expressions")
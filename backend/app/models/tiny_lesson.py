@@ -38,6 +38,33 @@ class Phrase(BaseModel):
 class TinyLessonResponse(BaseModel):
     """Response model for Tiny Lesson endpoint"""
     vocabulary: List[VocabularyTerm] = Field(
-        ..., description="List of relevant vocabulary terms")
+        ..., description="List of vocabulary terms relevant to the purpose")
     phrases: List[Phrase] = Field(...,
                                   description="List of useful phrases for the given context")
+
+
+class MergedTinyLesson(TinyLessonResponse):
+    """One lesson of a merged Tiny Lesson generation"""
+    requestIndex: int = Field(...,
+                              description="Number of the context this lesson is for")
+
+
+class TinyLessonBatchRequest(BaseModel):
+    """Request model for the batch Tiny Lesson endpoint"""
+    items: List[TinyLessonRequest] = Field(
+        ..., min_length=1, description="Lesson requests to generate")
+
+
+class TinyLessonBatchItem(BaseModel):
+    """Result of one item of a batch Tiny Lesson request"""
+    index: int = Field(..., description="Position of the item in the request")
+    result: Optional[TinyLessonResponse] = Field(
+        None, description="The generated lesson, absent if the item failed")
+    error: Optional[str] = Field(
+        None, description="Why the item failed, absent if it succeeded")
+
+
+class TinyLessonBatchResponse(BaseModel):
+    """Response model for the batch Tiny Lesson endpoint"""
+    items: List[TinyLessonBatchItem] = Field(
+        ..., description="One result per requested item, in request order")
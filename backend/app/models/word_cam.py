@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import List, Dict, Optional
 from app.models.tiny_lesson import LanguageRequest
 
@@ -10,14 +10,34 @@ class InlineData(BaseModel):
 
 
 class Image(BaseModel):
-    """Model for image data"""
+    """Model for image data, sent inline or by ID from the image store"""
+    inlineData: Optional[InlineData] = Field(None, description="Inline image data")
+    imageId: Optional[str] = Field(
+        None, description="ID of an image uploaded to /images")
+
+    @model_validator(mode="after")
+    def check_source(self) -> "Image":
+        if (self.inlineData is None) == (self.imageId is None):
+            raise ValueError("Exactly one of inlineData or imageId is required")
+        return self
+
+
+class ImageUploadRequest(BaseModel):
+    """Request model for Image Upload endpoint"""
     inlineData: InlineData = Field(..., description="Inline image data")
 
 
+class ImageUploadResponse(BaseModel):
+    """Response model for Image Upload endpoint"""
+    imageId: str = Field(..., description="Content-hash ID of the stored image")
+    expiresInSeconds: int = Field(...,
+                                  description="Seconds until the ID expires")
+
+
 class ImageDimensions(BaseModel):
     """Model for image dimensions"""
-    width: int = Field(..., description="Image width in pixels")
-    height: int = Field(..., description="Image height in pixels")
+    width: int = Field(..., gt=0, description="Image width in pixels")
+    height: int = Field(..., gt=0, description="Image height in pixels")
 
 
 class ObjectDescriptorRequest(LanguageRequest):
@@ -54,6 +74,7 @@ class DetectedObject(BaseModel):
         "", description="Pronunciation of the object name")
     translation: str = Field(..., description="Translation of the object name")
     coordinates: List[float] = Field(...,
+                                     min_length=4, max_length=4,
                                      description="Bounding box coordinates [x1, y1, x2, y2]")
 
 
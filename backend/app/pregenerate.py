@@ -0,0 +1,261 @@
+"""
+Offline bulk lesson pre-generation
+
+Reads a matrix of language pairs, purposes and features from a CSV or JSONL
+file and writes the generated responses into the lesson store, from which
+the API serves them without calling Gemini. Finished jobs are skipped on the
+next run, so an interrupted or quota-limited run resumes where it stopped.
+
+Each row needs sourceLanguage and targetLanguage, plus purpose for the
+tiny_lesson and grammar features. An optional feature column restricts the
+row to one feature; otherwise every feature given by --features is used.
+
+Usage (from the backend directory):
+    python -m app.pregenerate matrix.csv --store lessons.db --concurrency 4 --rpm 60
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from google.genai import errors
+
+from app.config import settings
+from app.services.concurrency_limiter import UpstreamOverloadedError
+from app.services.grammar import grammar_service
+from app.services.lesson_store import LessonStore
+from app.services.model_router import Generation, current_generation
+from app.services.slang_hang import slang_hang_service
+from app.services.tiny_lesson import tiny_lesson_service
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+FEATURES = ("tiny_lesson", "grammar", "slang_hang")
+
+
+@dataclass
+class Job:
+    """A single response to pre-generate"""
+    feature: str
+    request: Dict[str, Any]
+    key: str
+
+
+class QuotaExceededError(Exception):
+    """Raised when the upstream quota is exhausted"""
+
+
+class RequestBudget:
+    """
+    Spaces upstream requests evenly to stay within a requests-per-minute budget
+    """
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def read_matrix(path: str) -> List[Dict[str, Any]]:
+    """Read matrix rows from a .csv or .jsonl file"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return list(csv.DictReader(f))
+
+
+def build_jobs(rows: List[Dict[str, Any]], features: List[str]) -> List[Job]:
+    """
+    Expand matrix rows into unique jobs
+
+    Raises:
+        ValueError: If a row is missing a required field
+    """
+    jobs: Dict[str, Job] = {}
+    for line, row in enumerate(rows, start=1):
+        source_language = (row.get("sourceLanguage") or "").strip()
+        target_language = (row.get("targetLanguage") or "").strip()
+        purpose = (row.get("purpose") or "").strip()
+        if not source_language or not target_language:
+            raise ValueError(f"Row {line}: sourceLanguage and targetLanguage are required")
+
+        for feature in [row["feature"]] if row.get("feature") else features:
+            if feature not in FEATURES:
+                raise ValueError(f"Row {line}: unknown feature '{feature}'")
+            if feature == "slang_hang":
+                request = {"sourceLanguage": source_language,
+                           "targetLanguage": target_language}
+                key = slang_hang_service.request_key(source_language, target_language)
+            else:
+                if not purpose:
+                    raise ValueError(f"Row {line}: purpose is required for {feature}")
+                request = {"sourceLanguage": source_language,
+                           "targetLanguage": target_language, "purpose": purpose}
+                service = tiny_lesson_service if feature == "tiny_lesson" else grammar_service
+                key = service.request_key(source_language, target_language, purpose)
+            jobs.setdefault(key, Job(feature=feature, request=request, key=key))
+    return list(jobs.values())
+
+
+async def generate(job: Job):
+    """Generate the response for a job, bypassing caches"""
+    request = job.request
+    if job.feature == "tiny_lesson":
+        return await tiny_lesson_service._generate_tiny_lesson(
+            request["sourceLanguage"], request["targetLanguage"], request["purpose"])
+    if job.feature == "grammar":
+        return await grammar_service._generate_grammar_lesson(
+            request["sourceLanguage"], request["targetLanguage"], request["purpose"])
+    return await slang_hang_service._generate_slang_conversation(
+        request["sourceLanguage"], request["targetLanguage"])
+
+
+def _is_quota_error(exc: BaseException) -> bool:
+    """Check whether an error is an upstream 429 that outlasted the retries"""
+    return isinstance(exc, errors.APIError) and exc.code == 429
+
+
+class Progress:
+    """Counts job outcomes and reports throughput"""
+
+    def __init__(self, total: int):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    def report(self) -> None:
+        elapsed = time.monotonic() - self.started
+        rate = self.done / elapsed * 60 if elapsed else 0.0
+        logger.info(
+            f"Pre-generation progress: {self.done}/{self.total} done, "
+            f"{self.failed} failed, {rate:.1f} jobs/min, {elapsed:.0f}s elapsed"
+        )
+
+
+async def pregenerate(
+    jobs: List[Job],
+    store: LessonStore,
+    concurrency: int,
+    requests_per_minute: float,
+    report_every: float
+) -> Progress:
+    """
+    Run jobs with bounded concurrency, storing each result as it finishes
+
+    Stops scheduling new jobs once the upstream reports quota exhaustion.
+    """
+    queue: "asyncio.Queue[Job]" = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+    budget = RequestBudget(requests_per_minute)
+    progress = Progress(len(jobs))
+    quota_exceeded = asyncio.Event()
+
+    async def worker():
+        while not quota_exceeded.is_set():
+            try:
+                job = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await budget.acquire()
+            generation = Generation()
+            token = current_generation.set(generation)
+            try:
+                response = await generate(job)
+            except UpstreamOverloadedError as e:
+                # Shed or the circuit is open; try the job again later
+                queue.put_nowait(job)
+                await asyncio.sleep(e.retry_after)
+                continue
+            except Exception as e:
+                if _is_quota_error(e):
+                    logger.warning("Upstream quota exhausted, stopping")
+                    quota_exceeded.set()
+                    return
+                progress.failed += 1
+                logger.error(f"Failed to pre-generate {job.feature} {job.request}: {str(e)}")
+                continue
+            finally:
+                current_generation.reset(token)
+            if generation.fallback:
+                # Stored lessons are served as the primary model's
+                progress.failed += 1
+                logger.warning(f"Not storing {job.feature} {job.request}: answered by a fallback model")
+                continue
+            await asyncio.to_thread(
+                store.put, job.key, job.feature, job.request,
+                response.model_dump_json().encode("utf-8")
+            )
+            progress.done += 1
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(report_every)
+            progress.report()
+
+    reporter_task = asyncio.create_task(reporter())
+    try:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    finally:
+        reporter_task.cancel()
+    progress.report()
+    if quota_exceeded.is_set():
+        raise QuotaExceededError(
+            f"Quota exhausted after {progress.done} jobs; re-run to resume")
+    return progress
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Pre-generate lessons into the lesson store")
+    parser.add_argument("matrix", help="CSV or JSONL file of requests")
+    parser.add_argument("--store", default=settings.LESSON_STORE_PATH or "lessons.db",
+                        help="Lesson store SQLite path (default: LESSON_STORE_PATH)")
+    parser.add_argument("--features", default=",".join(FEATURES),
+                        help="Comma-separated features for rows without a feature column")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=settings.RATE_LIMIT_PER_MINUTE,
+                        help="Upstream requests-per-minute budget")
+    parser.add_argument("--report-every", type=float, default=30.0,
+                        help="Seconds between progress reports")
+    args = parser.parse_args(argv)
+
+    features = [feature.strip() for feature in args.features.split(",") if feature.strip()]
+    jobs = build_jobs(read_matrix(args.matrix), features)
+    store = LessonStore(args.store)
+    pending = [job for job in jobs if not store.has(job.key)]
+    logger.info(
+        f"{len(jobs)} jobs in matrix, {len(jobs) - len(pending)} already stored, "
+        f"{len(pending)} to generate"
+    )
+
+    try:
+        asyncio.run(pregenerate(
+            pending, store, args.concurrency, args.rpm, args.report_every))
+    except QuotaExceededError as e:
+        logger.warning(str(e))
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    sys.exit(main())
@@ -0,0 +1,356 @@
+import asyncio
+import contextvars
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from app.config import settings
+from app.services.lesson_store import LessonStore, lesson_store
+from app.services.model_router import Generation, current_generation, prefer_fast
+from app.services.single_flight import single_flight
+from app.utils.responses import encode_json
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+ResponseT = TypeVar("ResponseT", bound=BaseModel)
+
+
+@dataclass
+class CacheEntry:
+    """A cached response encoded as JSON bytes"""
+    value: bytes
+    created_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.value)
+
+
+class MemoryTier:
+    """
+    In-process LRU cache bounded by the total size of stored values
+
+    Args:
+        max_bytes: Memory bound of the stored values
+        on_evict: Called with the key and entry of each evicted entry
+    """
+
+    def __init__(self, max_bytes: int, on_evict: Optional[Callable[[str, Any], None]] = None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.current_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def items(self) -> List[Tuple[str, CacheEntry]]:
+        """Return a snapshot of stored entries, least recently used first"""
+        return list(self._entries.items())
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry for a key and mark it as recently used"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """Store an entry, evicting least recently used entries to fit"""
+        if entry.size > self.max_bytes:
+            return
+        self.delete(key)
+        self._entries[key] = entry
+        self.current_bytes += entry.size
+        while self.current_bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= evicted.size
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(evicted_key, evicted)
+
+    def delete(self, key: str) -> None:
+        """Remove an entry if present"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry.size
+
+
+class SQLiteTier:
+    """
+    On-disk cache tier that survives restarts and is shared by workers
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+        return CacheEntry(value=row[0], created_at=row[1]) if row else None
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                (key, entry.value, entry.created_at)
+            )
+            self._conn.commit()
+
+    def delete_older_than(self, created_before: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM responses WHERE created_at < ?", (created_before,))
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache with stale-while-revalidate
+
+    Entries younger than ttl are served as fresh hits. Entries within the
+    following stale_ttl window are served immediately while a background
+    task regenerates them. Older entries are treated as misses; concurrent
+    misses for the same key are coalesced into one generation. Keys missing
+    from both tiers are looked up in the pre-generated lesson store, if any.
+    Responses answered by a fallback model rather than the primary one the
+    key names are returned but not stored.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        stale_ttl: float,
+        max_memory_bytes: int,
+        sqlite_path: str = "",
+        enabled: bool = True,
+        store: Optional[LessonStore] = None
+    ):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.enabled = enabled
+        self.memory = MemoryTier(max_memory_bytes)
+        self.disk = SQLiteTier(sqlite_path) if sqlite_path else None
+        self.store = store
+        if self.disk is not None:
+            self.disk.delete_older_than(time.time() - ttl - stale_ttl)
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.disk_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self.refresh_failures = 0
+        self.fallback_skips = 0
+        self._refreshing: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = await asyncio.to_thread(self.disk.get, key)
+            if entry is not None:
+                self.disk_hits += 1
+                self.memory.set(key, entry)
+        if entry is None and self.store is not None:
+            value = await asyncio.to_thread(self.store.get, key)
+            if value is not None:
+                # Pre-generated lessons never expire; start a fresh TTL
+                self.store_hits += 1
+                entry = CacheEntry(value=value, created_at=time.time())
+                self.memory.set(key, entry)
+        return entry
+
+    async def _store(self, key: str, response: BaseModel) -> bytes:
+        entry = CacheEntry(value=encode_json(response), created_at=time.time())
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, entry)
+        return entry.value
+
+    async def _generate_and_store(
+        self,
+        key: str,
+        generate: Callable[[], Awaitable[ResponseT]]
+    ) -> Tuple[ResponseT, bytes, bool]:
+        """Generate and store a response; return it encoded and whether it was stored"""
+        async def generate_once() -> Tuple[ResponseT, bytes, bool]:
+            # Runs in its own task, so this only applies to the generation
+            generation = Generation()
+            current_generation.set(generation)
+            response = await generate()
+            if generation.fallback:
+                # Answered by a fallback model: serve it to this request only
+                self.fallback_skips += 1
+                return response, encode_json(response), False
+            return response, await self._store(key, response), True
+
+        # Concurrent misses for the same key share one upstream call; requests
+        # hinting for the fast model don't share with those expecting the primary
+        return await single_flight.do(f"{key}:fast" if prefer_fast.get() else key, generate_once)
+
+    def _schedule_refresh(self, key: str, generate: Callable[[], Awaitable[BaseModel]]) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._generate_and_store(key, generate)
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.warning(f"Background cache refresh failed: {str(e)}")
+            finally:
+                self._refreshing.discard(key)
+
+        # Start from an empty context: the refresh serves no request, so it must
+        # not inherit the triggering request's model hint or timings
+        task = asyncio.create_task(refresh(), context=contextvars.Context())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _cached(self, key: str, generate: Callable[[], Awaitable[BaseModel]]) -> Optional[bytes]:
+        """Return the encoded response of a fresh or stale entry, None on a miss"""
+        entry = await self._lookup(key)
+        if entry is None:
+            return None
+        age = time.time() - entry.created_at
+        if age < self.ttl:
+            self.hits += 1
+            return entry.value
+        if age < self.ttl + self.stale_ttl:
+            self.stale_hits += 1
+            self._schedule_refresh(key, generate)
+            return entry.value
+        self.memory.delete(key)
+        return None
+
+    async def get_or_generate(
+        self,
+        key: str,
+        response_model: Type[ResponseT],
+        generate: Callable[[], Awaitable[ResponseT]]
+    ) -> ResponseT:
+        """
+        Return a cached response or generate and cache a new one
+
+        Args:
+            key: Request key from build_request_key
+            response_model: Pydantic model the cached JSON is decoded into
+            generate: Coroutine factory producing a fresh response
+
+        Returns:
+            The cached or freshly generated response
+        """
+        if not self.enabled:
+            return await single_flight.do(key, generate)
+
+        value = await self._cached(key, generate)
+        if value is not None:
+            return response_model.model_validate_json(value)
+
+        self.misses += 1
+        response, _, _ = await self._generate_and_store(key, generate)
+        return response
+
+    async def get_or_generate_shared(
+        self,
+        key: str,
+        response_model: Type[ResponseT],
+        generate: Callable[[], Awaitable[ResponseT]]
+    ) -> Tuple[ResponseT, bool]:
+        """
+        Like get_or_generate, also returning whether the response may be shared
+
+        A response answered by a fallback model is for its requester only.
+
+        Returns:
+            The cached or freshly generated response and whether it may be
+            served to other clients
+        """
+        if not self.enabled:
+            generation = Generation()
+            token = current_generation.set(generation)
+            try:
+                response = await single_flight.do(key, generate)
+            finally:
+                current_generation.reset(token)
+            return response, not generation.fallback
+
+        value = await self._cached(key, generate)
+        if value is not None:
+            return response_model.model_validate_json(value), True
+
+        self.misses += 1
+        response, _, shared = await self._generate_and_store(key, generate)
+        return response, shared
+
+    async def get_or_generate_json(self, key: str, generate: Callable[[], Awaitable[BaseModel]]) -> bytes:
+        """
+        Return a cached or newly generated response as encoded JSON
+
+        Cached entries are served as stored, without decoding or
+        re-encoding them; a new response is encoded once for both the
+        cache and the caller.
+
+        Args:
+            key: Request key from build_request_key
+            generate: Coroutine factory producing a fresh response
+
+        Returns:
+            The response as UTF-8 JSON bytes
+        """
+        if not self.enabled:
+            return encode_json(await single_flight.do(key, generate))
+
+        value = await self._cached(key, generate)
+        if value is not None:
+            return value
+
+        self.misses += 1
+        _, value, _ = await self._generate_and_store(key, generate)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache counters"""
+        return {
+            "hits": self.hits,
+            "staleHits": self.stale_hits,
+            "diskHits": self.disk_hits,
+            "storeHits": self.store_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "refreshFailures": self.refresh_failures,
+            "fallbackSkips": self.fallback_skips,
+            "entries": len(self.memory),
+            "memoryBytes": self.memory.current_bytes,
+            "maxMemoryBytes": self.memory.max_bytes,
+        }
+
+
+response_cache = ResponseCache(
+    ttl=settings.CACHE_TTL_SECONDS,
+    stale_ttl=settings.CACHE_STALE_TTL_SECONDS,
+    max_memory_bytes=settings.CACHE_MAX_MEMORY_BYTES,
+    sqlite_path=settings.CACHE_SQLITE_PATH,
+    enabled=settings.CACHE_ENABLED,
+    store=lesson_store
+)
@@ -0,0 +1,227 @@
+import asyncio
+import logging
+import math
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Upstream status codes that mean it is overloaded
+_OVERLOAD_STATUS_CODES = {429, 500, 503, 504}
+
+
+class UpstreamOverloadedError(Exception):
+    """
+    Raised instead of queueing a call the upstream has no capacity for
+
+    Args:
+        bulkhead: Name of the limiter that shed the call
+        retry_after: Seconds after which a retry is likely to be admitted
+    """
+
+    def __init__(self, bulkhead: str, retry_after: float):
+        super().__init__(f"Upstream {bulkhead} calls are over capacity")
+        self.bulkhead = bulkhead
+        self.retry_after = retry_after
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """Whether an upstream error signals overload rather than a bad request"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    return getattr(error, "code", None) in _OVERLOAD_STATUS_CODES
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to upstream health, with a bounded queue
+
+    The limit grows by one for every limit calls that succeed (additive
+    increase) and is multiplied by backoff (multiplicative decrease) when a
+    call times out or reports overload, or when the median of recent calls
+    takes more than latency_tolerance times the baseline latency of a healthy
+    upstream. Decreases happen at most once per usual call duration. Calls
+    beyond the limit wait in a queue of at most max_queue for up to
+    max_wait seconds; calls that can't be queued or wait too long fail fast
+    with UpstreamOverloadedError.
+
+    Args:
+        name: Bulkhead name used in errors and stats
+        max_limit: Upper bound and starting value of the limit
+        min_limit: Lower bound of the limit
+        max_queue: Calls allowed to wait for a slot
+        max_wait: Seconds a call waits for a slot before it is shed
+        latency_tolerance: Recent latency, relative to the baseline,
+            treated as overload
+        backoff: Factor applied to the limit on overload
+        adaptive: Whether to adjust the limit at all
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_limit: int,
+        min_limit: int = 1,
+        max_queue: int = 64,
+        max_wait: float = 5.0,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.75,
+        adaptive: bool = True
+    ):
+        self.name = name
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.latency_tolerance = latency_tolerance
+        self.backoff = backoff
+        self.adaptive = adaptive
+
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of successful call latency while healthy, and the
+        # latest latencies, whose median a few outliers in a long tail don't move
+        self.latency: Optional[float] = None
+        self._recent: Deque[float] = deque(maxlen=9)
+        self._samples = 0
+        self._last_decrease = 0.0
+
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.decreases = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a slot"""
+        return len(self._waiters)
+
+    def _retry_after(self) -> float:
+        """Rough time for the calls ahead to finish"""
+        rounds = 1 + len(self._waiters) / max(self.limit, 1)
+        return max(1.0, math.ceil(rounds * (self.latency or 1.0)))
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        """
+        Wait for a slot
+
+        Raises:
+            UpstreamOverloadedError: If the queue is full or the wait times out
+        """
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            raise UpstreamOverloadedError(self.name, self._retry_after())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            if not (waiter.done() and not waiter.cancelled()):
+                self._discard(waiter)
+                self.shed_timeout += 1
+                raise UpstreamOverloadedError(self.name, self._retry_after())
+            # The slot was handed over as the wait timed out; use it
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the caller went away
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False) -> None:
+        """
+        Return a slot and adjust the limit from the call's outcome
+
+        Args:
+            latency: Seconds the call took, None if it is not comparable
+            overloaded: Whether the call failed because of upstream overload
+        """
+        self.in_flight -= 1
+        if latency is not None and not overloaded:
+            self._samples += 1
+            if self.latency is None:
+                self.latency = latency
+            else:
+                # The baseline follows faster calls quickly and slower ones
+                # slowly, so it tracks latency when the upstream is healthy
+                weight = 0.2 if latency < self.latency else 0.01
+                self.latency = (1 - weight) * self.latency + weight * latency
+            self._recent.append(latency)
+
+        if self.adaptive:
+            now = time.monotonic()
+            slow = (
+                self._samples >= 10 and latency is not None and
+                statistics.median(self._recent) > self.latency * self.latency_tolerance
+            )
+            if overloaded or slow:
+                # Calls in flight together see the same slowdown; react to it once
+                if now - self._last_decrease >= (self.latency or 0):
+                    self._last_decrease = now
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self.decreases += 1
+                    logger.warning(f"Upstream {self.name} limit lowered to {int(self.limit)}")
+            elif latency is not None:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, record_latency: bool = True) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of a call
+
+        Args:
+            record_latency: Whether the call's duration is comparable to
+                others and should feed the limit (False for streams)
+        """
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.release(overloaded=is_overload_error(e))
+            raise
+        self.release(latency=time.monotonic() - start if record_latency else None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return limiter state and counters"""
+        return {
+            "limit": int(self.limit),
+            "maxLimit": self.max_limit,
+            "inFlight": self.in_flight,
+            "queueDepth": self.queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shedQueueFull": self.shed_queue_full,
+            "shedTimeout": self.shed_timeout,
+            "decreases": self.decreases,
+            "latencySeconds": self.latency,
+        }
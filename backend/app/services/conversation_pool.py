@@ -0,0 +1,265 @@
+import asyncio
+import contextvars
+import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from app.utils.request_key import normalize_text
+from app.utils.responses import encode_json
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[str, str]
+
+
+@dataclass
+class _PooledConversation:
+    # Number of the pair's variant the conversation was fetched as
+    id: int
+    response: BaseModel
+    serves: int = 0
+    _encoded: Optional[bytes] = None
+
+    def encoded(self) -> bytes:
+        """The response as JSON, encoded once for every client it is served to"""
+        if self._encoded is None:
+            self._encoded = encode_json(self.response)
+        return self._encoded
+
+
+@dataclass
+class _PairPool:
+    source_language: str
+    target_language: str
+    target_size: int
+    conversations: List[_PooledConversation] = field(default_factory=list)
+    seen: "OrderedDict[str, Set[int]]" = field(default_factory=OrderedDict)
+    mean_interval: Optional[float] = None
+    last_request: Optional[float] = None
+    refill_task: Optional[asyncio.Task] = None
+    next_variant: int = 0
+    requests: int = 0
+    pool_hits: int = 0
+    misses: int = 0
+
+
+class ConversationPool:
+    """
+    Per-language-pair pool of ready-made conversations
+
+    Requests are served instantly from the pool; a background task refills
+    a pair's pool once it drops below the low-water mark. Each pair's
+    target size follows its observed request rate and generation latency.
+    A client is never served the same pooled conversation twice, and each
+    conversation is retired after max_serves distinct clients. When a pool
+    has nothing suitable, the request fetches a single conversation itself.
+
+    Conversations are fetched as numbered variants of a pair, 0, 1, 2 and
+    so on, through a fetch function that looks each variant up in the
+    response cache and lesson store before generating it. A restarted or
+    another worker's pool walks the same variants and reuses them rather
+    than generating new ones. Conversations answered by a fallback model
+    are served to their requester only.
+
+    Args:
+        fetch: Coroutine function returning variant n of a pair's
+            conversation and whether it may be shared
+        min_size: Smallest target size of a pair's pool
+        max_size: Largest target size of a pair's pool
+        low_water_ratio: Refill once the pool falls below this share of target
+        max_serves: Distinct clients served by one conversation
+        max_pairs: Least recently requested pairs are dropped beyond this
+        max_clients: Clients tracked per pair for repeat avoidance
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, str, int], Awaitable[Tuple[BaseModel, bool]]],
+        min_size: int = 2,
+        max_size: int = 20,
+        low_water_ratio: float = 0.5,
+        max_serves: int = 5,
+        max_pairs: int = 256,
+        max_clients: int = 10_000,
+        refill_concurrency: int = 4
+    ):
+        self._fetch_variant = fetch
+        self.min_size = min_size
+        self.max_size = max_size
+        self.low_water_ratio = low_water_ratio
+        self.max_serves = max_serves
+        self.max_pairs = max_pairs
+        self.max_clients = max_clients
+        self.refill_concurrency = refill_concurrency
+
+        self._pools: "OrderedDict[Pair, _PairPool]" = OrderedDict()
+        self._generation_seconds: Optional[float] = None
+        self.refill_failures = 0
+        self.fallback_skips = 0
+
+    def _pool_for(self, source_language: str, target_language: str) -> _PairPool:
+        pair = (normalize_text(source_language), normalize_text(target_language))
+        pool = self._pools.get(pair)
+        if pool is None:
+            pool = _PairPool(source_language, target_language, self.min_size)
+            self._pools[pair] = pool
+            while len(self._pools) > self.max_pairs:
+                _, dropped = self._pools.popitem(last=False)
+                if dropped.refill_task:
+                    dropped.refill_task.cancel()
+        else:
+            self._pools.move_to_end(pair)
+        return pool
+
+    def _record_request(self, pool: _PairPool) -> None:
+        """Update the pair's demand estimate and resize its target"""
+        now = time.monotonic()
+        pool.requests += 1
+        if pool.last_request is not None:
+            interval = now - pool.last_request
+            pool.mean_interval = interval if pool.mean_interval is None else (
+                0.2 * interval + 0.8 * pool.mean_interval)
+        pool.last_request = now
+
+        if pool.mean_interval and self._generation_seconds:
+            # Conversations needed to cover demand while a refill runs
+            rate = 1.0 / max(pool.mean_interval, 1e-3)
+            needed = 2 * rate * self._generation_seconds / self.max_serves
+            pool.target_size = max(self.min_size, min(self.max_size, math.ceil(needed)))
+
+    def _take_unseen(self, pool: _PairPool, client_id: str) -> Optional[_PooledConversation]:
+        seen = pool.seen.setdefault(client_id, set())
+        pool.seen.move_to_end(client_id)
+        while len(pool.seen) > self.max_clients:
+            pool.seen.popitem(last=False)
+
+        for conversation in pool.conversations:
+            if conversation.id not in seen:
+                seen.add(conversation.id)
+                conversation.serves += 1
+                if conversation.serves >= self.max_serves:
+                    pool.conversations.remove(conversation)
+                return conversation
+        return None
+
+    async def _fetch(self, pool: _PairPool) -> Tuple[_PooledConversation, bool]:
+        """Fetch the pair's next variant; also return whether it may be shared"""
+        variant = pool.next_variant
+        pool.next_variant += 1
+        start = time.monotonic()
+        response, shared = await self._fetch_variant(pool.source_language, pool.target_language, variant)
+        elapsed = time.monotonic() - start
+        self._generation_seconds = elapsed if self._generation_seconds is None else (
+            0.2 * elapsed + 0.8 * self._generation_seconds)
+        return _PooledConversation(id=variant, response=response), shared
+
+    def _maybe_refill(self, pool: _PairPool) -> None:
+        """Start a refill below the low-water mark"""
+        if pool.refill_task and not pool.refill_task.done():
+            return
+        if len(pool.conversations) >= pool.target_size * self.low_water_ratio:
+            return
+        # Start from an empty context so the refill doesn't inherit the
+        # triggering request's model hint or timings
+        pool.refill_task = asyncio.create_task(self._refill(pool), context=contextvars.Context())
+
+    async def _refill(self, pool: _PairPool) -> None:
+        while len(pool.conversations) < pool.target_size:
+            batch = min(pool.target_size - len(pool.conversations), self.refill_concurrency)
+            results = await asyncio.gather(
+                *(self._fetch(pool) for _ in range(batch)),
+                return_exceptions=True
+            )
+            failed = False
+            for result in results:
+                if isinstance(result, BaseException):
+                    failed = True
+                    self.refill_failures += 1
+                    logger.warning(f"Conversation pool refill failed: {str(result)}")
+                elif not result[1]:
+                    # Fallback answers are not shared; wait for the primary
+                    failed = True
+                    self.fallback_skips += 1
+                else:
+                    pool.conversations.append(result[0])
+            if failed:
+                # Leave the rest to the next request rather than hammering upstream
+                return
+
+    async def take(self, source_language: str, target_language: str, client_id: str) -> BaseModel:
+        """
+        Return a conversation the client has not seen for a language pair
+
+        Args:
+            source_language: User's source language
+            target_language: Target language to learn
+            client_id: Identifier of the requesting client
+
+        Returns:
+            A pooled conversation, or a live one when the pool has none
+        """
+        conversation = await self._take(source_language, target_language, client_id)
+        return conversation.response
+
+    async def take_json(self, source_language: str, target_language: str, client_id: str) -> bytes:
+        """Like take, but return the conversation encoded as JSON"""
+        conversation = await self._take(source_language, target_language, client_id)
+        return conversation.encoded()
+
+    async def _take(self, source_language: str, target_language: str, client_id: str) -> _PooledConversation:
+        pool = self._pool_for(source_language, target_language)
+        self._record_request(pool)
+        conversation = self._take_unseen(pool, client_id)
+        if conversation is not None:
+            pool.pool_hits += 1
+            self._maybe_refill(pool)
+            return conversation
+
+        # Nothing unseen is ready: fetch one conversation for this client,
+        # from the cache or store when there, and pool it for the next ones
+        pool.misses += 1
+        conversation, shared = await self._fetch(pool)
+        conversation.serves = 1
+        if not shared:
+            # Serve a fallback model's answer to this client only
+            self.fallback_skips += 1
+            return conversation
+        pool.seen.setdefault(client_id, set()).add(conversation.id)
+        if self.max_serves > 1:
+            pool.conversations.append(conversation)
+        return conversation
+
+    async def close(self) -> None:
+        """Cancel running refill tasks"""
+        tasks = [pool.refill_task for pool in self._pools.values()
+                 if pool.refill_task and not pool.refill_task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool sizes and counters per language pair"""
+        return {
+            "generationSeconds": self._generation_seconds,
+            "refillFailures": self.refill_failures,
+            "fallbackSkips": self.fallback_skips,
+            "pairs": [
+                {
+                    "sourceLanguage": pool.source_language,
+                    "targetLanguage": pool.target_language,
+                    "size": len(pool.conversations),
+                    "targetSize": pool.target_size,
+                    "requestsPerSecond": 1.0 / pool.mean_interval if pool.mean_interval else None,
+                    "requests": pool.requests,
+                    "poolHits": pool.pool_hits,
+                    "misses": pool.misses,
+                }
+                for pool in self._pools.values()
+            ],
+        }
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Prefetch:
+    task: asyncio.Task
+    created_at: float
+    # Set once the prefetch holds a concurrency slot
+    started: bool = False
+    # Set once a foreground request waits for the result
+    claimed: bool = False
+
+
+class DescriptorPrefetcher:
+    """
+    Short-lived store of speculatively generated object descriptors
+
+    After object detection, descriptors for the detected objects are
+    generated in the background under the same request key the descriptor
+    endpoint computes. A later request returns a finished result at once
+    or joins the running prefetch. Prefetches that no request has joined
+    are shed whenever the foreground upstream load passes max_load.
+
+    Args:
+        load: Returns the number of upstream calls in flight
+        max_load: Foreground calls in flight above which prefetching stops
+        max_concurrency: Prefetches running at once
+        max_pending: Prefetches running or queued at once
+        ttl: Seconds a prefetched result is kept
+        max_entries: Oldest results are dropped beyond this many
+    """
+
+    def __init__(
+        self,
+        load: Callable[[], int],
+        max_load: int,
+        max_concurrency: int = 4,
+        max_pending: int = 16,
+        ttl: float = 300,
+        max_entries: int = 1000
+    ):
+        self._load = load
+        self.max_load = max_load
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._entries: "OrderedDict[str, _Prefetch]" = OrderedDict()
+        self._watchdog: Optional[asyncio.Task] = None
+        self.running = 0
+        self.pending = 0
+
+        self.scheduled = 0
+        self.skipped = 0
+        self.hits = 0
+        self.joined = 0
+        self.shed = 0
+        self.failures = 0
+
+    def overloaded(self) -> bool:
+        """Whether foreground upstream calls leave no room for prefetching"""
+        return self._load() - self.running >= self.max_load
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None and not entry.task.done():
+            entry.task.cancel()
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.created_at < self.ttl and len(self._entries) <= self.max_entries:
+                break
+            self._drop(key)
+
+    async def _run(self, key: str, generate: Callable[[], Awaitable[BaseModel]]) -> Optional[BaseModel]:
+        try:
+            async with self._semaphore:
+                entry = self._entries.get(key)
+                if entry is None or (not entry.claimed and self.overloaded()):
+                    self.shed += 1
+                    return None
+                entry.started = True
+                self.running += 1
+                try:
+                    return await generate()
+                finally:
+                    self.running -= 1
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Descriptor prefetch failed: {str(e)}")
+            return None
+
+    def _finished(self, task: asyncio.Task) -> None:
+        # A callback rather than a finally block, which a task cancelled
+        # before it starts never runs
+        self.pending -= 1
+        if task.cancelled():
+            self.shed += 1
+
+    async def _watch(self) -> None:
+        """Cancel unclaimed prefetches while the system is under load"""
+        while self.pending:
+            if self.overloaded():
+                for key, entry in list(self._entries.items()):
+                    if not entry.claimed and not entry.task.done():
+                        self._drop(key)
+            await asyncio.sleep(0.05)
+
+    def schedule(self, key: str, generate: Callable[[], Awaitable[BaseModel]]) -> bool:
+        """
+        Start generating a result in the background
+
+        Args:
+            key: Request key the result will be looked up by
+            generate: Coroutine factory producing the result
+
+        Returns:
+            Whether the prefetch was started
+        """
+        self._expire()
+        if key in self._entries:
+            return False
+        if self.pending >= self.max_pending or self.overloaded():
+            self.skipped += 1
+            return False
+
+        self.scheduled += 1
+        self.pending += 1
+        task = asyncio.create_task(self._run(key, generate))
+        task.add_done_callback(self._finished)
+        self._entries[key] = _Prefetch(task=task, created_at=time.monotonic())
+        if self._watchdog is None or self._watchdog.done():
+            self._watchdog = asyncio.create_task(self._watch())
+        return True
+
+    async def get(self, key: str) -> Optional[BaseModel]:
+        """
+        Return a prefetched result, waiting for it if it is already running
+
+        Args:
+            key: Request key of the result
+
+        Returns:
+            The result, or None if nothing usable was prefetched
+        """
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry.created_at >= self.ttl:
+            return None
+        if entry.task.done():
+            result = None if entry.task.cancelled() else entry.task.result()
+            if result is not None:
+                self.hits += 1
+            return result
+        if not entry.started:
+            # Still queued behind other prefetches; the caller is better
+            # off making the request itself
+            self._drop(key)
+            return None
+
+        entry.claimed = True
+        self.joined += 1
+        try:
+            # Shielded so a disconnecting client leaves the prefetch running
+            return await asyncio.shield(entry.task)
+        except asyncio.CancelledError:
+            if entry.task.cancelled():
+                return None
+            raise
+
+    async def close(self) -> None:
+        """Cancel running prefetches"""
+        tasks = [entry.task for entry in self._entries.values() if not entry.task.done()]
+        if self._watchdog is not None:
+            tasks.append(self._watchdog)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return prefetch counters"""
+        return {
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "hits": self.hits,
+            "joined": self.joined,
+            "shed": self.shed,
+            "failures": self.failures,
+            "pending": self.pending,
+            "running": self.running,
+            "entries": len(self._entries),
+        }
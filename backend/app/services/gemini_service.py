@@ -1,13 +1,23 @@
 from google import genai
 from google.genai import types
-import base64
 import json
 import logging
-from typing import Dict, Any, List, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Union
+from pydantic import BaseModel, ValidationError
 import asyncio
-from tenacity import retry, stop_after_attempt, wait_exponential
+import time
 
 from app.config import settings
+from app.services.concurrency_limiter import AdaptiveLimiter
+from app.services.hedging import Hedger
+from app.services.metrics import function_call_failures, upstream_request_duration
+from app.services.model_router import Generation, ModelRouter, current_generation, mark_fallback
+from app.services.retry_policy import CircuitBreaker, RetryBudget, RetryPolicy, is_retryable_error
+from app.services.schema_registry import FunctionSchema
+from app.utils.json_stream import JsonStreamParser, Event
+from app.utils.timing import phase, record_phase
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -23,86 +33,370 @@ class GeminiService:
         self.vision_model = settings.GEMINI_VISION_MODEL
         self.max_attempts = settings.MAX_ATTEMPTS
         self.timeout = settings.TIMEOUT_SECONDS
+        self.use_async_client = settings.GEMINI_USE_ASYNC_CLIENT
+        self.max_concurrent_calls = settings.MAX_CONCURRENT_UPSTREAM_CALLS
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
-    async def call_gemini_with_function(self, prompt: str, function_declarations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        # Bound upstream calls in flight, in separate bulkheads for text and
+        # vision calls that together allow max_concurrent_calls
+        self.limiters = {
+            name: AdaptiveLimiter(
+                name,
+                max_limit=max_limit,
+                min_limit=settings.UPSTREAM_MIN_CONCURRENCY,
+                max_queue=settings.UPSTREAM_QUEUE_MAX,
+                max_wait=settings.UPSTREAM_QUEUE_MAX_WAIT_SECONDS,
+                latency_tolerance=settings.UPSTREAM_LATENCY_TOLERANCE,
+                adaptive=settings.UPSTREAM_ADAPTIVE_ENABLED
+            )
+            for name, max_limit in (
+                ("text", self.max_concurrent_calls - settings.UPSTREAM_VISION_MAX_CONCURRENCY),
+                ("vision", settings.UPSTREAM_VISION_MAX_CONCURRENCY),
+            )
+        }
+        # Retry transient failures within a budget shared by all calls, and
+        # fail fast while a bulkhead's upstream keeps failing
+        self.retry_policy = RetryPolicy(
+            max_attempts=self.max_attempts,
+            base_delay=settings.RETRY_BASE_DELAY_SECONDS,
+            max_delay=settings.RETRY_MAX_DELAY_SECONDS,
+            deadline=settings.UPSTREAM_DEADLINE_SECONDS or 2 * self.timeout,
+            budget=RetryBudget(settings.RETRY_BUDGET_RATIO, settings.RETRY_BUDGET_MAX_TOKENS)
+        )
+        self.breakers = {
+            name: CircuitBreaker(
+                name,
+                failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.CIRCUIT_BREAKER_RESET_SECONDS
+            )
+            for name in self.limiters
+        }
+        # Pick the text model per request, falling back to a faster one
+        # while the primary is slow or failing
+        self.router = ModelRouter(
+            primary=self.model,
+            fast=settings.MODEL_ROUTING_FAST_MODEL or self.vision_model,
+            fast_features=settings.MODEL_ROUTING_FAST_FEATURES,
+            max_latency=settings.MODEL_ROUTING_MAX_LATENCY_SECONDS,
+            max_error_rate=settings.MODEL_ROUTING_MAX_ERROR_RATE,
+            max_queue=settings.MODEL_ROUTING_MAX_QUEUE,
+            probe_ratio=settings.MODEL_ROUTING_PROBE_RATIO
+        ) if settings.MODEL_ROUTING_ENABLED else None
+        # Hedge slow calls of the endpoints that opt in
+        self.hedge_model = settings.HEDGE_MODEL
+        self.hedgers = {
+            endpoint: Hedger(
+                percentile=settings.HEDGE_PERCENTILE,
+                budget_ratio=settings.HEDGE_BUDGET_RATIO
+            )
+            for endpoint in settings.HEDGE_ENDPOINTS
+        }
+        # Fallback pool for clients that only expose a blocking API
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrent_calls,
+            thread_name_prefix="gemini"
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Upstream calls in flight across bulkheads"""
+        return sum(limiter.in_flight for limiter in self.limiters.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the state of each upstream bulkhead and retry counters"""
+        stats: Dict[str, Any] = {
+            name: {**limiter.stats(), "circuit": self.breakers[name].stats()}
+            for name, limiter in self.limiters.items()
+        }
+        stats["retries"] = self.retry_policy.budget.stats()
+        stats["hedging"] = {endpoint: hedger.stats() for endpoint, hedger in self.hedgers.items()}
+        return stats
+
+    def _text_model(self, endpoint: Optional[str]) -> str:
+        """Model for a text call, as routed when routing is enabled"""
+        if self.router is None:
+            return self.model
+        model, _ = self.router.choose(endpoint, self.limiters["text"].queue_depth)
+        return model
+
+    def _record(self, model: str, latency: Optional[float], error: bool = False) -> None:
+        """Feed a call's outcome to the model router"""
+        if self.router is not None:
+            self.router.record(model, latency, error)
+
+    async def _generate_content(
+        self,
+        model: str,
+        contents: Any,
+        config: types.GenerateContentConfig,
+        bulkhead: str = "text",
+        endpoint: Optional[str] = None
+    ) -> types.GenerateContentResponse:
+        """
+        Run a generate_content call without blocking the event loop
+
+        Uses the SDK's async client when available and falls back to the
+        managed thread pool otherwise. The call waits for a free slot in its
+        bulkhead and is abandoned after settings.TIMEOUT_SECONDS.
+
+        Args:
+            model: Name of the model to call
+            contents: Contents to send to the model
+            config: Generation config including tools
+            bulkhead: Limiter the call counts against ("text" or "vision")
+            endpoint: Endpoint making the call, for metrics
+
+        Returns:
+            Raw response from Gemini API
+
+        Raises:
+            UpstreamOverloadedError: If no slot frees up in time
+        """
+        queued = time.monotonic()
+        async with self.limiters[bulkhead].slot():
+            start = time.monotonic()
+            record_phase("queue", start - queued)
+            if self.use_async_client and hasattr(self.client, "aio"):
+                call = self.client.aio.models.generate_content(
+                    model=model,
+                    contents=contents,
+                    config=config,
+                )
+            else:
+                loop = asyncio.get_running_loop()
+                # A timed out call keeps its worker thread until the
+                # blocking request returns, but no longer holds a slot
+                call = loop.run_in_executor(
+                    self._executor,
+                    partial(
+                        self.client.models.generate_content,
+                        model=model,
+                        contents=contents,
+                        config=config,
+                    )
+                )
+            try:
+                response = await asyncio.wait_for(call, timeout=self.timeout)
+            except Exception as e:
+                elapsed = time.monotonic() - start
+                self._record(model, None, error=is_retryable_error(e))
+                upstream_request_duration.observe(elapsed, model, endpoint or "other", "error")
+                record_phase("upstream", elapsed)
+                raise
+            elapsed = time.monotonic() - start
+            self._record(model, elapsed)
+            if bulkhead == "text" and model != self.model:
+                # Routed or hedged away from the primary; not to be shared
+                mark_fallback()
+            record_phase("upstream", elapsed)
+            upstream_request_duration.observe(elapsed, model, endpoint or "other", "ok")
+            return response
+
+    async def _call_upstream(
+        self,
+        model: str,
+        contents: Any,
+        config: types.GenerateContentConfig,
+        bulkhead: str = "text",
+        endpoint: Optional[str] = None
+    ) -> types.GenerateContentResponse:
+        """
+        Run a generate_content call with retries, through the bulkhead's circuit
+
+        Transient failures are retried as settings allow; see RetryPolicy.
+        Each attempt of an endpoint in settings.HEDGE_ENDPOINTS is hedged,
+        text calls with settings.HEDGE_MODEL; see Hedger.
+
+        Args:
+            endpoint: Endpoint making the call, for model routing and hedging
+
+        Raises:
+            UpstreamOverloadedError: If the call is shed or the circuit is open
+        """
+        def attempt(attempt_model: str):
+            return lambda: self._generate_content(
+                model=attempt_model, contents=contents, config=config,
+                bulkhead=bulkhead, endpoint=endpoint)
+
+        operation = attempt(model)
+        hedger = self.hedgers.get(endpoint)
+        if hedger is not None:
+            hedge_model = (self.hedge_model or model) if bulkhead == "text" else model
+            operation = partial(self._hedged, hedger, attempt(model), attempt(hedge_model))
+        return await self.retry_policy.call(operation, breaker=self.breakers[bulkhead])
+
+    @staticmethod
+    async def _hedged(
+        hedger: Hedger,
+        primary: Callable[[], Awaitable[types.GenerateContentResponse]],
+        hedge: Callable[[], Awaitable[types.GenerateContentResponse]]
+    ) -> types.GenerateContentResponse:
+        """Run a hedged call, marking a fallback only if the winning attempt used one"""
+        async def tracked(call):
+            # Each attempt runs in its own task, so the loser's marker stays
+            # on its own Generation rather than on the caller's
+            generation = Generation()
+            current_generation.set(generation)
+            response = await call()
+            return response, generation.fallback
+
+        response, fallback = await hedger.run(partial(tracked, primary), partial(tracked, hedge))
+        if fallback:
+            mark_fallback()
+        return response
+
+    @staticmethod
+    def _extract_function_calls(response: types.GenerateContentResponse) -> List[Dict[str, Any]]:
+        """Extract all function calls from a Gemini response, in order"""
+        function_calls = []
+        for candidate in response.candidates or []:
+            if not candidate.content:
+                continue
+            for part in candidate.content.parts or []:
+                if getattr(part, 'function_call', None):
+                    function_calls.append({
+                        "name": part.function_call.name,
+                        "args": part.function_call.args,
+                    })
+        return function_calls
+
+    @classmethod
+    def _extract_function_call(
+        cls,
+        response: types.GenerateContentResponse,
+        endpoint: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Extract the first function call from a Gemini response
+
+        Raises:
+            ValueError: If the response contains no function call
+        """
+        function_calls = cls._extract_function_calls(response)
+
+        if function_calls:
+            return function_calls[0]
+        else:
+            logger.warning("No function call found in the response")
+            function_call_failures.inc(endpoint or "other")
+            raise ValueError("No function call found in the response")
+
+    @classmethod
+    def _validate_function_call(
+        cls,
+        response: types.GenerateContentResponse,
+        function: FunctionSchema,
+        endpoint: Optional[str] = None
+    ) -> BaseModel:
+        """
+        Validate the first function call of a Gemini response into its model
+
+        Raises:
+            ValueError: If the response contains no call to the function or
+                its arguments don't match the model
+        """
+        function_call = cls._extract_function_call(response, endpoint)
+        if function_call["name"] != function.name:
+            logger.warning(f"Unexpected function call: {function_call['name']}")
+            function_call_failures.inc(endpoint or "other")
+            raise ValueError(f"Unexpected function call: {function_call['name']}")
+        try:
+            with phase("build"):
+                return function.validate(function_call["args"])
+        except ValidationError as e:
+            logger.warning(f"Invalid {function.name} arguments: {e.error_count()} errors")
+            function_call_failures.inc(endpoint or "other")
+            raise
+
+    async def call_gemini_with_function(
+        self,
+        prompt: str,
+        function: FunctionSchema,
+        endpoint: Optional[str] = None
+    ) -> BaseModel:
         """
         Call Gemini API with function calling capabilities
 
         Args:
             prompt: The text prompt to send to Gemini
-            function_declarations: List of function declarations
+            function: Function Gemini is asked to call
+            endpoint: Endpoint making the call, for model routing and hedging
 
         Returns:
-            Response from Gemini API
+            The function's arguments, validated into its response model
         """
         try:
-            tools = types.Tool(function_declarations=function_declarations)
-            config = types.GenerateContentConfig(
-                temperature=0.2,
-                top_p=0.95,
-                top_k=64,
-                tools=[tools]
+            response = await self._call_upstream(
+                model=self._text_model(endpoint),
+                contents=prompt,
+                config=function.config,
+                endpoint=endpoint
             )
-            response = self.client.models.generate_content(
-                model=self.model,
+            return self._validate_function_call(response, function, endpoint)
+
+        except Exception as e:
+            logger.error(f"Error calling Gemini API: {str(e)}")
+            raise
+
+    async def call_gemini_with_functions(
+        self,
+        prompt: str,
+        function: FunctionSchema,
+        endpoint: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Call Gemini API expecting one or more function calls in the response
+
+        Args:
+            prompt: The text prompt to send to Gemini
+            function: Function Gemini is asked to call
+            endpoint: Endpoint making the call, for model routing and hedging
+
+        Returns:
+            All function calls in the response, in order
+
+        Raises:
+            ValueError: If the response contains no function call
+        """
+        try:
+            response = await self._call_upstream(
+                model=self._text_model(endpoint),
                 contents=prompt,
-                config=config,
+                config=function.config,
+                endpoint=endpoint
             )
-            # Extract function call information
-            function_calls = []
-            for candidate in response.candidates:
-                for part in candidate.content.parts:
-                    if hasattr(part, 'function_call'):
-                        function_calls.append({
-                            "name": part.function_call.name,
-                            "args": part.function_call.args,
-                        })
-
-            if function_calls:
-                return function_calls[0]
-            else:
+            function_calls = self._extract_function_calls(response)
+            if not function_calls:
                 logger.warning("No function call found in the response")
+                function_call_failures.inc(endpoint or "other")
                 raise ValueError("No function call found in the response")
+            return function_calls
 
         except Exception as e:
             logger.error(f"Error calling Gemini API: {str(e)}")
             raise
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=10))
     async def call_gemini_vision_with_function(
         self,
         prompt: str,
-        image_data: str,
+        image_bytes: bytes,
         mime_type: str,
-        function_declarations: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
+        function: FunctionSchema,
+        endpoint: Optional[str] = None
+    ) -> BaseModel:
         """
         Call Gemini API with vision capabilities and function calling
 
         Args:
             prompt: The text prompt to send to Gemini
-            image_data: Base64-encoded image data
+            image_bytes: Decoded image bytes
             mime_type: MIME type of the image
-            function_declarations: List of function declarations
+            function: Function Gemini is asked to call
+            endpoint: Endpoint making the call, for model routing and hedging
 
         Returns:
-            Response from Gemini API
+            The function's arguments, validated into its response model
         """
         try:
-            tools = types.Tool(function_declarations=function_declarations)
-            config = types.GenerateContentConfig(
-                temperature=0.2,
-                top_p=0.95,
-                top_k=64,
-                tools=[tools]
-            )
-            # Prepare image data
-            if "base64," in image_data:
-                # Remove the data URL prefix if present
-                image_data = image_data.split("base64,")[1]
-
-            image_bytes = base64.b64decode(image_data)
             contents = [
                 types.Part.from_text(text=prompt),
                 types.Part.from_bytes(
@@ -110,31 +404,117 @@ class GeminiService:
                     data=image_bytes,
                 )
             ]
-            response = self.client.models.generate_content(
+            response = await self._call_upstream(
                 model=self.vision_model,
                 contents=contents,
-                config=config,
+                config=function.config,
+                bulkhead="vision",
+                endpoint=endpoint
             )
-
-            # Extract function call information
-            function_calls = []
-            for candidate in response.candidates:
-                for part in candidate.content.parts:
-                    if hasattr(part, 'function_call'):
-                        function_calls.append({
-                            "name": part.function_call.name,
-                            "args": part.function_call.args,
-                        })
-
-            if function_calls:
-                return function_calls[0]
-            else:
-                logger.warning("No function call found in the response")
-                raise ValueError("No function call found in the response")
+            return self._validate_function_call(response, function, endpoint)
 
         except Exception as e:
             logger.error(f"Error calling Gemini Vision API: {str(e)}")
             raise
 
+    async def stream_gemini_json(
+        self,
+        prompt: str,
+        config: types.GenerateContentConfig,
+        endpoint: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a JSON response matching a schema from Gemini
+
+        Clients without an async API get the whole response as one chunk.
+
+        Args:
+            prompt: The text prompt to send to Gemini
+            config: Generation config with the schema the JSON must follow
+            endpoint: Endpoint making the call, for model routing, and
+                hedging when the response isn't streamed
+
+        Yields:
+            Chunks of JSON text as they arrive
+        """
+        model = self._text_model(endpoint)
+        if not (self.use_async_client and hasattr(self.client, "aio")):
+            response = await self._call_upstream(
+                model=model,
+                contents=prompt,
+                config=config,
+                endpoint=endpoint
+            )
+            if response.text:
+                yield response.text
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        # Chunks may already have been passed on, so a stream isn't retried
+        breaker = self.breakers["text"]
+        ticket = breaker.before_call()
+        try:
+            # A stream's duration depends on its length, so it doesn't feed the limit
+            async with self.limiters["text"].slot(record_latency=False):
+                stream = await asyncio.wait_for(
+                    self.client.aio.models.generate_content_stream(
+                        model=model,
+                        contents=prompt,
+                        config=config,
+                    ),
+                    timeout=self.timeout
+                )
+                chunks = stream.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            chunks.__anext__(), timeout=max(deadline - loop.time(), 0))
+                    except StopAsyncIteration:
+                        break
+                    if chunk.text:
+                        yield chunk.text
+        except Exception as e:
+            if is_retryable_error(e):
+                breaker.record_failure(ticket)
+                self._record(model, None, error=True)
+            else:
+                breaker.record_ignored(ticket)
+            logger.error(f"Error streaming from Gemini API: {str(e)}")
+            raise
+        except BaseException:
+            # Cancelled, or the consumer stopped reading
+            breaker.record_ignored(ticket)
+            raise
+        breaker.record_success(ticket)
+        self._record(model, None)
+
+    async def stream_function_args(
+        self,
+        prompt: str,
+        function: FunctionSchema,
+        endpoint: Optional[str] = None
+    ) -> AsyncIterator[Event]:
+        """
+        Stream the arguments of a function as they are generated
+
+        Gemini is asked for JSON following the function's parameters
+        schema, which is parsed incrementally.
+
+        Args:
+            prompt: The text prompt to send to Gemini
+            function: Function whose arguments are generated
+            endpoint: Endpoint making the call, for model routing
+
+        Yields:
+            Parser events for each completed array element or field
+        """
+        parser = JsonStreamParser()
+        async for text in self.stream_gemini_json(prompt, function.json_config, endpoint):
+            for event in parser.feed(text):
+                yield event
+        if not parser.done:
+            raise ValueError("Incomplete JSON in streamed response")
+
 
 gemini_service = GeminiService()
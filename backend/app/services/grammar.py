@@ -1,17 +1,43 @@
 import logging
-from typing import Dict, Any, List
-from google.genai import types
+from typing import Any, AsyncIterator, Tuple
 
 from app.services.gemini_service import gemini_service
-from app.models.grammar import GrammarResponse, GrammarTopic, GrammarExample
+from app.utils.json_stream import ITEM
+from app.services.cache import response_cache
+from app.services.purpose_index import purpose_index, purpose_scope
+from app.services.schema_registry import GRAMMAR_LESSON
+from app.config import settings
+from app.utils.request_key import build_request_key
+from app.models.grammar import GrammarResponse, GrammarTopic
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Models of the array items emitted while streaming
+STREAM_ITEM_MODELS = {
+    "relevantGrammar": GrammarTopic,
+}
+
+# Bump when the prompt or schema changes to invalidate cached responses
+PROMPT_VERSION = "1"
+
 
 class GrammarService:
     """Service for generating grammar lessons"""
 
+    def request_key(self, source_language: str, target_language: str, purpose: str) -> str:
+        """Key under which responses for a request are cached and stored"""
+        return build_request_key(
+            "grammar",
+            {
+                "sourceLanguage": source_language,
+                "targetLanguage": target_language,
+                "purpose": purpose
+            },
+            gemini_service.model,
+            PROMPT_VERSION
+        )
+
     async def generate_grammar_lesson(self, source_language: str, target_language: str, purpose: str) -> GrammarResponse:
         """
         Generate a grammar lesson based on the provided context
@@ -24,61 +50,55 @@ class GrammarService:
         Returns:
             GrammarResponse with relevant grammar topics
         """
-        try:
-            # Define the function declaration for Gemini API
-            function_declarations: List[types.FunctionDeclaration] = [
-                types.FunctionDeclaration(
-                    name="generate_grammar_lesson",
-                    description="Generate grammar topics and examples for a specific language learning context",
-                    parameters=types.Schema(
-                        type=types.Type.OBJECT,
-                        properties={
-                            "relevantGrammar":  types.Schema(
-                                type=types.Type.ARRAY,
-                                description="List of grammar topics relevant to the purpose",
-                                items=types.Schema(
-                                    type=types.Type.OBJECT,
-                                    properties={
-                                        "topic": types.Schema(
-                                            type=types.Type.STRING,
-                                            description="The grammar topic relevant to the context"
-                                        ),
-                                        "description": types.Schema(
-                                            type=types.Type.STRING,
-                                            description="Description of the grammar rule"
-                                        ),
-                                        "examples": types.Schema(
-                                            type=types.Type.ARRAY,
-                                            description="Examples of the grammar rule in use",
-                                            items=types.Schema(
-                                                type=types.Type.OBJECT,
-                                                properties={
-                                                    "sentence": types.Schema(
-                                                        type=types.Type.STRING,
-                                                        description="An example sentence demonstrating the grammar rule"
-                                                    ),
-                                                    "explanation": types.Schema(
-                                                        type=types.Type.STRING,
-                                                        description="Explanation of how the grammar rule is applied in the sentence"
-                                                    )
-                                                },
-                                                required=[
-                                                    "sentence", "explanation"]
-                                            )
-                                        )
-                                    },
-                                    required=[
-                                        "topic", "description", "examples"]
-                                )
-                            )
-                        },
-                        required=["relevantGrammar"]
-                    )
-                )
-            ]
+        purpose = self._match_purpose(source_language, target_language, purpose)
+        return await response_cache.get_or_generate(
+            self.request_key(source_language, target_language, purpose),
+            GrammarResponse,
+            lambda: self._generate_grammar_lesson(source_language, target_language, purpose)
+        )
+
+    async def generate_grammar_lesson_json(self, source_language: str, target_language: str, purpose: str) -> bytes:
+        """
+        Generate a grammar lesson encoded as JSON
 
-            # Create the prompt for Gemini API
-            prompt = f"""
+        Cached lessons are returned as stored, without decoding them into
+        a GrammarResponse and encoding them again.
+
+        Returns:
+            GrammarResponse as UTF-8 JSON bytes
+        """
+        purpose = self._match_purpose(source_language, target_language, purpose)
+        return await response_cache.get_or_generate_json(
+            self.request_key(source_language, target_language, purpose),
+            lambda: self._generate_grammar_lesson(source_language, target_language, purpose)
+        )
+
+    def _match_purpose(self, source_language: str, target_language: str, purpose: str) -> str:
+        """Return an already seen, near-identical purpose whose lesson can be reused"""
+        if not settings.PURPOSE_MATCH_ENABLED:
+            return purpose
+        return purpose_index.resolve(
+            purpose_scope("grammar", source_language, target_language),
+            purpose
+        )
+
+    async def stream_grammar_lesson(self, source_language: str, target_language: str, purpose: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a grammar lesson item by item as Gemini generates it
+
+        Yields:
+            (field, item) pairs: GrammarTopic
+        """
+        prompt = self._prompt(source_language, target_language, purpose) + \
+            "Respond with a JSON object following the response schema."
+        async for kind, field, value in gemini_service.stream_function_args(
+                prompt, GRAMMAR_LESSON, endpoint="grammar"):
+            if kind == ITEM and field in STREAM_ITEM_MODELS:
+                yield field, STREAM_ITEM_MODELS[field].model_validate(value)
+
+    def _prompt(self, source_language: str, target_language: str, purpose: str) -> str:
+        """Prompt without the final response-format instruction"""
+        return f"""
             You are a language learning assistant that helps users learn grammar in context.
             
             Create a list of relevant grammar topics in {target_language} that would be helpful for a {source_language} speaker in the following context: {purpose}.
@@ -91,38 +111,18 @@ class GrammarService:
             
             The grammar topics should be specific to the context and immediately applicable.
             
-            Respond with the function call to generate_grammar_lesson.
             """
 
-            # Call Gemini API
-            response = await gemini_service.call_gemini_with_function(prompt, function_declarations)
-
-            if response and response.get("name") == "generate_grammar_lesson":
-                args = response.get("args", {})
-
-                # Convert the response to our model
-                grammar_topics = []
-                for topic_data in args.get("relevantGrammar", []):
-                    examples = [
-                        GrammarExample(
-                            sentence=example.get("sentence", ""),
-                            explanation=example.get("explanation", "")
-                        )
-                        for example in topic_data.get("examples", [])
-                    ]
-
-                    grammar_topic = GrammarTopic(
-                        topic=topic_data.get("topic", ""),
-                        description=topic_data.get("description", ""),
-                        examples=examples
-                    )
-
-                    grammar_topics.append(grammar_topic)
-
-                return GrammarResponse(relevantGrammar=grammar_topics)
-            else:
-                logger.error("Invalid response from Gemini API")
-                raise ValueError("Invalid response from Gemini API")
+    async def _generate_grammar_lesson(self, source_language: str, target_language: str, purpose: str) -> GrammarResponse:
+        """Generate a fresh response from Gemini, bypassing the cache"""
+        try:
+            # Create the prompt for Gemini API
+            prompt = self._prompt(source_language, target_language, purpose) + \
+                "Respond with the function call to generate_grammar_lesson."
+
+            # Call Gemini API, which validates the arguments into our model
+            return await gemini_service.call_gemini_with_function(
+                prompt, GRAMMAR_LESSON, endpoint="grammar")
 
         except Exception as e:
             logger.error(f"Error generating grammar lesson: {str(e)}")
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, TypeVar
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """
+    Percentiles of the most recent latencies
+
+    Percentiles are recomputed once every refresh_every samples rather
+    than on every read.
+
+    Args:
+        window: Number of recent samples kept
+        refresh_every: Samples between recomputations
+    """
+
+    def __init__(self, window: int = 500, refresh_every: int = 20):
+        self._samples: Deque[float] = deque(maxlen=window)
+        self.refresh_every = refresh_every
+        self._sorted: list = []
+        self._since_refresh = 0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._since_refresh += 1
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Latency below which a share p of recent calls finished"""
+        if not self._samples:
+            return None
+        if self._since_refresh >= self.refresh_every or not self._sorted:
+            self._sorted = sorted(self._samples)
+            self._since_refresh = 0
+        return self._sorted[min(int(p * len(self._sorted)), len(self._sorted) - 1)]
+
+
+class Hedger:
+    """
+    Fires a second call when the first is slower than usual
+
+    If the primary call hasn't finished by the given percentile of recent
+    latency, a hedge call is started. The first successful result wins and
+    the other call is cancelled; if one call fails, the other's outcome is
+    used. Every call deposits budget_ratio tokens and every hedge spends
+    one, so hedges stay below budget_ratio of calls.
+
+    Args:
+        percentile: Share of recent calls that finish before a hedge is fired
+        budget_ratio: Hedges allowed per call
+        max_tokens: Hedges that can be saved up
+        min_samples: Latencies recorded before hedging starts
+        window: Recent latencies the percentile is taken over
+    """
+
+    def __init__(
+        self,
+        percentile: float,
+        budget_ratio: float,
+        max_tokens: float = 10,
+        min_samples: int = 20,
+        window: int = 500
+    ):
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.max_tokens = max_tokens
+        self.min_samples = min_samples
+        self.latencies = LatencyTracker(window)
+        self._tokens = max_tokens
+
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.denied = 0
+
+    def delay(self) -> Optional[float]:
+        """Seconds after which a call is hedged, None until enough samples"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        return self.latencies.percentile(self.percentile)
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        Run the primary call, hedged by another if it is slow
+
+        Args:
+            primary: Zero-argument coroutine function making the call
+            hedge: Zero-argument coroutine function making the hedge call
+
+        Returns:
+            The first successful result
+
+        Raises:
+            Exception: The primary call's error if both calls fail
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        self.calls += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.budget_ratio)
+
+        first = asyncio.ensure_future(primary())
+        tasks: Set[asyncio.Future] = {first}
+        try:
+            delay = self.delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        self.hedged += 1
+                        tasks.add(asyncio.ensure_future(hedge()))
+                    else:
+                        self.denied += 1
+
+            while True:
+                done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                if winner is not None:
+                    break
+                if not pending:
+                    return first.result()
+                tasks = pending
+
+            if winner is not first:
+                self.hedge_wins += 1
+            self.latencies.add(loop.time() - start)
+            return winner.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hedging counters"""
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedgeWins": self.hedge_wins,
+            "denied": self.denied,
+            "delaySeconds": self.delay(),
+            "percentile": self.percentile,
+        }
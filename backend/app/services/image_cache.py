@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import io
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.cache import MemoryTier
+from app.utils.request_key import build_request_key, image_digest
+
+try:
+    from PIL import Image
+except ImportError:  # Perceptual matching is skipped without Pillow
+    Image = None
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Thumbnails with a smaller brightness range hash to noise or to all zeros,
+# so different low-contrast images (a blank page, a wall) would collide
+MIN_HASH_CONTRAST = 16
+
+
+def dhash(image_bytes: bytes) -> Optional[int]:
+    """
+    64-bit difference hash of an image
+
+    Each bit records whether a pixel of a 9x8 grayscale thumbnail is
+    brighter than its right neighbour, so recompressed or resized copies of
+    an image hash to nearby values.
+
+    Returns:
+        The hash, or None when Pillow is missing, the image can't be read
+        or its thumbnail is too flat to tell it apart from other images
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            # Let the JPEG decoder downscale while decoding
+            image.draft("L", (64, 64))
+            pixels = image.convert("L").resize((9, 8), Image.BILINEAR).tobytes()
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash: {str(e)}")
+        return None
+    if max(pixels) - min(pixels) < MIN_HASH_CONTRAST:
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+class HammingIndex:
+    """
+    Multi-index hash over 64-bit hashes for Hamming-radius search
+
+    Hashes are split into max_distance + 1 disjoint bit blocks. Two hashes
+    within max_distance bits agree exactly on at least one block, so a
+    search only checks the hashes sharing a block value with the query.
+
+    Args:
+        max_distance: Largest Hamming distance that can be searched
+    """
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max_distance
+        blocks = max_distance + 1
+        bounds = [64 * i // blocks for i in range(blocks + 1)]
+        self._blocks = [(low, (1 << (high - low)) - 1) for low, high in zip(bounds, bounds[1:])]
+        self._buckets: Dict[Tuple[int, int], List[Tuple[int, Any]]] = {}
+        self.size = 0
+
+    def add(self, hash_value: int, value: Any) -> None:
+        self.size += 1
+        entry = (hash_value, value)
+        for block, (shift, mask) in enumerate(self._blocks):
+            self._buckets.setdefault((block, (hash_value >> shift) & mask), []).append(entry)
+
+    def search(self, hash_value: int, max_distance: Optional[int] = None) -> List[Tuple[int, Any]]:
+        """Return (distance, value) pairs within max_distance, nearest first"""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        results = {}
+        for block, (shift, mask) in enumerate(self._blocks):
+            for entry in self._buckets.get((block, (hash_value >> shift) & mask), ()):
+                distance = (hash_value ^ entry[0]).bit_count()
+                if distance <= max_distance:
+                    # Entries matching on several blocks are reported once
+                    results[id(entry)] = (distance, entry[1])
+        return sorted(results.values(), key=lambda result: result[0])
+
+
+@dataclass
+class ImageEntry:
+    """A cached Word Cam response with the request it answered"""
+    value: bytes
+    context_key: str
+    perceptual_hash: Optional[int]
+    dimensions: Optional[Tuple[int, int]]
+    created_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.value) + 256
+
+
+@dataclass
+class ImageLookup:
+    """Result of an image cache lookup, reusable for storing the response"""
+    key: str
+    context_key: str
+    perceptual_hash: Optional[int]
+    dimensions: Optional[Tuple[int, int]]
+    entry: Optional[ImageEntry] = None
+    tier: Optional[str] = None
+
+
+class ImageResultCache:
+    """
+    Content-addressed cache of Word Cam responses
+
+    The exact tier is keyed by a digest of the decoded image bytes together
+    with the request context (feature, language pair, object) and the image
+    dimensions. The perceptual tier finds entries for the same context
+    whose image dHash is within max_distance bits, so recompressed or
+    slightly resized copies of an image also hit; their entries carry the
+    dimensions they were generated for so callers can rescale coordinates.
+    Low-contrast images are only cached exactly, see MIN_HASH_CONTRAST.
+
+    Args:
+        ttl: Seconds an entry stays valid
+        max_bytes: Memory bound of the stored responses
+        max_distance: Largest Hamming distance for a perceptual hit
+        perceptual: Whether to use the perceptual tier
+    """
+
+    def __init__(self, ttl: float, max_bytes: int, max_distance: int = 4, perceptual: bool = True):
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.perceptual = perceptual and Image is not None
+        self.entries = MemoryTier(max_bytes)
+        self._index = HammingIndex(max_distance)
+
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+
+    def _fresh(self, key: str) -> Optional[ImageEntry]:
+        entry = self.entries.get(key)
+        if entry is not None and time.time() - entry.created_at >= self.ttl:
+            self.entries.delete(key)
+            return None
+        return entry
+
+    async def lookup(
+        self,
+        feature: str,
+        context: Dict[str, Any],
+        image_bytes: bytes,
+        model: str,
+        version: str,
+        dimensions: Optional[Tuple[int, int]] = None
+    ) -> ImageLookup:
+        """
+        Look up a response for an image and request context
+
+        Args:
+            feature: Feature name (e.g. "detect_objects")
+            context: Request parameters other than the image that must match
+            image_bytes: Decoded image bytes
+            model: Name of the model producing the response
+            version: Version of the prompt template
+            dimensions: Client-declared (width, height), if relevant
+
+        Returns:
+            ImageLookup whose entry is set on a hit
+        """
+        context_key = build_request_key(feature, context, model, version)
+        key = hashlib.sha256(
+            f"{context_key}:{image_digest(image_bytes)}:{dimensions}".encode("ascii")).hexdigest()
+        lookup = ImageLookup(
+            key=key, context_key=context_key, perceptual_hash=None, dimensions=dimensions)
+
+        lookup.entry = self._fresh(key)
+        if lookup.entry is not None:
+            self.exact_hits += 1
+            lookup.tier = "exact"
+            return lookup
+
+        if self.perceptual:
+            lookup.perceptual_hash = await asyncio.to_thread(dhash, image_bytes)
+        if lookup.perceptual_hash is not None:
+            for _, (candidate_context, candidate_key) in self._index.search(
+                    lookup.perceptual_hash, self.max_distance):
+                if candidate_context != context_key:
+                    continue
+                entry = self._fresh(candidate_key)
+                if entry is not None:
+                    self.perceptual_hits += 1
+                    lookup.entry = entry
+                    lookup.tier = "perceptual"
+                    return lookup
+
+        self.misses += 1
+        return lookup
+
+    def store(self, lookup: ImageLookup, value: bytes) -> None:
+        """Store the JSON-encoded response for a missed lookup"""
+        self.entries.set(lookup.key, ImageEntry(
+            value=value,
+            context_key=lookup.context_key,
+            perceptual_hash=lookup.perceptual_hash,
+            dimensions=lookup.dimensions,
+            created_at=time.time()
+        ))
+        if lookup.perceptual_hash is not None:
+            self._index.add(lookup.perceptual_hash, (lookup.context_key, lookup.key))
+            # Evicted entries stay in the index until it is rebuilt
+            if self._index.size > 2 * len(self.entries) + 1024:
+                self._rebuild_index()
+
+    def _rebuild_index(self) -> None:
+        index = HammingIndex(self.max_distance)
+        for key, entry in self.entries.items():
+            if entry.perceptual_hash is not None:
+                index.add(entry.perceptual_hash, (entry.context_key, key))
+        self._index = index
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit-rate counters and memory use"""
+        lookups = self.exact_hits + self.perceptual_hits + self.misses
+        return {
+            "exactHits": self.exact_hits,
+            "perceptualHits": self.perceptual_hits,
+            "misses": self.misses,
+            "hitRate": (self.exact_hits + self.perceptual_hits) / lookups if lookups else 0.0,
+            "evictions": self.entries.evictions,
+            "entries": len(self.entries),
+            "indexedHashes": self._index.size,
+            "memoryBytes": self.entries.current_bytes,
+            "maxMemoryBytes": self.entries.max_bytes,
+            "perceptualEnabled": self.perceptual,
+        }
+
+
+image_result_cache = ImageResultCache(
+    ttl=settings.IMAGE_CACHE_TTL_SECONDS,
+    max_bytes=settings.IMAGE_CACHE_MAX_MEMORY_BYTES,
+    max_distance=settings.IMAGE_CACHE_MAX_HASH_DISTANCE,
+    perceptual=settings.IMAGE_CACHE_PERCEPTUAL_ENABLED
+)
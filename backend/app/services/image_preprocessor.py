@@ -0,0 +1,171 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Images are sent upstream unchanged without Pillow
+    Image = None
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Formats sent upstream as-is when they are already small enough
+_EFFICIENT_FORMATS = {"JPEG", "WEBP"}
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+@dataclass
+class PreparedImage:
+    """An image ready for the vision model"""
+    data: bytes
+    mime_type: str
+    # Pixel size of data, None when the image could not be read
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def _downscale(image_bytes: bytes, max_edge: int, image_format: str, quality: int) -> Tuple[bytes, int, int]:
+    """
+    Fit an image within max_edge pixels and re-encode it
+
+    Runs in a worker process. EXIF orientation is applied before encoding
+    because the re-encoded image carries no EXIF data.
+
+    Returns:
+        Encoded bytes, width and height
+    """
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        # Let the JPEG decoder downscale by a power of two while decoding
+        image.draft("RGB", (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format=image_format, quality=quality)
+        return output.getvalue(), image.width, image.height
+
+
+class ImagePreprocessor:
+    """
+    Downscales and re-encodes images before they are sent upstream
+
+    The image header is read on the event loop to decide whether any work
+    is needed; decoding and encoding run in a process pool.
+
+    Args:
+        max_edge: Longest edge in pixels of images sent upstream
+        image_format: Pillow format for re-encoded images (JPEG or WEBP)
+        quality: Encoder quality for re-encoded images
+        workers: Size of the process pool
+        enabled: Whether to preprocess at all
+    """
+
+    def __init__(self, max_edge: int, image_format: str, quality: int, workers: int, enabled: bool = True):
+        self.max_edge = max_edge
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.workers = workers
+        self.enabled = enabled and Image is not None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+        self.processed = 0
+        self.passed_through = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _probe(self, image_bytes: bytes) -> Optional[Tuple[str, Tuple[int, int], bool]]:
+        """Return format, oriented size and whether the image needs work"""
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as image:
+                width, height = image.size
+                orientation = image.getexif().get(0x0112, 1)
+                # EXIF orientations 5-8 swap width and height
+                if orientation in (5, 6, 7, 8):
+                    width, height = height, width
+                needs_work = (
+                    max(width, height) > self.max_edge or
+                    image.format not in _EFFICIENT_FORMATS or
+                    orientation != 1
+                )
+                return image.format, (width, height), needs_work
+        except Exception:
+            return None
+
+    async def prepare(self, image_bytes: bytes, mime_type: str) -> PreparedImage:
+        """
+        Prepare an image for the vision model
+
+        Args:
+            image_bytes: Decoded image bytes
+            mime_type: MIME type of the image
+
+        Returns:
+            The downscaled image, or the original when it is already small,
+            can't be read or preprocessing is disabled
+        """
+        if not self.enabled:
+            return PreparedImage(data=image_bytes, mime_type=mime_type)
+
+        probe = self._probe(image_bytes)
+        if probe is None:
+            self.passed_through += 1
+            return PreparedImage(data=image_bytes, mime_type=mime_type)
+        image_format, (width, height), needs_work = probe
+        if not needs_work:
+            self.passed_through += 1
+            return PreparedImage(
+                data=image_bytes, mime_type=_MIME_TYPES.get(image_format, mime_type),
+                width=width, height=height)
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        try:
+            data, width, height = await loop.run_in_executor(
+                self._executor, _downscale, image_bytes,
+                self.max_edge, self.image_format, self.quality)
+        except Exception as e:
+            self.failures += 1
+            logger.warning(f"Image preprocessing failed, sending original: {str(e)}")
+            return PreparedImage(data=image_bytes, mime_type=mime_type)
+
+        self.processed += 1
+        self.bytes_in += len(image_bytes)
+        self.bytes_out += len(data)
+        return PreparedImage(
+            data=data, mime_type=_MIME_TYPES[self.image_format], width=width, height=height)
+
+    def close(self) -> None:
+        """Shut down the worker processes"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return preprocessing counters"""
+        return {
+            "processed": self.processed,
+            "passedThrough": self.passed_through,
+            "failures": self.failures,
+            "bytesIn": self.bytes_in,
+            "bytesOut": self.bytes_out,
+            "maxEdge": self.max_edge,
+            "format": self.image_format,
+        }
+
+
+image_preprocessor = ImagePreprocessor(
+    max_edge=settings.IMAGE_MAX_EDGE_PX,
+    image_format=settings.IMAGE_REENCODE_FORMAT,
+    quality=settings.IMAGE_REENCODE_QUALITY,
+    workers=settings.IMAGE_PREPROCESS_WORKERS,
+    enabled=settings.IMAGE_PREPROCESS_ENABLED
+)
@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.cache import MemoryTier
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+_IMAGE_ID = re.compile(r"^[0-9a-f]{64}$")
+
+
+@dataclass
+class StoredImage:
+    """An uploaded image held for later Word Cam requests"""
+    data: bytes
+    mime_type: str
+    created_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+
+class ImageStore:
+    """
+    Short-lived store of uploaded images addressed by content hash
+
+    Clients upload an image once and refer to it by ID in subsequent Word
+    Cam requests. Images live in a byte-bounded LRU in memory; when a spill
+    directory is configured, evicted images are written there and read back
+    on demand until they expire.
+
+    Args:
+        ttl: Seconds an image stays available after upload
+        max_bytes: Memory bound of the stored images
+        spill_dir: Directory for images evicted from memory, disabled when empty
+    """
+
+    def __init__(self, ttl: float, max_bytes: int, spill_dir: str = ""):
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.images = MemoryTier(max_bytes, on_evict=self._on_evict)
+        self._pending_spill: List[Tuple[str, StoredImage]] = []
+        self._last_sweep = time.time()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+        self.uploads = 0
+        self.memory_hits = 0
+        self.spill_hits = 0
+        self.misses = 0
+        self.spilled = 0
+
+    @staticmethod
+    def image_id(image_bytes: bytes) -> str:
+        """Return the content-hash ID of an image"""
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def _spill_path(self, image_id: str) -> str:
+        return os.path.join(self.spill_dir, image_id)
+
+    def _on_evict(self, image_id: str, image: StoredImage) -> None:
+        if self.spill_dir and time.time() - image.created_at < self.ttl:
+            self._pending_spill.append((image_id, image))
+
+    def _write_spilled(self, images: List[Tuple[str, StoredImage]]) -> None:
+        for image_id, image in images:
+            path = self._spill_path(image_id)
+            try:
+                with open(path + ".tmp", "wb") as f:
+                    f.write(image.mime_type.encode("ascii") + b"\n" + image.data)
+                os.replace(path + ".tmp", path)
+                os.utime(path, (image.created_at, image.created_at))
+                self.spilled += 1
+            except OSError as e:
+                logger.warning(f"Could not spill image {image_id}: {str(e)}")
+
+    def _read_spilled(self, image_id: str) -> Optional[StoredImage]:
+        path = self._spill_path(image_id)
+        try:
+            created_at = os.path.getmtime(path)
+            if time.time() - created_at >= self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                mime_type, data = f.read().split(b"\n", 1)
+        except (OSError, ValueError):
+            return None
+        return StoredImage(data=data, mime_type=mime_type.decode("ascii"), created_at=created_at)
+
+    def _sweep_spilled(self) -> None:
+        """Delete spilled images past their TTL"""
+        expired_before = time.time() - self.ttl
+        for entry in os.scandir(self.spill_dir):
+            try:
+                if entry.is_file() and entry.stat().st_mtime < expired_before:
+                    os.remove(entry.path)
+            except OSError:
+                continue
+
+    async def _flush(self) -> None:
+        if self._pending_spill:
+            pending, self._pending_spill = self._pending_spill, []
+            await asyncio.to_thread(self._write_spilled, pending)
+        if self.spill_dir and time.time() - self._last_sweep >= 60:
+            self._last_sweep = time.time()
+            await asyncio.to_thread(self._sweep_spilled)
+
+    async def put(self, image_bytes: bytes, mime_type: str) -> str:
+        """
+        Store an image, restarting its TTL if it is already stored
+
+        Args:
+            image_bytes: Decoded image bytes
+            mime_type: MIME type of the image
+
+        Returns:
+            The image ID
+        """
+        image_id = self.image_id(image_bytes)
+        self.uploads += 1
+        self.images.set(image_id, StoredImage(
+            data=image_bytes, mime_type=mime_type, created_at=time.time()))
+        await self._flush()
+        return image_id
+
+    async def get(self, image_id: str) -> Optional[StoredImage]:
+        """
+        Return a stored image
+
+        Args:
+            image_id: ID returned by put
+
+        Returns:
+            The image, or None if it is unknown or expired
+        """
+        if not _IMAGE_ID.match(image_id):
+            self.misses += 1
+            return None
+
+        image = self.images.get(image_id)
+        if image is not None and time.time() - image.created_at >= self.ttl:
+            self.images.delete(image_id)
+            image = None
+        if image is not None:
+            self.memory_hits += 1
+            return image
+
+        if self.spill_dir:
+            image = await asyncio.to_thread(self._read_spilled, image_id)
+            if image is not None:
+                self.spill_hits += 1
+                self.images.set(image_id, image)
+                await self._flush()
+                return image
+
+        self.misses += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return store counters and memory use"""
+        return {
+            "uploads": self.uploads,
+            "memoryHits": self.memory_hits,
+            "spillHits": self.spill_hits,
+            "misses": self.misses,
+            "evictions": self.images.evictions,
+            "spilled": self.spilled,
+            "images": len(self.images),
+            "memoryBytes": self.images.current_bytes,
+            "maxMemoryBytes": self.images.max_bytes,
+            "ttlSeconds": self.ttl,
+        }
+
+
+image_store = ImageStore(
+    ttl=settings.IMAGE_STORE_TTL_SECONDS,
+    max_bytes=settings.IMAGE_STORE_MAX_MEMORY_BYTES,
+    spill_dir=settings.IMAGE_STORE_SPILL_DIR
+)
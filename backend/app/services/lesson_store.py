@@ -0,0 +1,70 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from app.config import settings
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class LessonStore:
+    """
+    Durable store of pre-generated responses keyed by request key
+
+    Written by the offline pre-generation CLI and read by the response
+    cache, so stored combinations are served without calling Gemini.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS lessons ("
+            "key TEXT PRIMARY KEY, feature TEXT NOT NULL, request TEXT NOT NULL, "
+            "value BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the stored JSON response for a key"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM lessons WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def has(self, key: str) -> bool:
+        """Check whether a response is stored for a key"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM lessons WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    def put(self, key: str, feature: str, request: Dict[str, Any], value: bytes) -> None:
+        """Store a JSON response together with the request that produced it"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO lessons (key, feature, request, value, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, feature, json.dumps(request, ensure_ascii=False), value, time.time())
+            )
+            self._conn.commit()
+
+    def requests(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield the feature and request of every stored response"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT feature, request FROM lessons").fetchall()
+        for feature, request in rows:
+            yield feature, json.loads(request)
+
+
+lesson_store = LessonStore(
+    settings.LESSON_STORE_PATH) if settings.LESSON_STORE_PATH else None
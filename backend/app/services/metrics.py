@@ -0,0 +1,301 @@
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Upper bounds of latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+# A collected sample: metric name, type, help, label names and values by labels
+Collected = Tuple[str, str, str, Sequence[str], Dict[LabelValues, float]]
+
+
+class Counter:
+    """
+    Monotonic count per label combination
+
+    Metrics are only updated from the event loop thread, so updates are
+    plain dictionary operations without locks.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"samples": [[list(labels), value] for labels, value in self.values.items()]}
+
+
+class Gauge(Counter):
+    """Current value per label combination"""
+
+    kind = "gauge"
+
+    def set(self, value: float, *labels: str) -> None:
+        self.values[labels] = value
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram:
+    """
+    Distribution of observed values per label combination
+
+    Each label combination keeps a count per bucket, the sum and the count
+    of observations; an observation is a binary search and two additions.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # Per labels: [bucket counts..., +Inf count], sum
+        self.values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "buckets": list(self.buckets),
+            "samples": [[list(labels), [counts, total]] for labels, (counts, total) in self.values.items()],
+        }
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """
+    Process metrics, exposed in the Prometheus text format
+
+    Besides metrics updated as things happen, collectors read counters the
+    services already keep at scrape time, at no cost per request.
+
+    With several worker processes, each writes its snapshot to a shared
+    directory and any worker answering a scrape merges the fresh snapshots:
+    counters and histograms are summed, as are gauges, so a gauge reads as
+    the total across workers.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: List[Callable[[], Iterable[Collected]]] = []
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Collected]]) -> None:
+        """
+        Add a function returning samples read at scrape time
+
+        Args:
+            collector: Returns (name, type, help, label names, values by
+                label values) tuples for counters and gauges
+        """
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as JSON-serializable data"""
+        snapshot = {
+            name: {"type": metric.kind, "help": metric.help, "labels": list(metric.labelnames), **metric.snapshot()}
+            for name, metric in self._metrics.items()
+        }
+        for collector in self._collectors:
+            try:
+                collected = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {str(e)}")
+                continue
+            for name, kind, help, labelnames, values in collected:
+                snapshot[name] = {
+                    "type": kind, "help": help, "labels": list(labelnames),
+                    "samples": [[list(labels), value] for labels, value in values.items()],
+                }
+        return snapshot
+
+    @staticmethod
+    def _write(path: str, data: str) -> None:
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(data)
+        # Readers never see a partly written file
+        os.replace(temp_path, path)
+
+    async def write_snapshots(self, directory: str, interval: float) -> None:
+        """
+        Write this worker's snapshot to the shared directory every interval
+        seconds, until cancelled
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"metrics-{os.getpid()}.json")
+        while True:
+            try:
+                # Taken on the event loop, which is the only writer of the metrics
+                data = json.dumps(self.snapshot())
+                await asyncio.to_thread(self._write, path, data)
+            except OSError as e:
+                logger.warning(f"Failed to write metrics snapshot: {str(e)}")
+            await asyncio.sleep(interval)
+
+    def remove_snapshot(self, directory: str) -> None:
+        """Remove this worker's snapshot, when it shuts down"""
+        try:
+            os.remove(os.path.join(directory, f"metrics-{os.getpid()}.json"))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def read_snapshots(directory: str, max_age: float) -> List[Dict[str, Any]]:
+        """
+        Read the snapshots of other workers
+
+        Snapshots not written for max_age seconds belong to workers that
+        are gone and are skipped.
+        """
+        snapshots = []
+        own = f"metrics-{os.getpid()}.json"
+        now = time.time()
+        if not os.path.isdir(directory):
+            return snapshots
+        for entry in os.scandir(directory):
+            if not entry.name.startswith("metrics-") or not entry.name.endswith(".json") or entry.name == own:
+                continue
+            try:
+                if now - entry.stat().st_mtime > max_age:
+                    continue
+                with open(entry.path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                # Removed or replaced while being read
+                continue
+        return snapshots
+
+    @staticmethod
+    def merge(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Sum snapshots from several workers into one"""
+        merged: Dict[str, Any] = {}
+        for snapshot in snapshots:
+            for name, metric in snapshot.items():
+                target = merged.get(name)
+                if target is None:
+                    target = merged[name] = {**metric, "samples": {}}
+                for labels, value in metric["samples"]:
+                    key = tuple(labels)
+                    if metric["type"] == "histogram":
+                        counts, total = value
+                        current = target["samples"].get(key)
+                        if current is None:
+                            target["samples"][key] = [list(counts), total]
+                        else:
+                            current[0] = [a + b for a, b in zip(current[0], counts)]
+                            current[1] += total
+                    else:
+                        target["samples"][key] = target["samples"].get(key, 0) + value
+        for metric in merged.values():
+            metric["samples"] = [[list(labels), value] for labels, value in metric["samples"].items()]
+        return merged
+
+    @staticmethod
+    def render(snapshot: Dict[str, Any]) -> str:
+        """Render a snapshot in the Prometheus text exposition format"""
+        lines = []
+        for name, metric in snapshot.items():
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            labelnames = metric["labels"]
+            for labels, value in metric["samples"]:
+                if metric["type"] != "histogram":
+                    lines.append(f"{name}{_labels(labelnames, labels)} {_number(value)}")
+                    continue
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(metric["buckets"]) + [float("inf")], counts):
+                    cumulative += count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{name}_bucket{_labels(labelnames, labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labelnames, labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labelnames, labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+# Create global metrics registry
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Time to respond to HTTP requests, by route",
+    ("method", "route", "status"))
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight", "HTTP requests being handled")
+upstream_request_duration = metrics.histogram(
+    "gemini_request_duration_seconds",
+    "Duration of non-streaming Gemini calls once admitted, by model and feature",
+    ("model", "feature", "outcome"))
+function_call_failures = metrics.counter(
+    "gemini_function_call_failures_total",
+    "Gemini responses without the expected function call, by feature",
+    ("feature",))
+image_bytes_total = metrics.counter(
+    "image_bytes_total", "Bytes of Word Cam images received and sent upstream",
+    ("stage",))
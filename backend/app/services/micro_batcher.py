@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, Set, TypeVar, Union
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+
+def _copy_error(error: Exception) -> Exception:
+    """
+    Return a copy of an error to raise in one of several waiters
+
+    Raising one instance in several tasks would add every task's frames to
+    its traceback. The copy keeps the type, so handlers still map it the
+    same way, and the attributes and traceback of the original.
+    """
+    copy = error.__class__.__new__(error.__class__, *error.args)
+    copy.args = error.args
+    copy.__dict__.update(getattr(error, "__dict__", {}))
+    copy.__cause__ = error.__cause__
+    copy.__context__ = error.__context__
+    copy.__suppress_context__ = error.__suppress_context__
+    return copy.with_traceback(error.__traceback__)
+
+
+@dataclass
+class _Batch:
+    items: List[Any] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class MicroBatcher(Generic[ItemT, ResultT]):
+    """
+    Merges concurrent compatible requests into one upstream call
+
+    Items submitted under the same group key within max_wait seconds of the
+    first one are executed together, up to max_size items per batch. The
+    execute function receives the group key and the items and returns one
+    result or exception per item, in order.
+
+    Args:
+        execute: Coroutine function running a batch
+        max_size: Items at which a batch is sent without waiting
+        max_wait: Seconds the first item of a batch waits for others
+    """
+
+    def __init__(
+        self,
+        execute: Callable[[Hashable, List[ItemT]], Awaitable[List[Union[ResultT, Exception]]]],
+        max_size: int,
+        max_wait: float
+    ):
+        self._execute = execute
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending: Dict[Hashable, _Batch] = {}
+        # Strong references to running batches, which the loop only holds weakly
+        self._running: Set[asyncio.Task] = set()
+
+        self.submitted = 0
+        self.batches = 0
+        self.failures = 0
+
+    async def submit(self, group: Hashable, item: ItemT) -> ResultT:
+        """
+        Add an item to the open batch of its group and wait for its result
+
+        Args:
+            group: Key of the requests the item can be merged with
+            item: The request item
+
+        Returns:
+            The item's result
+
+        Raises:
+            Exception: The item's error, or the batch's if the call failed
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._pending.get(group)
+        if batch is None:
+            batch = self._pending[group] = _Batch()
+            batch.timer = loop.call_later(self.max_wait, self._flush, group, batch)
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        self.submitted += 1
+        if len(batch.items) >= self.max_size:
+            self._flush(group, batch)
+        return await future
+
+    def _flush(self, group: Hashable, batch: _Batch) -> None:
+        if self._pending.get(group) is batch:
+            del self._pending[group]
+        batch.timer.cancel()
+        self.batches += 1
+        task = asyncio.create_task(self._run(group, batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run(self, group: Hashable, batch: _Batch) -> None:
+        try:
+            results = await self._execute(group, batch.items)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Batch of {len(batch.items)} items failed: {str(e)}")
+            results = [_copy_error(e) for _ in batch.items]
+
+        for future, result in zip(batch.futures, results):
+            # A caller that gave up leaves a cancelled future behind
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batching counters"""
+        return {
+            "submitted": self.submitted,
+            "batches": self.batches,
+            # Requests that joined another request's batch
+            "merged": self.submitted - self.batches,
+            "failures": self.failures,
+            "maxSize": self.max_size,
+            "maxWaitSeconds": self.max_wait,
+        }
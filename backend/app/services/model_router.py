@@ -0,0 +1,195 @@
+import logging
+import random
+import statistics
+from bisect import bisect_left
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterable, Optional, Tuple
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Set per request from the client's hint that it prefers a fast answer
+prefer_fast: ContextVar[bool] = ContextVar("prefer_fast", default=False)
+
+
+class Generation:
+    """
+    Whether any text call of one generation was answered by a fallback model
+
+    Answers of the fast model stand in for the primary's during a single
+    request; code that shares a result between clients sets a Generation
+    as current_generation and doesn't share it when fallback is set. Tasks
+    started during the generation inherit the same object.
+    """
+
+    def __init__(self):
+        self.fallback = False
+
+
+current_generation: ContextVar[Optional[Generation]] = ContextVar("current_generation", default=None)
+
+
+def mark_fallback() -> None:
+    """Record that the current generation used a model other than the primary"""
+    generation = current_generation.get()
+    if generation is not None:
+        generation.fallback = True
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, float("inf"))
+
+
+class ModelHealth:
+    """
+    Recent latency and error rate of one model, and a latency histogram
+
+    Args:
+        recent: Number of recent calls health is judged on
+    """
+
+    def __init__(self, recent: int = 10):
+        self._latencies: Deque[float] = deque(maxlen=recent)
+        self._errors: Deque[bool] = deque(maxlen=recent)
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, latency: Optional[float], error: bool) -> None:
+        self.calls += 1
+        self._errors.append(error)
+        if error:
+            self.errors += 1
+        if latency is not None:
+            self._latencies.append(latency)
+            self.histogram[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def latency(self) -> Optional[float]:
+        """Median latency of recent successful calls"""
+        return statistics.median(self._latencies) if self._latencies else None
+
+    def error_rate(self) -> float:
+        """Share of recent calls that failed"""
+        return sum(self._errors) / len(self._errors) if self._errors else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "recentLatencySeconds": self.latency(),
+            "recentErrorRate": self.error_rate(),
+            "latencyHistogram": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in zip(LATENCY_BUCKETS, self.histogram)
+            },
+        }
+
+
+class ModelRouter:
+    """
+    Picks the model for each text request
+
+    Requests go to the primary model unless the client hinted it prefers a
+    fast answer, the feature is configured for the fast model, or the
+    primary is unhealthy: its recent median latency is above max_latency,
+    its recent error rate is above max_error_rate, or more than max_queue
+    text calls are waiting for a slot. While the primary is unhealthy a
+    share probe_ratio of its requests still go to it, so that its recovery
+    is noticed.
+
+    Args:
+        primary: Model used by default
+        fast: Faster, cheaper model to fall back to
+        fast_features: Features always served by the fast model
+        max_latency: Seconds of recent primary latency before falling back
+        max_error_rate: Recent primary error rate before falling back
+        max_queue: Waiting text calls before falling back
+        probe_ratio: Share of requests still sent to an unhealthy primary
+    """
+
+    def __init__(
+        self,
+        primary: str,
+        fast: str,
+        fast_features: Iterable[str] = (),
+        max_latency: float = 10.0,
+        max_error_rate: float = 0.2,
+        max_queue: int = 16,
+        probe_ratio: float = 0.05
+    ):
+        self.primary = primary
+        self.fast = fast
+        self.fast_features = set(fast_features)
+        self.max_latency = max_latency
+        self.max_error_rate = max_error_rate
+        self.max_queue = max_queue
+        self.probe_ratio = probe_ratio
+        self.health: Dict[str, ModelHealth] = {}
+        self.decisions: Counter = Counter()
+
+    def _health(self, model: str) -> ModelHealth:
+        health = self.health.get(model)
+        if health is None:
+            health = self.health[model] = ModelHealth()
+        return health
+
+    def _primary_problem(self, queue_depth: int) -> Optional[str]:
+        """Why the primary shouldn't take requests, None if it is healthy"""
+        health = self._health(self.primary)
+        latency = health.latency()
+        if latency is not None and latency > self.max_latency:
+            return "slow"
+        if health.error_rate() > self.max_error_rate:
+            return "errors"
+        if queue_depth > self.max_queue:
+            return "queue"
+        return None
+
+    def choose(self, feature: Optional[str], queue_depth: int = 0) -> Tuple[str, str]:
+        """
+        Pick the model for a request
+
+        Args:
+            feature: Feature making the request, None if unknown
+            queue_depth: Text calls currently waiting for a slot
+
+        Returns:
+            The model and the reason it was picked
+        """
+        if prefer_fast.get():
+            model, reason = self.fast, "fastHint"
+        elif feature in self.fast_features:
+            model, reason = self.fast, "fastFeature"
+        else:
+            problem = self._primary_problem(queue_depth)
+            if problem is None:
+                model, reason = self.primary, "default"
+            elif random.random() < self.probe_ratio:
+                model, reason = self.primary, "probe"
+            else:
+                model, reason = self.fast, problem
+        self.decisions[(feature or "other", model, reason)] += 1
+        return model, reason
+
+    def record(self, model: str, latency: Optional[float], error: bool = False) -> None:
+        """
+        Record the outcome of a call
+
+        Args:
+            model: Model called
+            latency: Seconds a successful call took, None if not comparable
+            error: Whether the call failed because of the upstream
+        """
+        self._health(model).record(latency, error)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return routing decisions and per-model health"""
+        decisions: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for (feature, model, reason), count in self.decisions.items():
+            decisions.setdefault(feature, {}).setdefault(model, {})[reason] = count
+        return {
+            "primary": self.primary,
+            "fast": self.fast,
+            "decisions": decisions,
+            "models": {model: health.stats() for model, health in self.health.items()},
+        }
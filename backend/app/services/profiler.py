@@ -0,0 +1,168 @@
+import hmac
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+
+from app.config import settings
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads from a background thread
+
+    Sampling costs the profiled code next to nothing beyond sharing the GIL,
+    unlike tracing every call. Samples of the event loop thread include
+    whatever other requests were running at the time.
+
+    Args:
+        interval: Seconds between samples
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        """Stop sampling and return the sample count per stack"""
+        self._stopped.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stopped.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    @staticmethod
+    def collapsed(samples: Counter) -> str:
+        """Render samples in the collapsed stack format read by flame graph tools"""
+        return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+class RequestProfiler:
+    """
+    Decides which requests run under the sampling profiler and saves profiles
+
+    A request is profiled when it carries the admin token in the X-Profile
+    header, or at random with probability sample_rate. One request is
+    profiled at a time per worker, since samples cover the whole process.
+
+    Args:
+        directory: Directory profiles are saved to
+        sample_rate: Share of requests profiled at random
+        admin_token: Token a request must send to be profiled on demand,
+            on-demand profiling is disabled when empty
+        interval: Seconds between samples
+        max_files: Profiles kept, the oldest are removed
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.0,
+        admin_token: str = "",
+        interval: float = 0.005,
+        max_files: int = 100
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.interval = interval
+        self.max_files = max_files
+        self._active = False
+        self.profiled = 0
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        """Whether a request's X-Profile header carries the admin token"""
+        return bool(self.admin_token and token) and hmac.compare_digest(token, self.admin_token)
+
+    def start(self, token: Optional[str]) -> Optional[SamplingProfiler]:
+        """
+        Start profiling a request if it is flagged or sampled
+
+        Args:
+            token: Value of the request's X-Profile header
+
+        Returns:
+            The running profiler, None if the request isn't profiled
+        """
+        if self._active:
+            return None
+        if not self.is_admin(token) and random.random() >= self.sample_rate:
+            return None
+        self._active = True
+        profiler = SamplingProfiler(self.interval)
+        profiler.start()
+        return profiler
+
+    def finish(self, profiler: SamplingProfiler, method: str, route: str, seconds: float) -> str:
+        """
+        Stop a profiler and save its profile
+
+        Blocks on file I/O, so it is run in a thread.
+
+        Returns:
+            Name of the saved profile
+        """
+        try:
+            samples = profiler.stop()
+        finally:
+            self._active = False
+        self.profiled += 1
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+        name = (f"{time.strftime('%Y%m%dT%H%M%S')}-{method}-{slug}-"
+                f"{seconds * 1000:.0f}ms-{os.getpid()}.folded")
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, name), "w") as f:
+            f.write(SamplingProfiler.collapsed(samples))
+        self._prune()
+        return name
+
+    def _prune(self) -> None:
+        """Remove the oldest profiles beyond max_files"""
+        profiles: List[os.DirEntry] = [
+            entry for entry in os.scandir(self.directory) if entry.name.endswith(".folded")]
+        if len(profiles) <= self.max_files:
+            return
+        profiles.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in profiles[:len(profiles) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+# Create global request profiler, None unless profiling is enabled
+request_profiler = RequestProfiler(
+    directory=settings.PROFILING_DIR,
+    sample_rate=settings.PROFILING_SAMPLE_RATE,
+    admin_token=settings.PROFILING_ADMIN_TOKEN,
+    interval=settings.PROFILING_INTERVAL_SECONDS,
+    max_files=settings.PROFILING_MAX_FILES
+) if settings.PROFILING_ENABLED else None
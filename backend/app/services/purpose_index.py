@@ -0,0 +1,307 @@
+import logging
+import re
+import unicodedata
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.lesson_store import LessonStore
+from app.utils.request_key import normalize_text
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Words that carry no meaning for matching purposes
+STOPWORDS = frozenset({
+    "a", "an", "the", "at", "in", "on", "to", "for", "of", "with", "by",
+    "from", "and", "or", "my", "your", "our", "some", "any", "this", "that",
+    "i", "we", "you", "me", "is", "are", "be", "how", "when", "while",
+})
+
+_NON_WORD = re.compile(r"[\W_]+")
+_SUFFIXES = ("ing", "ed", "es", "s")
+_EMPTY_BIN = 1 << 40
+_BIN_OFFSET = 1 << 32
+
+Scope = Tuple[str, ...]
+
+
+def purpose_scope(feature: str, source_language: str, target_language: str) -> Scope:
+    """Return the index partition for a feature and language pair"""
+    return (feature, normalize_text(source_language), normalize_text(target_language))
+
+
+def _stem(word: str) -> str:
+    """Strip common English inflections from longer words"""
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+
+def normalize_purpose(purpose: str) -> str:
+    """
+    Normalize a purpose string for similarity matching
+
+    Applies NFKC, casefolding, punctuation removal, stopword stripping and
+    light suffix stemming.
+    """
+    text = unicodedata.normalize("NFKC", purpose).casefold()
+    words = [_stem(word) for word in _NON_WORD.sub(" ", text).split()
+             if word not in STOPWORDS]
+    return " ".join(words)
+
+
+def one_edit_apart(a: str, b: str) -> bool:
+    """Whether two words differ by one inserted, deleted or replaced letter"""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            # Skip the differing letter of the longer word, or of both
+            return a[i + (len(a) == len(b)):] == b[i + 1:]
+    # Equal up to the shorter one: a single trailing letter may differ
+    return len(a) != len(b)
+
+
+def shingles(text: str, size: int = 3) -> FrozenSet[str]:
+    """Return the character n-grams of a normalized string"""
+    padded = f" {text} "
+    if len(padded) <= size:
+        return frozenset([padded])
+    return frozenset(padded[i:i + size] for i in range(len(padded) - size + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two shingle sets"""
+    if not a or not b:
+        return 0.0
+    intersection = len(a & b)
+    return intersection / (len(a) + len(b) - intersection)
+
+
+@dataclass
+class _Entry:
+    scope: Scope
+    purpose: str
+    normalized: str
+    words: FrozenSet[str]
+    shingles: FrozenSet[str]
+    bucket_keys: Tuple[Tuple[int, Tuple[int, ...]], ...]
+
+
+class PurposeIndex:
+    """
+    MinHash/LSH index of previously seen purposes per scope
+
+    Purposes are normalized, split into character shingles and hashed into
+    LSH bands. A lookup compares the query only against purposes sharing at
+    least one band bucket and returns the most similar one whose Jaccard
+    similarity reaches the threshold. A similar purpose is rejected when
+    one of its content words is a letter away from one of the query's
+    ("buying a cat", "buying a car"): such words name different things.
+
+    Args:
+        threshold: Minimum Jaccard similarity for a match
+        bands: Number of LSH bands
+        rows: Number of MinHash values per band
+        max_entries: Oldest purposes are evicted beyond this many
+        max_bucket_size: Buckets holding more purposes are skipped on lookup
+    """
+
+    def __init__(
+        self,
+        threshold: float,
+        bands: int = 8,
+        rows: int = 4,
+        max_entries: int = 100_000,
+        max_bucket_size: int = 32
+    ):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.max_entries = max_entries
+        self.max_bucket_size = max_bucket_size
+
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._exact: Dict[Tuple[Scope, str], int] = {}
+        self._buckets: Dict[Tuple[Scope, int, Tuple[int, ...]], Set[int]] = {}
+        self._next_id = 0
+
+        self.lookups = 0
+        self.exact_matches = 0
+        self.similar_matches = 0
+        self.rejected_matches = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _bucket_keys(self, shingle_set: FrozenSet[str]) -> Tuple[Tuple[int, Tuple[int, ...]], ...]:
+        # One-permutation MinHash: each shingle is hashed once into a bin
+        # and every bin keeps its minimum; empty bins borrow from the next
+        # non-empty one so that signatures stay comparable
+        num_bins = self.bands * self.rows
+        signature = [_EMPTY_BIN] * num_bins
+        for shingle in shingle_set:
+            h = zlib.crc32(shingle.encode("utf-8"))
+            value = h // num_bins
+            bin_index = h % num_bins
+            if value < signature[bin_index]:
+                signature[bin_index] = value
+        for i in range(num_bins):
+            if signature[i] == _EMPTY_BIN:
+                for offset in range(1, num_bins):
+                    borrowed = signature[(i + offset) % num_bins]
+                    if borrowed != _EMPTY_BIN:
+                        signature[i] = borrowed + offset * _BIN_OFFSET
+                        break
+        return tuple(
+            (band, tuple(signature[band * self.rows:(band + 1) * self.rows]))
+            for band in range(self.bands)
+        )
+
+    def lookup(self, scope: Scope, purpose: str) -> Optional[str]:
+        """
+        Find a stored purpose similar to the given one
+
+        Args:
+            scope: Partition to search, e.g. (feature, source, target)
+            purpose: Purpose to look up
+
+        Returns:
+            The closest stored purpose, or None when nothing is close enough
+        """
+        self.lookups += 1
+        normalized = normalize_purpose(purpose)
+        entry_id = self._exact.get((scope, normalized))
+        if entry_id is not None:
+            self.exact_matches += 1
+            return self._entries[entry_id].purpose
+
+        query = shingles(normalized)
+        words = frozenset(normalized.split())
+        candidates: Set[int] = set()
+        for band, values in self._bucket_keys(query):
+            bucket = self._buckets.get((scope, band, values), ())
+            # Buckets shared by many purposes come from common phrases
+            # ("at the airport") and carry little signal, like stopwords
+            if len(bucket) <= self.max_bucket_size:
+                candidates.update(bucket)
+
+        # Jaccard >= t is impossible unless the set sizes are within 1/t
+        min_size = len(query) * self.threshold
+        max_size = len(query) / self.threshold if self.threshold else float("inf")
+        best_purpose, best_score = None, self.threshold
+        for candidate_id in candidates:
+            entry = self._entries[candidate_id]
+            if not min_size <= len(entry.shingles) <= max_size:
+                continue
+            score = jaccard(query, entry.shingles)
+            if score < best_score:
+                continue
+            # Shingles overlap heavily between words a letter apart, which
+            # name different things
+            if self._misspelled_word(words, entry.words):
+                self.rejected_matches += 1
+                continue
+            best_purpose, best_score = entry.purpose, score
+
+        if best_purpose is not None:
+            self.similar_matches += 1
+        return best_purpose
+
+    @staticmethod
+    def _misspelled_word(words: FrozenSet[str], other: FrozenSet[str]) -> bool:
+        """Whether a word of one set only is a letter away from a word of the other only"""
+        missing = other - words
+        return any(one_edit_apart(word, candidate)
+                   for word in words - other for candidate in missing)
+
+    def add(self, scope: Scope, purpose: str) -> None:
+        """Store a purpose, evicting the oldest one if the index is full"""
+        normalized = normalize_purpose(purpose)
+        if (scope, normalized) in self._exact:
+            return
+
+        shingle_set = shingles(normalized)
+        entry = _Entry(
+            scope=scope,
+            purpose=purpose,
+            normalized=normalized,
+            words=frozenset(normalized.split()),
+            shingles=shingle_set,
+            bucket_keys=self._bucket_keys(shingle_set)
+        )
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        self._exact[(scope, normalized)] = entry_id
+        for band, values in entry.bucket_keys:
+            self._buckets.setdefault((scope, band, values), set()).add(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._evict_oldest()
+
+    def _evict_oldest(self) -> None:
+        entry_id, entry = self._entries.popitem(last=False)
+        del self._exact[(entry.scope, entry.normalized)]
+        for band, values in entry.bucket_keys:
+            bucket = self._buckets[(entry.scope, band, values)]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[(entry.scope, band, values)]
+
+    def resolve(self, scope: Scope, purpose: str) -> str:
+        """
+        Map a purpose onto a similar stored one, storing it if none exists
+
+        Returns:
+            The purpose under which the lesson should be generated and cached
+        """
+        match = self.lookup(scope, purpose)
+        if match is not None:
+            return match
+        self.add(scope, purpose)
+        return purpose
+
+    def stats(self) -> Dict[str, float]:
+        """Return index counters"""
+        return {
+            "entries": len(self._entries),
+            "lookups": self.lookups,
+            "exactMatches": self.exact_matches,
+            "similarMatches": self.similar_matches,
+            "rejectedMatches": self.rejected_matches,
+            "threshold": self.threshold,
+        }
+
+
+purpose_index = PurposeIndex(
+    threshold=settings.PURPOSE_MATCH_THRESHOLD,
+    max_entries=settings.PURPOSE_INDEX_MAX_ENTRIES
+)
+
+
+def load_stored_purposes(index: PurposeIndex, store: LessonStore) -> int:
+    """
+    Add the purposes of pre-generated lessons to the index
+
+    Near-identical request purposes then resolve onto stored lessons.
+
+    Returns:
+        Number of purposes loaded
+    """
+    loaded = 0
+    for feature, request in store.requests():
+        if "purpose" in request:
+            index.add(
+                purpose_scope(
+                    feature, request["sourceLanguage"], request["targetLanguage"]),
+                request["purpose"]
+            )
+            loaded += 1
+    return loaded
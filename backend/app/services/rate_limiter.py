@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class MemoryRateLimitBackend:
+    """
+    Token buckets held in this process
+
+    Buckets are kept in least recently used order. A bucket idle long
+    enough to refill completely is the same as no bucket, so such buckets
+    are dropped from the old end as new checks arrive. At most max_clients
+    buckets are kept.
+
+    Args:
+        max_clients: Largest number of buckets kept
+    """
+    blocking = False
+
+    def __init__(self, max_clients: int):
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self.evicted = 0
+
+    def take(self, client_id: str, capacity: float, rate: float, cost: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            tokens = capacity
+        else:
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            self._buckets.move_to_end(client_id)
+
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[client_id] = (tokens, now)
+
+        # Drop buckets that have refilled; each is dropped once, so this
+        # is constant time per check on average
+        idle_seconds = capacity / rate
+        while self._buckets:
+            _, oldest_at = next(iter(self._buckets.values()))
+            if now - oldest_at < idle_seconds and len(self._buckets) <= self.max_clients:
+                break
+            self._buckets.popitem(last=False)
+            self.evicted += 1
+
+        return allowed, tokens
+
+    def clients(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteRateLimitBackend:
+    """
+    Token buckets in a SQLite file shared by all workers on a host
+
+    Each check is a single upsert, which SQLite applies atomically across
+    processes. Buckets idle long enough to have refilled are deleted
+    periodically, and the number of buckets is counted then, so reporting
+    it doesn't query the file.
+
+    Args:
+        path: Database file, shared by the workers
+        sweep_interval: Seconds between deletions of idle buckets
+    """
+    # Checks may wait on the file lock, so they run off the event loop
+    blocking = True
+
+    def __init__(self, path: str, sweep_interval: float = 60):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=1, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Buckets are short-lived state, not worth an fsync per request
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+            "client TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._next_sweep = 0.0
+        self._clients = 0
+        self.evicted = 0
+
+    def take(self, client_id: str, capacity: float, rate: float, cost: float) -> Tuple[bool, float]:
+        now = time.time()
+        with self._lock:
+            # The update only applies when enough tokens have accumulated;
+            # otherwise no row is returned and the stored bucket is kept
+            row = self._conn.execute(
+                "INSERT INTO rate_limit_buckets (client, tokens, updated_at) VALUES (?1, ?2 - ?4, ?5) "
+                "ON CONFLICT (client) DO UPDATE SET "
+                "tokens = MIN(?2, tokens + (?5 - updated_at) * ?3) - ?4, updated_at = ?5 "
+                "WHERE MIN(?2, tokens + (?5 - updated_at) * ?3) >= ?4 "
+                "RETURNING tokens",
+                (client_id, capacity, rate, cost, now)
+            ).fetchone()
+            if row is not None:
+                allowed, tokens = True, row[0]
+            else:
+                allowed = False
+                stored = self._conn.execute(
+                    "SELECT tokens, updated_at FROM rate_limit_buckets WHERE client = ?",
+                    (client_id,)
+                ).fetchone()
+                tokens = min(capacity, stored[0] + (now - stored[1]) * rate) if stored else 0.0
+
+            if now >= self._next_sweep:
+                self._next_sweep = now + self.sweep_interval
+                self.evicted += self._conn.execute(
+                    "DELETE FROM rate_limit_buckets WHERE updated_at < ?",
+                    (now - capacity / rate,)
+                ).rowcount
+                self._clients = self._conn.execute(
+                    "SELECT COUNT(*) FROM rate_limit_buckets").fetchone()[0]
+        return allowed, tokens
+
+    def clients(self) -> int:
+        """Number of buckets as of the last sweep"""
+        return self._clients
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter
+
+    Each client may burst up to capacity requests, refilled at
+    per_minute / 60 tokens a second. A check does constant work regardless
+    of the client's history.
+
+    Args:
+        backend: Where buckets are kept (MemoryRateLimitBackend or
+            SQLiteRateLimitBackend)
+        per_minute: Sustained requests per minute per client
+        burst: Bucket capacity, defaults to per_minute
+    """
+
+    def __init__(self, backend: Any, per_minute: int, burst: int = 0):
+        self.backend = backend
+        self.rate = per_minute / 60
+        self.capacity = burst or per_minute
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    def check(self, client_id: str, cost: float = 1) -> Tuple[bool, float]:
+        """
+        Take tokens from a client's bucket
+
+        A backend failure lets the request through rather than failing it.
+        A cost above the capacity takes the whole bucket, so the largest
+        requests are still allowed once the bucket is full.
+
+        Args:
+            client_id: Client identifier
+            cost: Tokens the request consumes
+
+        Returns:
+            Whether the request is allowed, and seconds until it would be
+        """
+        cost = min(cost, self.capacity)
+        try:
+            allowed, tokens = self.backend.take(client_id, self.capacity, self.rate, cost)
+        except sqlite3.Error as e:
+            self.errors += 1
+            logger.warning(f"Rate limit check failed, allowing request: {str(e)}")
+            return True, 0.0
+
+        if allowed:
+            self.allowed += 1
+            return True, 0.0
+        self.rejected += 1
+        return False, (cost - tokens) / self.rate
+
+    async def check_async(self, client_id: str, cost: float = 1) -> Tuple[bool, float]:
+        """Take tokens from a client's bucket, in a thread for blocking backends"""
+        if self.backend.blocking:
+            return await asyncio.to_thread(self.check, client_id, cost)
+        return self.check(client_id, cost)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return rate limiting counters"""
+        return {
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "errors": self.errors,
+            "clients": self.backend.clients(),
+            "evicted": self.backend.evicted,
+            "perMinute": self.rate * 60,
+            "burst": self.capacity,
+        }
@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+
+from app.services.concurrency_limiter import UpstreamOverloadedError
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Upstream status codes worth another attempt; other 4xx errors will fail
+# the same way again
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(UpstreamOverloadedError):
+    """
+    Raised instead of calling an upstream that is failing
+
+    Args:
+        bulkhead: Name of the circuit that is open
+        retry_after: Seconds until the circuit lets a probe call through
+    """
+
+    def __init__(self, bulkhead: str, retry_after: float):
+        super().__init__(bulkhead, retry_after)
+        self.args = (f"Upstream {bulkhead} circuit is open",)
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Whether an upstream error is transient and worth another attempt
+
+    Timeouts, connection failures, 408, 429 and 5xx responses are retried.
+    Errors in the request or in our handling of the response (other 4xx,
+    a response without a function call) and calls shed locally are not.
+    """
+    if isinstance(error, UpstreamOverloadedError):
+        return False
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+
+class RetryBudget:
+    """
+    Process-wide cap on retries as a share of calls
+
+    Every first attempt deposits ratio tokens and every retry spends one,
+    so retries stay below ratio of calls however many of them fail. At
+    most max_tokens are saved up, which also allows a few retries before
+    much traffic has been seen.
+
+    Args:
+        ratio: Retries allowed per call
+        max_tokens: Retries that can be saved up
+    """
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+        self.calls = 0
+        self.retries = 0
+        self.denied = 0
+
+    def record_call(self) -> None:
+        """Deposit the share of a first attempt"""
+        self.calls += 1
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        """Spend a token on a retry if one is left"""
+        if self.tokens < 1:
+            self.denied += 1
+            return False
+        self.tokens -= 1
+        self.retries += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return retry counters"""
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "denied": self.denied,
+            "tokens": self.tokens,
+            "ratio": self.ratio,
+        }
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the upstream is unhealthy
+
+    The circuit opens after failure_threshold consecutive transient
+    failures. While open, calls raise CircuitOpenError without reaching the
+    upstream. After reset_timeout seconds a single probe call is let
+    through; its success closes the circuit and its failure opens it again.
+
+    Each admitted call gets a ticket that its outcome is recorded with.
+    Outcomes of calls started before the circuit last opened are ignored,
+    so a slow call that was already running can't close it.
+
+    Args:
+        name: Circuit name used in errors and logs
+        failure_threshold: Consecutive failures that open the circuit
+        reset_timeout: Seconds the circuit stays open before a probe
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._tickets = 0
+        # Last ticket handed out before the circuit last opened
+        self._opened_ticket = 0
+        self._probe: Optional[int] = None
+
+        self.opened = 0
+        self.rejected = 0
+
+    def before_call(self) -> int:
+        """
+        Check that a call may go ahead
+
+        Returns:
+            Ticket to record the call's outcome with
+
+        Raises:
+            CircuitOpenError: If the circuit is open or a probe is in flight
+        """
+        self._tickets += 1
+        if self.state == "closed":
+            return self._tickets
+        remaining = self._opened_at + self.reset_timeout - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and self._probe is None:
+            self._probe = self._tickets
+            return self._tickets
+        self.rejected += 1
+        raise CircuitOpenError(self.name, max(1.0, remaining))
+
+    def _stale(self, ticket: int) -> bool:
+        """Whether a call can't change the state: it predates the last opening or isn't the probe"""
+        if ticket <= self._opened_ticket:
+            return True
+        return self.state != "closed" and ticket != self._probe
+
+    def record_success(self, ticket: int) -> None:
+        """Record a call the upstream answered"""
+        if self._stale(ticket):
+            return
+        if self.state != "closed":
+            logger.info(f"Upstream {self.name} circuit closed")
+        self.state = "closed"
+        self._failures = 0
+        self._probe = None
+
+    def record_failure(self, ticket: int) -> None:
+        """Record a transient upstream failure"""
+        if self._stale(ticket):
+            return
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened += 1
+                logger.warning(
+                    f"Upstream {self.name} circuit opened after {self._failures} failures")
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self._opened_ticket = self._tickets
+            self._probe = None
+
+    def record_ignored(self, ticket: int) -> None:
+        """Record a call that says nothing about upstream health"""
+        if ticket == self._probe:
+            self._probe = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return circuit state and counters"""
+        return {
+            "state": self.state,
+            "consecutiveFailures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class RetryPolicy:
+    """
+    Retries transient upstream failures within a budget and a deadline
+
+    Retries wait a random delay between zero and an exponentially growing
+    cap (full jitter), so clients that failed together don't retry
+    together. No attempt starts after deadline seconds from the first,
+    and the last one is cut off at it.
+
+    Args:
+        max_attempts: Attempts per call, including the first
+        base_delay: Cap of the delay before the first retry, in seconds
+        max_delay: Largest cap of a retry delay, in seconds
+        deadline: Seconds all attempts of a call may take together
+        budget: Retry budget shared by all calls
+    """
+
+    def __init__(
+        self,
+        max_attempts: int,
+        base_delay: float,
+        max_delay: float,
+        deadline: float,
+        budget: RetryBudget
+    ):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.budget = budget
+
+    def _delay(self, retry: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+    async def call(
+        self,
+        operation: Callable[[], Awaitable[T]],
+        breaker: Optional[CircuitBreaker] = None
+    ) -> T:
+        """
+        Run an operation, retrying transient failures
+
+        Args:
+            operation: Zero-argument coroutine function making one attempt
+            breaker: Circuit the attempts go through
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            Exception: The last attempt's error, or CircuitOpenError
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        self.budget.record_call()
+        attempt = 1
+        while True:
+            if breaker is not None:
+                ticket = breaker.before_call()
+            try:
+                result = await asyncio.wait_for(operation(), timeout=max(deadline - loop.time(), 0))
+            except asyncio.CancelledError:
+                if breaker is not None:
+                    breaker.record_ignored(ticket)
+                raise
+            except Exception as e:
+                retryable = is_retryable_error(e)
+                if breaker is not None:
+                    if retryable:
+                        breaker.record_failure(ticket)
+                    else:
+                        breaker.record_ignored(ticket)
+                if not retryable or attempt >= self.max_attempts:
+                    raise
+                delay = self._delay(attempt - 1)
+                if loop.time() + delay >= deadline or not self.budget.try_retry():
+                    raise
+                logger.warning(f"Retrying upstream call in {delay:.2f}s after: {str(e) or type(e).__name__}")
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            if breaker is not None:
+                breaker.record_success(ticket)
+            return result
@@ -0,0 +1,161 @@
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Type, Union, get_args, get_origin
+
+from annotated_types import MaxLen, MinLen
+from google.genai import types
+from pydantic import BaseModel, TypeAdapter
+
+from app.models.grammar import GrammarResponse
+from app.models.slang_hang import SlangHangResponse
+from app.models.tiny_lesson import MergedTinyLesson, TinyLessonResponse
+from app.models.word_cam import DetectObjectsResponse, ObjectDescriptorResponse
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Sampling parameters of every generate_content call
+GENERATION_PARAMS: Dict[str, Any] = {
+    "temperature": 0.2,
+    "top_p": 0.95,
+    "top_k": 64,
+}
+
+SCALAR_TYPES = {
+    str: types.Type.STRING,
+    int: types.Type.INTEGER,
+    float: types.Type.NUMBER,
+    bool: types.Type.BOOLEAN,
+}
+
+
+def schema_for(annotation: Any, description: Optional[str] = None, metadata: Sequence[Any] = ()) -> types.Schema:
+    """
+    Derive a Gemini schema from a type annotation
+
+    Supports str, int, float, bool, lists, Optional and Pydantic models;
+    min_length and max_length of lists become minItems and maxItems.
+
+    Raises:
+        TypeError: If the annotation has no Gemini schema equivalent
+    """
+    origin = get_origin(annotation)
+    if origin is Union:
+        # Optional fields are not required rather than nullable
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return schema_for(args[0], description, metadata)
+    elif origin in (list, List):
+        schema = types.Schema(
+            type=types.Type.ARRAY, description=description, items=schema_for(get_args(annotation)[0]))
+        for constraint in metadata:
+            if isinstance(constraint, MinLen):
+                schema.min_items = constraint.min_length
+            elif isinstance(constraint, MaxLen):
+                schema.max_items = constraint.max_length
+        return schema
+    elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return types.Schema(
+            type=types.Type.OBJECT,
+            description=description,
+            properties={
+                name: schema_for(field.annotation, field.description, field.metadata)
+                for name, field in annotation.model_fields.items()
+            },
+            required=[name for name, field in annotation.model_fields.items() if field.is_required()]
+        )
+    elif annotation in SCALAR_TYPES:
+        return types.Schema(type=SCALAR_TYPES[annotation], description=description)
+    raise TypeError(f"No Gemini schema for {annotation!r}")
+
+
+class FunctionSchema:
+    """
+    A function Gemini calls with a response, derived from its response model
+
+    The declaration, the generation configs that declare it and the
+    validator of its arguments are built once and shared by every call.
+
+    Args:
+        name: Name of the function
+        description: What the function is for, as the model sees it
+        model: Response model the function's arguments validate into
+    """
+
+    def __init__(self, name: str, description: str, model: Type[BaseModel]):
+        self.name = name
+        self.model = model
+        self.declaration = types.FunctionDeclaration(
+            name=name, description=description, parameters=schema_for(model))
+        # Asks for a call to this function
+        self.config = types.GenerateContentConfig(
+            **GENERATION_PARAMS, tools=[types.Tool(function_declarations=[self.declaration])])
+        # Asks for the arguments as JSON text, for streaming
+        self.json_config = types.GenerateContentConfig(
+            **GENERATION_PARAMS,
+            response_mime_type="application/json",
+            response_schema=self.declaration.parameters
+        )
+        self._adapter = TypeAdapter(model)
+
+    def validate(self, args: Optional[Dict[str, Any]]) -> BaseModel:
+        """
+        Validate function call arguments into the response model
+
+        Raises:
+            ValidationError: If the arguments don't match the model
+        """
+        return self._adapter.validate_python(args or {})
+
+
+class SchemaRegistry:
+    """Functions Gemini calls with responses, by name"""
+
+    def __init__(self):
+        self._functions: Dict[str, FunctionSchema] = {}
+
+    def register(self, name: str, description: str, model: Type[BaseModel]) -> FunctionSchema:
+        function = FunctionSchema(name, description, model)
+        self._functions[name] = function
+        return function
+
+    def get(self, name: str) -> FunctionSchema:
+        return self._functions[name]
+
+    def __iter__(self) -> Iterator[FunctionSchema]:
+        return iter(self._functions.values())
+
+
+# Create global schema registry
+schema_registry = SchemaRegistry()
+
+TINY_LESSON = schema_registry.register(
+    "generate_tiny_lesson",
+    "Generate vocabulary and phrases for a specific language learning context",
+    TinyLessonResponse
+)
+# Called once per lesson of a merged request; not looked up by name
+MERGED_TINY_LESSON = FunctionSchema(
+    "generate_tiny_lesson",
+    "Generate vocabulary and phrases for a specific language learning context",
+    MergedTinyLesson
+)
+GRAMMAR_LESSON = schema_registry.register(
+    "generate_grammar_lesson",
+    "Generate grammar topics and examples for a specific language learning context",
+    GrammarResponse
+)
+SLANG_CONVERSATION = schema_registry.register(
+    "generate_slang_conversation",
+    "Generate a conversation that includes slang and idiomatic expressions",
+    SlangHangResponse
+)
+DETECT_OBJECTS = schema_registry.register(
+    "detect_objects",
+    "Detect objects in an image and provide translations",
+    DetectObjectsResponse
+)
+OBJECT_DESCRIPTORS = schema_registry.register(
+    "generate_object_descriptors",
+    "Generate descriptive words or phrases for an object in an image",
+    ObjectDescriptorResponse
+)
@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into one shared upstream call
+
+    The first caller for a key starts the call as a task; callers arriving
+    while it is in flight await the same task. Each waiter is shielded, so
+    a disconnecting client cancels only its own wait and never the shared
+    call. Errors raised by the call propagate to every waiter.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the error as retrieved when every waiter has gone away
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Shared call failed: {str(task.exception())}")
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn once for all concurrent callers sharing a key
+
+        Args:
+            key: Key identifying identical calls
+            fn: Coroutine factory performing the call
+
+        Returns:
+            Result of the shared call
+        """
+        task = self._calls.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.create_task(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return coalescing counters"""
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "inFlight": len(self._calls),
+        }
+
+
+single_flight = SingleFlight()
@@ -1,60 +1,111 @@
 import logging
-from typing import Dict, Any, List
-from google.genai import types
+from typing import Any, AsyncIterator, Tuple
 from app.services.gemini_service import gemini_service
+from app.utils.json_stream import ITEM, FIELD
+from app.services.cache import response_cache
+from app.services.conversation_pool import ConversationPool
+from app.services.schema_registry import SLANG_CONVERSATION
+from app.config import settings
+from app.utils.request_key import build_request_key
 from app.models.slang_hang import SlangHangResponse, DialogueLine
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Models of the array items emitted while streaming
+STREAM_ITEM_MODELS = {
+    "dialogue": DialogueLine,
+}
+
+# Bump when the prompt or schema changes to invalidate cached responses
+PROMPT_VERSION = "1"
+
 
 class SlangHangService:
     """Service for generating slang-based dialogues"""
 
-    async def generate_slang_conversation(self, source_language: str, target_language: str) -> SlangHangResponse:
+    def request_key(self, source_language: str, target_language: str, variant: int = 0) -> str:
+        """
+        Key under which responses for a request are cached and stored
+
+        Args:
+            variant: Number of the pair's conversation, for pooled
+                conversations; variant 0 is the one served without the pool
+        """
+        params = {
+            "sourceLanguage": source_language,
+            "targetLanguage": target_language
+        }
+        if variant:
+            params["variant"] = variant
+        return build_request_key("slang_hang", params, gemini_service.model, PROMPT_VERSION)
+
+    async def generate_slang_conversation(self, source_language: str, target_language: str, client_id: str = "") -> SlangHangResponse:
         """
         Generate a slang-based conversation in the target language
 
         Args:
             source_language: User's source language
             target_language: Target language to learn
+            client_id: Requesting client, used to avoid repeated conversations
 
         Returns:
             SlangHangResponse with conversation context and dialogue
         """
-        try:
-            # Define the function declaration for Gemini API
-            function_declarations: List[types.FunctionDeclaration] = [
-                types.FunctionDeclaration(
-                    name="generate_slang_conversation",
-                    description="Generate a conversation that includes slang and idiomatic expressions",
-                    parameters=types.Schema(
-                        type=types.Type.OBJECT,
-                        properties={
-                                "context": types.Schema(type="string", description="The conversational context or setting"),
-                                "dialogue": types.Schema(
-                                    type=types.Type.ARRAY,
-                                    description="The dialogue between speakers with slang expressions",
-                                    items=types.Schema(
-                                        type=types.Type.OBJECT,
-                                        properties={
-                                                "speaker": types.Schema(type="string", description="The name of the speaker"),
-                                                "message": types.Schema(type="string", description="The spoken message containing slang or idiomatic expressions"),
-                                                "notes": types.Schema(type="string", description="Notes explaining the slang or idioms used"),
-                                        },
-                                        required=["speaker",
-                                                  "message", "notes"]
-                                    )
-                                )
-                        },
-                        required=["context", "dialogue"]
-
-                    )
-                )
-            ]
+        if settings.CONVERSATION_POOL_ENABLED:
+            return await conversation_pool.take(source_language, target_language, client_id)
 
-            # Create the prompt for Gemini API
-            prompt = f"""
+        return await response_cache.get_or_generate(
+            self.request_key(source_language, target_language),
+            SlangHangResponse,
+            lambda: self._generate_slang_conversation(source_language, target_language)
+        )
+
+    async def generate_slang_conversation_json(self, source_language: str, target_language: str, client_id: str = "") -> bytes:
+        """
+        Generate a slang-based conversation encoded as JSON
+
+        Pooled and cached conversations are encoded once, however many
+        clients they are served to.
+
+        Returns:
+            SlangHangResponse as UTF-8 JSON bytes
+        """
+        if settings.CONVERSATION_POOL_ENABLED:
+            return await conversation_pool.take_json(source_language, target_language, client_id)
+
+        return await response_cache.get_or_generate_json(
+            self.request_key(source_language, target_language),
+            lambda: self._generate_slang_conversation(source_language, target_language)
+        )
+
+    async def stream_slang_conversation(self, source_language: str, target_language: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a slang conversation item by item as Gemini generates it
+
+        Yields:
+            (field, item) pairs: "context" with its string, or DialogueLine
+        """
+        prompt = self._prompt(source_language, target_language) + \
+            "Respond with a JSON object following the response schema."
+        async for kind, field, value in gemini_service.stream_function_args(
+                prompt, SLANG_CONVERSATION, endpoint="slang_hang"):
+            if kind == ITEM and field in STREAM_ITEM_MODELS:
+                yield field, STREAM_ITEM_MODELS[field].model_validate(value)
+            elif kind == FIELD and field == "context":
+                yield field, value
+
+    async def _pooled_conversation(self, source_language: str, target_language: str, variant: int) -> Tuple[SlangHangResponse, bool]:
+        """Fetch a variant of a pair's conversation for the pool, through the cache"""
+        return await response_cache.get_or_generate_shared(
+            self.request_key(source_language, target_language, variant),
+            SlangHangResponse,
+            lambda: self._generate_slang_conversation(source_language, target_language)
+        )
+
+    def _prompt(self, source_language: str, target_language: str) -> str:
+        """Prompt without the final response-format instruction"""
+        return f"""
             You are a language learning assistant that helps users learn slang and idiomatic expressions.
             
             Create a natural conversation in {target_language} that includes common slang and idiomatic expressions.
@@ -69,32 +120,18 @@ class SlangHangService:
             
             Make sure the slang and expressions are modern, commonly used, and appropriate for casual conversations.
             
-            Respond with the function call to generate_slang_conversation.
             """
 
-            # Call Gemini API
-            response = await gemini_service.call_gemini_with_function(prompt, function_declarations)
-
-            if response and response.get("name") == "generate_slang_conversation":
-                args = response.get("args", {})
-
-                # Convert the response to our model
-                dialogue_lines = [
-                    DialogueLine(
-                        speaker=line.get("speaker", ""),
-                        message=line.get("message", ""),
-                        notes=line.get("notes", "")
-                    )
-                    for line in args.get("dialogue", [])
-                ]
-
-                return SlangHangResponse(
-                    context=args.get("context", ""),
-                    dialogue=dialogue_lines
-                )
-            else:
-                logger.error("Invalid response from Gemini API")
-                raise ValueError("Invalid response from Gemini API")
+    async def _generate_slang_conversation(self, source_language: str, target_language: str) -> SlangHangResponse:
+        """Generate a fresh response from Gemini, bypassing the cache"""
+        try:
+            # Create the prompt for Gemini API
+            prompt = self._prompt(source_language, target_language) + \
+                "Respond with the function call to generate_slang_conversation."
+
+            # Call Gemini API, which validates the arguments into our model
+            return await gemini_service.call_gemini_with_function(
+                prompt, SLANG_CONVERSATION, endpoint="slang_hang")
 
         except Exception as e:
             logger.error(f"Error generating slang conversation: {str(e)}")
@@ -102,3 +139,10 @@ class SlangHangService:
 
 
 slang_hang_service = SlangHangService()
+
+conversation_pool = ConversationPool(
+    fetch=slang_hang_service._pooled_conversation,
+    min_size=settings.CONVERSATION_POOL_MIN_SIZE,
+    max_size=settings.CONVERSATION_POOL_MAX_SIZE,
+    max_serves=settings.CONVERSATION_POOL_MAX_SERVES
+)
@@ -1,16 +1,47 @@
+import asyncio
 import logging
-from typing import Dict, Any, List
-from google.genai import types
+from typing import Any, AsyncIterator, List, Tuple, Union
+from pydantic import ValidationError
 from app.services.gemini_service import gemini_service
+from app.utils.json_stream import ITEM
+from app.services.cache import response_cache
+from app.services.micro_batcher import MicroBatcher
+from app.services.model_router import Generation, current_generation, mark_fallback, prefer_fast
+from app.services.purpose_index import purpose_index, purpose_scope
+from app.services.schema_registry import MERGED_TINY_LESSON, TINY_LESSON
+from app.config import settings
+from app.utils.request_key import build_request_key
 from app.models.tiny_lesson import TinyLessonResponse, VocabularyTerm, Phrase
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Models of the array items emitted while streaming
+STREAM_ITEM_MODELS = {
+    "vocabulary": VocabularyTerm,
+    "phrases": Phrase,
+}
+
+# Bump when the prompt or schema changes to invalidate cached responses
+PROMPT_VERSION = "1"
+
 
 class TinyLessonService:
     """Service for generating tiny language lessons"""
 
+    def request_key(self, source_language: str, target_language: str, purpose: str) -> str:
+        """Key under which responses for a request are cached and stored"""
+        return build_request_key(
+            "tiny_lesson",
+            {
+                "sourceLanguage": source_language,
+                "targetLanguage": target_language,
+                "purpose": purpose
+            },
+            gemini_service.model,
+            PROMPT_VERSION
+        )
+
     async def generate_tiny_lesson(self, source_language: str, target_language: str, purpose: str) -> TinyLessonResponse:
         """
         Generate a tiny language lesson based on the provided context
@@ -23,49 +54,55 @@ class TinyLessonService:
         Returns:
             TinyLessonResponse with vocabulary and phrases
         """
-        try:
-            # Define the function declaration for Gemini API
-            function_declarations: List[types.FunctionDeclaration] = [
-                types.FunctionDeclaration(
-                    name="generate_tiny_lesson",
-                    description="Generate vocabulary and phrases for a specific language learning context",
-                    parameters=types.Schema(
-                        type=types.Type.OBJECT,
-                        properties={
-                            "vocabulary": types.Schema(
-                                type=types.Type.ARRAY,
-                                description="List of vocabulary terms relevant to the purpose",
-                                items=types.Schema(
-                                    type=types.Type.OBJECT,
-                                    properties={
-                                        "term": types.Schema(type="string", description="The vocabulary term in the target language"),
-                                        "transliteration": types.Schema(type="string", description="Transliteration of the term (for non-Latin scripts)"),
-                                        "translation":  types.Schema(type="string", description="Translation or explanation of the term")
-                                    },
-                                    required=["term", "translation"]
-                                )
-                            ),
-                            "phrases": types.Schema(
-                                type=types.Type.ARRAY,
-                                description="List of useful phrases for the given context",
-                                items=types.Schema(
-                                    type=types.Type.OBJECT,
-                                    properties={
-                                        "phrase": types.Schema(type="string", description="The phrase in the target language"),
-                                        "transliteration": types.Schema(type="string", description="Transliteration of the phrase (for non-Latin scripts)"),
-                                        "translation": types.Schema(type="string", description="Translation or explanation of the phrase")
-                                    },
-                                    required=["phrase", "translation"]
-                                )
-                            )
-                        },
-                        required=["vocabulary", "phrases"]
-                    )
-                )
-            ]
+        purpose = self._match_purpose(source_language, target_language, purpose)
+        return await response_cache.get_or_generate(
+            self.request_key(source_language, target_language, purpose),
+            TinyLessonResponse,
+            lambda: self._generate_tiny_lesson(source_language, target_language, purpose)
+        )
 
-            # Create the prompt for Gemini API
-            prompt = f"""
+    async def generate_tiny_lesson_json(self, source_language: str, target_language: str, purpose: str) -> bytes:
+        """
+        Generate a tiny lesson encoded as JSON
+
+        Cached lessons are returned as stored, without decoding them into
+        a TinyLessonResponse and encoding them again.
+
+        Returns:
+            TinyLessonResponse as UTF-8 JSON bytes
+        """
+        purpose = self._match_purpose(source_language, target_language, purpose)
+        return await response_cache.get_or_generate_json(
+            self.request_key(source_language, target_language, purpose),
+            lambda: self._generate_tiny_lesson(source_language, target_language, purpose)
+        )
+
+    def _match_purpose(self, source_language: str, target_language: str, purpose: str) -> str:
+        """Return an already seen, near-identical purpose whose lesson can be reused"""
+        if not settings.PURPOSE_MATCH_ENABLED:
+            return purpose
+        return purpose_index.resolve(
+            purpose_scope("tiny_lesson", source_language, target_language),
+            purpose
+        )
+
+    async def stream_tiny_lesson(self, source_language: str, target_language: str, purpose: str) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a tiny lesson item by item as Gemini generates it
+
+        Yields:
+            (field, item) pairs: VocabularyTerm or Phrase
+        """
+        prompt = self._prompt(source_language, target_language, purpose) + \
+            "Respond with a JSON object following the response schema."
+        async for kind, field, value in gemini_service.stream_function_args(
+                prompt, TINY_LESSON, endpoint="tiny_lesson"):
+            if kind == ITEM and field in STREAM_ITEM_MODELS:
+                yield field, STREAM_ITEM_MODELS[field].model_validate(value)
+
+    def _prompt(self, source_language: str, target_language: str, purpose: str) -> str:
+        """Prompt without the final response-format instruction"""
+        return f"""
             You are a language learning assistant that helps users learn practical vocabulary and phrases.
             
             Create a list of vocabulary terms and useful phrases in {target_language} that would be helpful for a {source_language} speaker in the following context: {purpose}.
@@ -74,38 +111,117 @@ class TinyLessonService:
             Each phrase should be immediately useful and practical for the given context.
             If the target language uses a non-Latin script, provide transliteration.
             
-            Respond with the function call to generate_tiny_lesson.
             """
 
-            # Call Gemini API
-            response = await gemini_service.call_gemini_with_function(prompt, function_declarations)
-
-            if response and response.get("name") == "generate_tiny_lesson":
-                args = response.get("args", {})
-
-                # Convert the response to our model
-                vocabulary_terms = [
-                    VocabularyTerm(
-                        term=item.get("term", ""),
-                        transliteration=item.get("transliteration", ""),
-                        translation=item.get("translation", "")
-                    )
-                    for item in args.get("vocabulary", [])
-                ]
-
-                phrases = [
-                    Phrase(
-                        phrase=item.get("phrase", ""),
-                        transliteration=item.get("transliteration", ""),
-                        translation=item.get("translation", "")
-                    )
-                    for item in args.get("phrases", [])
-                ]
-
-                return TinyLessonResponse(vocabulary=vocabulary_terms, phrases=phrases)
-            else:
-                logger.error("Invalid response from Gemini API")
-                raise ValueError("Invalid response from Gemini API")
+    def _batch_prompt(self, source_language: str, target_language: str, purposes: List[str]) -> str:
+        """Prompt asking for one lesson per numbered purpose"""
+        contexts = "\n".join(f"            Context {i}: {purpose}" for i, purpose in enumerate(purposes))
+        return f"""
+            You are a language learning assistant that helps users learn practical vocabulary and phrases.
+            
+            For each of the following contexts, create a list of vocabulary terms and useful phrases in {target_language} that would be helpful for a {source_language} speaker in that context.
+            
+{contexts}
+            
+            The vocabulary should be specific to each context, not general language learning terms.
+            Each phrase should be immediately useful and practical for its context.
+            If the target language uses a non-Latin script, provide transliteration.
+            
+            Respond with one generate_tiny_lesson function call per context, setting requestIndex to the context number.
+            """
+
+    async def _generate_tiny_lesson(self, source_language: str, target_language: str, purpose: str) -> TinyLessonResponse:
+        """Generate a fresh response from Gemini, bypassing the cache"""
+        if settings.MICRO_BATCH_ENABLED:
+            # Requests hinting for the fast model are batched separately
+            lesson, fallback = await tiny_lesson_batcher.submit(
+                (source_language, target_language, prefer_fast.get()), purpose)
+            if fallback:
+                mark_fallback()
+            return lesson
+        return await self._generate_single(source_language, target_language, purpose)
+
+    async def _generate_batch(
+        self,
+        group: Tuple[str, str, bool],
+        purposes: List[str]
+    ) -> List[Union[Tuple[TinyLessonResponse, bool], Exception]]:
+        """
+        Generate the lessons of a micro-batch of one language pair
+
+        Args:
+            group: Source language, target language and fast-model hint
+            purposes: Purposes to generate lessons for
+
+        Returns:
+            One exception or (lesson, whether a fallback model answered) per
+            purpose, in order
+        """
+        # Runs in the batcher's own task, so this only applies to the batch
+        generation = Generation()
+        current_generation.set(generation)
+        results = await self._generate_lessons(group[0], group[1], purposes)
+        return [result if isinstance(result, Exception) else (result, generation.fallback)
+                for result in results]
+
+    async def _generate_lessons(
+        self,
+        source_language: str,
+        target_language: str,
+        purposes: List[str]
+    ) -> List[Union[TinyLessonResponse, Exception]]:
+        """
+        Generate lessons for several purposes of a language pair in one call
+
+        Lessons missing from a merged response are generated individually;
+        a merged call that fails raises its error for every purpose.
+        """
+        if len(purposes) == 1:
+            return [await self._generate_single(source_language, target_language, purposes[0])]
+
+        try:
+            function_calls = await gemini_service.call_gemini_with_functions(
+                self._batch_prompt(source_language, target_language, purposes),
+                MERGED_TINY_LESSON,
+                endpoint="tiny_lesson"
+            )
+        except Exception as e:
+            logger.error(f"Error generating merged tiny lessons: {str(e)}")
+            raise
+
+        results: List[Union[TinyLessonResponse, Exception, None]] = [None] * len(purposes)
+        for call in function_calls:
+            if call.get("name") != MERGED_TINY_LESSON.name:
+                continue
+            try:
+                lesson = MERGED_TINY_LESSON.validate(call.get("args"))
+            except ValidationError:
+                continue
+            index = lesson.requestIndex
+            if 0 <= index < len(purposes) and results[index] is None:
+                results[index] = TinyLessonResponse(vocabulary=lesson.vocabulary, phrases=lesson.phrases)
+
+        missing = [i for i, result in enumerate(results) if result is None]
+        if missing:
+            logger.warning(f"Merged call returned {len(purposes) - len(missing)} of {len(purposes)} lessons")
+            retried = await asyncio.gather(
+                *(self._generate_single(source_language, target_language, purposes[i]) for i in missing),
+                return_exceptions=True
+            )
+            for i, result in zip(missing, retried):
+                results[i] = result
+        return results
+
+    async def _generate_single(self, source_language: str, target_language: str, purpose: str) -> TinyLessonResponse:
+        """Generate a lesson for a single request with its own call"""
+        try:
+            # Create the prompt for Gemini API
+            prompt = self._prompt(source_language, target_language, purpose) + \
+                "Respond with the function call to generate_tiny_lesson."
+
+            # Call Gemini API, which validates the arguments into our model
+            return await gemini_service.call_gemini_with_function(
+                prompt, TINY_LESSON, endpoint="tiny_lesson")
 
         except Exception as e:
             logger.error(f"Error generating tiny lesson: {str(e)}")
@@ -113,3 +229,9 @@ class TinyLessonService:
 
 
 tiny_lesson_service = TinyLessonService()
+
+tiny_lesson_batcher = MicroBatcher(
+    execute=tiny_lesson_service._generate_batch,
+    max_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_wait=settings.MICRO_BATCH_MAX_WAIT_MS / 1000
+)
@@ -1,22 +1,53 @@
 import logging
-from typing import Dict, Any, List
-from google.genai import types
+from typing import Optional, Tuple
 from app.services.gemini_service import gemini_service
-from app.models.word_cam import ObjectDescriptorResponse, Descriptor, DetectObjectsResponse, DetectedObject
+from app.services.descriptor_prefetch import DescriptorPrefetcher
+from app.services.single_flight import single_flight
+from app.services.image_cache import image_result_cache
+from app.services.image_preprocessor import image_preprocessor
+from app.services.metrics import image_bytes_total
+from app.services.schema_registry import DETECT_OBJECTS, OBJECT_DESCRIPTORS
+from app.config import settings
+from app.utils.request_key import build_request_key, image_digest
+from app.utils.timing import phase
+from app.models.word_cam import ObjectDescriptorResponse, DetectObjectsResponse
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Bump when a prompt or schema changes
+PROMPT_VERSION = "2"
+
 
 class WordCamService:
     """Service for image-based vocabulary learning"""
 
+    @staticmethod
+    def descriptors_request_key(
+        source_language: str,
+        target_language: str,
+        object_name: str,
+        digest: str
+    ) -> str:
+        """Return the key identifying a descriptor request for an image digest"""
+        return build_request_key(
+            "object_descriptors",
+            {
+                "sourceLanguage": source_language,
+                "targetLanguage": target_language,
+                "object": object_name,
+                "image": digest
+            },
+            gemini_service.vision_model,
+            PROMPT_VERSION
+        )
+
     async def generate_object_descriptors(
         self,
         source_language: str,
         target_language: str,
         object_name: str,
-        image_data: str,
+        image_bytes: bytes,
         mime_type: str
     ) -> ObjectDescriptorResponse:
         """
@@ -26,38 +57,50 @@ class WordCamService:
             source_language: User's source language
             target_language: Target language to learn
             object_name: Name of the object to describe
-            image_data: Base64-encoded image data
+            image_bytes: Decoded image bytes
             mime_type: MIME type of the image
 
         Returns:
             ObjectDescriptorResponse with descriptors
         """
-        try:
-            # Define the function declaration for Gemini API
-            function_declarations: List[types.FunctionDeclaration] = [
-                types.FunctionDeclaration(
-                    name="generate_object_descriptors",
-                    description="Generate descriptive words or phrases for an object in an image",
-                    parameters=types.Schema(
-                        type=types.Type.OBJECT,
-                        properties={
-                            "descriptors": types.Schema(
-                                type=types.Type.ARRAY,
-                                description="List of descriptors for the object",
-                                items=types.Schema(
-                                    type=types.Type.OBJECT,
-                                    properties={
-                                        "descriptor": types.Schema(type="string", description="A descriptive word or phrase for the object"),
-                                        "exampleSentence": types.Schema(type="string", description="Example sentence using the descriptor")
-                                    },
-                                    required=["descriptor", "exampleSentence"]
-                                ))
-                        },
-                        required=["descriptors"]
-                    )
+        context = {
+            "sourceLanguage": source_language,
+            "targetLanguage": target_language,
+            "object": object_name
+        }
+        lookup = None
+        if settings.IMAGE_CACHE_ENABLED:
+            with phase("cache"):
+                lookup = await image_result_cache.lookup(
+                    "object_descriptors", context, image_bytes,
+                    gemini_service.vision_model, PROMPT_VERSION
                 )
-            ]
+            if lookup.entry is not None:
+                return ObjectDescriptorResponse.model_validate_json(lookup.entry.value)
+
+        request_key = self.descriptors_request_key(
+            source_language, target_language, object_name, image_digest(image_bytes))
+        response = await descriptor_prefetcher.get(request_key)
+        if response is None:
+            response = await single_flight.do(
+                request_key,
+                lambda: self._generate_object_descriptors(
+                    source_language, target_language, object_name, image_bytes, mime_type)
+            )
+        if lookup is not None:
+            image_result_cache.store(lookup, response.model_dump_json().encode("utf-8"))
+        return response
 
+    async def _generate_object_descriptors(
+        self,
+        source_language: str,
+        target_language: str,
+        object_name: str,
+        image_bytes: bytes,
+        mime_type: str
+    ) -> ObjectDescriptorResponse:
+        """Generate descriptors from Gemini for a single request"""
+        try:
             # Create the prompt for Gemini API
             prompt = f"""
             You are a language learning assistant that helps users learn descriptive vocabulary.
@@ -76,27 +119,15 @@ class WordCamService:
             """
 
             # Call Gemini Vision API
-            response = await gemini_service.call_gemini_vision_with_function(
-                prompt, image_data, mime_type, function_declarations
+            with phase("preprocess"):
+                image = await image_preprocessor.prepare(image_bytes, mime_type)
+            image_bytes_total.inc("received", amount=len(image_bytes))
+            image_bytes_total.inc("sent_upstream", amount=len(image.data))
+            return await gemini_service.call_gemini_vision_with_function(
+                prompt, image.data, image.mime_type, OBJECT_DESCRIPTORS,
+                endpoint="object_descriptors"
             )
 
-            if response and response.get("name") == "generate_object_descriptors":
-                args = response.get("args", {})
-
-                # Convert the response to our model
-                descriptors = [
-                    Descriptor(
-                        descriptor=item.get("descriptor", ""),
-                        exampleSentence=item.get("exampleSentence", "")
-                    )
-                    for item in args.get("descriptors", [])
-                ]
-
-                return ObjectDescriptorResponse(descriptors=descriptors)
-            else:
-                logger.error("Invalid response from Gemini API")
-                raise ValueError("Invalid response from Gemini API")
-
         except Exception as e:
             logger.error(f"Error generating object descriptors: {str(e)}")
             raise
@@ -105,7 +136,7 @@ class WordCamService:
         self,
         source_language: str,
         target_language: str,
-        image_data: str,
+        image_bytes: bytes,
         mime_type: str,
         image_width: int,
         image_height: int
@@ -116,7 +147,7 @@ class WordCamService:
         Args:
             source_language: User's source language
             target_language: Target language to learn
-            image_data: Base64-encoded image data
+            image_bytes: Decoded image bytes
             mime_type: MIME type of the image
             image_width: Width of the image in pixels
             image_height: Height of the image in pixels
@@ -124,41 +155,111 @@ class WordCamService:
         Returns:
             DetectObjectsResponse with detected objects
         """
-        try:
-            # Define the function declaration for Gemini API
-            function_declarations: List[types.FunctionDeclaration] = [
-                types.FunctionDeclaration(
-                    name="detect_objects",
-                    description="Detect objects in an image and provide translations",
-                    parameters=types.Schema(
-                         type=types.Type.OBJECT,
-                        properties={
-                            "objects": types.Schema(
-                                type=types.Type.ARRAY,
-                                description="List of detected objects",
-                                items=types.Schema(
-                                    type=types.Type.OBJECT,
-                                    properties={
-                                        "name": types.Schema(type="string", description="Name of the detected object"),
-                                        "pronunciation": types.Schema(type="string", description="Pronunciation of the object name"),
-                                        "translation": types.Schema(type="string", description="Translation of the object name"),
-                                        "coordinates": types.Schema(
-                                            type=types.Type.ARRAY,
-                                            description="Bounding box coordinates [x1, y1, x2, y2]",
-                                            items=types.Schema(
-                                                type=types.Type.NUMBER),
-                                            minItems=4,
-                                            maxItems=4
-                                        )
-                                    },
-                                    required=["name", "translation", "coordinates"]
-                                )
-                            )
-                        },
-                        required=["objects"]
-                    )
+        context = {
+            "sourceLanguage": source_language,
+            "targetLanguage": target_language
+        }
+        lookup = None
+        if settings.IMAGE_CACHE_ENABLED:
+            with phase("cache"):
+                lookup = await image_result_cache.lookup(
+                    "detect_objects", context, image_bytes,
+                    gemini_service.vision_model, PROMPT_VERSION,
+                    dimensions=(image_width, image_height)
                 )
+            # Entries for unusable dimensions can't be rescaled; regenerate them
+            if lookup.entry is not None and self._valid_dimensions(lookup.entry.dimensions):
+                response = DetectObjectsResponse.model_validate_json(lookup.entry.value)
+                return self._rescale_objects(
+                    response, lookup.entry.dimensions, (image_width, image_height))
+
+        digest = image_digest(image_bytes)
+        request_key = build_request_key(
+            "detect_objects",
+            {
+                **context,
+                "image": digest,
+                "width": image_width,
+                "height": image_height
+            },
+            gemini_service.vision_model,
+            PROMPT_VERSION
+        )
+        response = await single_flight.do(
+            request_key,
+            lambda: self._detect_objects(
+                source_language, target_language, image_bytes, mime_type, image_width, image_height)
+        )
+        if lookup is not None:
+            image_result_cache.store(lookup, response.model_dump_json().encode("utf-8"))
+        if settings.DESCRIPTOR_PREFETCH_ENABLED:
+            self._prefetch_descriptors(
+                source_language, target_language, response, image_bytes, mime_type, digest)
+        return response
+
+    def _prefetch_descriptors(
+        self,
+        source_language: str,
+        target_language: str,
+        detected: DetectObjectsResponse,
+        image_bytes: bytes,
+        mime_type: str,
+        digest: str
+    ) -> None:
+        """Start generating descriptors for detected objects before they are tapped"""
+        for object_name in dict.fromkeys(obj.name for obj in detected.objects if obj.name):
+            descriptor_prefetcher.schedule(
+                self.descriptors_request_key(
+                    source_language, target_language, object_name, digest),
+                lambda object_name=object_name: self._generate_object_descriptors(
+                    source_language, target_language, object_name, image_bytes, mime_type)
+            )
+
+    @staticmethod
+    def _valid_dimensions(dimensions: Optional[Tuple[int, int]]) -> bool:
+        """Whether boxes detected at these dimensions can be rescaled"""
+        return dimensions is None or all(value > 0 for value in dimensions)
+
+    @staticmethod
+    def _rescale_objects(
+        response: DetectObjectsResponse,
+        from_dimensions: Optional[Tuple[int, int]],
+        to_dimensions: Tuple[int, int]
+    ) -> DetectObjectsResponse:
+        """Map bounding boxes from the dimensions they were detected at"""
+        if not from_dimensions or from_dimensions == to_dimensions:
+            return response
+        if not WordCamService._valid_dimensions(from_dimensions):
+            logger.warning(f"Not rescaling boxes detected at dimensions {from_dimensions}")
+            return response
+        scale_x = to_dimensions[0] / from_dimensions[0]
+        scale_y = to_dimensions[1] / from_dimensions[1]
+        for detected in response.objects:
+            detected.coordinates = [
+                value * (scale_x if i % 2 == 0 else scale_y)
+                for i, value in enumerate(detected.coordinates)
             ]
+        return response
+
+    async def _detect_objects(
+        self,
+        source_language: str,
+        target_language: str,
+        image_bytes: bytes,
+        mime_type: str,
+        image_width: int,
+        image_height: int
+    ) -> DetectObjectsResponse:
+        """Detect objects with Gemini for a single request"""
+        try:
+            # The model sees the downscaled image, so boxes come back in its
+            # pixel space and are mapped to the client's dimensions below
+            with phase("preprocess"):
+                image = await image_preprocessor.prepare(image_bytes, mime_type)
+            image_bytes_total.inc("received", amount=len(image_bytes))
+            image_bytes_total.inc("sent_upstream", amount=len(image.data))
+            upstream_width = image.width or image_width
+            upstream_height = image.height or image_height
 
             # Create the prompt for Gemini API
             prompt = f"""
@@ -172,36 +273,23 @@ class WordCamService:
                - Format as [x1, y1, x2, y2] where:
                  - (x1, y1) is the top-left corner
                  - (x2, y2) is the bottom-right corner
-                 - Coordinates are pixel values (image width: {image_width}, height: {image_height})
+                 - Coordinates are pixel values (image width: {upstream_width}, height: {upstream_height})
             
             Identify 3-7 main objects in the image. Focus on distinct, clearly visible objects.
             
             Respond with the function call to detect_objects.
             """
 
-            # Call Gemini Vision API
+            # Call Gemini Vision API, which validates the arguments into our model
             response = await gemini_service.call_gemini_vision_with_function(
-                prompt, image_data, mime_type, function_declarations
+                prompt, image.data, image.mime_type, DETECT_OBJECTS,
+                endpoint="detect_objects"
+            )
+            return self._rescale_objects(
+                response,
+                (upstream_width, upstream_height),
+                (image_width, image_height)
             )
-
-            if response and response.get("name") == "detect_objects":
-                args = response.get("args", {})
-
-                # Convert the response to our model
-                detected_objects = [
-                    DetectedObject(
-                        name=obj.get("name", ""),
-                        pronunciation=obj.get("pronunciation", ""),
-                        translation=obj.get("translation", ""),
-                        coordinates=obj.get("coordinates", [0, 0, 0, 0])
-                    )
-                    for obj in args.get("objects", [])
-                ]
-
-                return DetectObjectsResponse(objects=detected_objects)
-            else:
-                logger.error("Invalid response from Gemini API")
-                raise ValueError("Invalid response from Gemini API")
 
         except Exception as e:
             logger.error(f"Error detecting objects: {str(e)}")
@@ -209,3 +297,10 @@ class WordCamService:
 
 
 word_cam_service = WordCamService()
+
+descriptor_prefetcher = DescriptorPrefetcher(
+    load=lambda: gemini_service.limiters["vision"].in_flight,
+    max_load=max(1, int(settings.UPSTREAM_VISION_MAX_CONCURRENCY * settings.DESCRIPTOR_PREFETCH_MAX_LOAD_RATIO)),
+    max_concurrency=settings.DESCRIPTOR_PREFETCH_MAX_CONCURRENCY,
+    ttl=settings.DESCRIPTOR_PREFETCH_TTL_SECONDS
+)
@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional, Sequence, Tuple, TypeVar
+from fastapi import HTTPException
+
+from app.config import settings
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+
+def check_batch_size(items: Sequence) -> None:
+    """
+    Reject batches with more items than allowed
+
+    Raises:
+        HTTPException: If the batch has more than BATCH_MAX_ITEMS items
+    """
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        logger.warning(f"Batch too large: {len(items)} items")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many items. Maximum per batch: {settings.BATCH_MAX_ITEMS}"
+        )
+
+
+async def fan_out(
+    items: Sequence[ItemT],
+    handler: Callable[[ItemT], Awaitable[ResultT]],
+    concurrency: int,
+    error_detail: str
+) -> AsyncIterator[Tuple[int, Optional[ResultT], Optional[str]]]:
+    """
+    Run a handler over items with bounded concurrency, yielding as they finish
+
+    A fixed pool of at most concurrency workers takes items in order, so a
+    large batch never holds more than that many calls or tasks at once. A
+    failing item is reported with error_detail and does not affect the
+    others. Closing the iterator early cancels the remaining work.
+
+    Args:
+        items: Items to process
+        handler: Coroutine function processing one item
+        concurrency: Maximum items processed at once
+        error_detail: Client-facing message for a failed item
+
+    Yields:
+        (index, result, error) tuples in completion order, where exactly
+        one of result and error is set
+    """
+    queue: "asyncio.Queue[Tuple[int, Optional[ResultT], Optional[str]]]" = asyncio.Queue()
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < len(items):
+            index = next_index
+            next_index += 1
+            try:
+                result = await handler(items[index])
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {str(e)}")
+                await queue.put((index, None, error_detail))
+            else:
+                await queue.put((index, result, None))
+
+    workers = [
+        asyncio.create_task(worker())
+        for _ in range(min(max(1, concurrency), len(items)))
+    ]
+    try:
+        for _ in range(len(items)):
+            yield await queue.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
@@ -0,0 +1,85 @@
+import logging
+from typing import Optional
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+
+class BodySizeLimitMiddleware:
+    """
+    ASGI middleware rejecting request bodies over a size limit
+
+    Requests declaring a larger Content-Length are answered with 413 before
+    any of the body is read. Bodies without a usable Content-Length (e.g.
+    chunked uploads) are counted as they stream in and abandoned as soon as
+    they pass the limit.
+
+    Args:
+        app: The wrapped ASGI application
+        max_body_bytes: Largest accepted request body
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.rejected = 0
+
+    def _declared_length(self, scope: Scope) -> Optional[int]:
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    return int(value)
+                except ValueError:
+                    return None
+        return None
+
+    def _record_rejection(self, scope: Scope) -> None:
+        self.rejected += 1
+        logger.warning(f"Rejected request body over {self.max_body_bytes} bytes: {scope.get('path')}")
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(status_code=413, content={"detail": "Request body too large"})
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        declared = self._declared_length(scope)
+        if declared is not None and declared > self.max_body_bytes:
+            self._record_rejection(scope)
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_bytes:
+                    self._record_rejection(scope)
+                    # FastAPI re-raises HTTPExceptions from body reading, so
+                    # this becomes a 413 response inside the app
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        async def tracked_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException as e:
+            if e.status_code != 413 or response_started:
+                raise
+            await self._reject(scope, receive, send)
@@ -1,5 +1,7 @@
-import base64
+import binascii
 import logging
+from dataclasses import dataclass
+from typing import Optional
 from fastapi import HTTPException
 
 from app.config import settings
@@ -7,49 +9,245 @@ from app.config import settings
 # Configure logger
 logger = logging.getLogger(__name__)
 
+# Leading bytes inspected to admit an image before reading all of it
+SNIFF_BYTES = 768
+SNIFF_BASE64_CHARS = SNIFF_BYTES * 4 // 3
+_BASE64_WHITESPACE = " \t\r\n"
 
-def validate_image(image_data: str, mime_type: str) -> None:
+# JPEG start-of-frame markers, which carry the image dimensions
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+@dataclass
+class ImageInfo:
+    """Format and pixel size read from an image header"""
+    mime_type: str
+    # None when the dimensions lie beyond the bytes inspected
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def _sniff_jpeg(data: bytes) -> ImageInfo:
+    info = ImageInfo(mime_type="image/jpeg")
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            break
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            # Markers without a length
+            i += 2
+            continue
+        if marker == 0xDA:
+            # Start of scan: no frame header was found before the image data
+            break
+        if marker in _JPEG_SOF_MARKERS:
+            if i + 9 <= len(data):
+                info.height = int.from_bytes(data[i + 5:i + 7], "big")
+                info.width = int.from_bytes(data[i + 7:i + 9], "big")
+            break
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return info
+
+
+def _sniff_webp(data: bytes) -> ImageInfo:
+    info = ImageInfo(mime_type="image/webp")
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30 and data[23:26] == b"\x9d\x01\x2a":
+        info.width = int.from_bytes(data[26:28], "little") & 0x3FFF
+        info.height = int.from_bytes(data[28:30], "little") & 0x3FFF
+    elif chunk == b"VP8L" and len(data) >= 25 and data[20] == 0x2F:
+        bits = int.from_bytes(data[21:25], "little")
+        info.width = (bits & 0x3FFF) + 1
+        info.height = ((bits >> 14) & 0x3FFF) + 1
+    elif chunk == b"VP8X" and len(data) >= 30:
+        info.width = int.from_bytes(data[24:27], "little") + 1
+        info.height = int.from_bytes(data[27:30], "little") + 1
+    return info
+
+
+def sniff_image(data: bytes) -> Optional[ImageInfo]:
+    """
+    Identify a JPEG, PNG or WebP image from its leading bytes
+
+    Only headers are parsed, so this costs microseconds regardless of the
+    image size. The dimensions are filled in when the bytes given reach
+    the header that carries them.
+
+    Args:
+        data: The image bytes, or a prefix of them
+
+    Returns:
+        ImageInfo, or None when the data is not a recognized image
+    """
+    if data[:3] == b"\xff\xd8\xff":
+        return _sniff_jpeg(data)
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        info = ImageInfo(mime_type="image/png")
+        if data[12:16] == b"IHDR" and len(data) >= 24:
+            info.width = int.from_bytes(data[16:20], "big")
+            info.height = int.from_bytes(data[20:24], "big")
+        return info
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return _sniff_webp(data)
+    return None
+
+
+def _base64_prefix(image_data: str, start: int, chars: int) -> str:
+    """Return up to chars leading payload characters, whitespace removed, in whole 4-char groups"""
+    # Wrapped base64 has a line break every 76 characters at most
+    prefix = "".join(image_data[start:start + chars * 2].split())[:chars]
+    return prefix[:len(prefix) - len(prefix) % 4]
+
+
+def _payload_start(image_data: str) -> int:
+    """Return the offset of the base64 payload after any data URL prefix"""
+    prefix_end = image_data.find("base64,", 0, 256)
+    return 0 if prefix_end == -1 else prefix_end + len("base64,")
+
+
+def base64_decoded_size(image_data: str) -> int:
+    """
+    Compute the decoded size of base64 image data without decoding it
+
+    Args:
+        image_data: Base64-encoded image data, with or without a data URL prefix
+
+    Returns:
+        Number of bytes the data decodes to
+    """
+    start = _payload_start(image_data)
+    end = len(image_data)
+    while end > start and image_data[end - 1] in _BASE64_WHITESPACE:
+        end -= 1
+    # Line breaks of wrapped base64 are not payload
+    length = end - start - sum(image_data.count(c, start, end) for c in _BASE64_WHITESPACE)
+    padding = 0
+    if length and image_data[end - 1] == "=":
+        padding = 2 if length > 1 and image_data[end - 2] == "=" else 1
+    return length * 3 // 4 - padding
+
+
+def decode_image_data(image_data: str) -> bytes:
+    """
+    Decode base64 image data, with or without a data URL prefix
+
+    This is the only place an inline image is decoded; the resulting bytes
+    are passed through validation and the upstream call.
+
+    Args:
+        image_data: Base64-encoded image data
+
+    Returns:
+        Decoded image bytes
+
+    Raises:
+        HTTPException: If the data is not valid base64
+    """
+    start = _payload_start(image_data)
+    if start:
+        # Remove the data URL prefix if present
+        image_data = image_data[start:]
+    try:
+        # Decodes the ASCII string directly, without an encoded bytes copy
+        return binascii.a2b_base64(image_data)
+    except (binascii.Error, ValueError) as e:
+        logger.warning(f"Invalid base64 image data: {str(e)}")
+        raise HTTPException(status_code=400, detail="Invalid image data")
+
+
+def _check_size(size: int) -> None:
+    image_size_mb = size / (1024 * 1024)
+    if image_size_mb > settings.MAX_IMAGE_SIZE_MB:
+        logger.warning(f"Image too large: {image_size_mb:.2f} MB")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Image too large. Maximum size: {settings.MAX_IMAGE_SIZE_MB} MB"
+        )
+
+
+def _check_info(info: Optional[ImageInfo], mime_type: str) -> ImageInfo:
+    if info is None or info.mime_type not in settings.SUPPORTED_IMAGE_TYPES:
+        logger.warning(f"Unsupported image data (declared type: {mime_type})")
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported image type. Supported types: {', '.join(settings.SUPPORTED_IMAGE_TYPES)}"
+        )
+    if info.mime_type != mime_type:
+        logger.info(f"Image declared as {mime_type} is {info.mime_type}")
+    if info.width is not None and info.width * info.height > settings.MAX_IMAGE_PIXELS:
+        logger.warning(f"Image dimensions too large: {info.width}x{info.height}")
+        raise HTTPException(status_code=400, detail="Image dimensions too large")
+    return info
+
+
+def admit_image_data(image_data: str, mime_type: str) -> ImageInfo:
+    """
+    Check inline image data before decoding it
+
+    The decoded size is computed from the base64 length, and the format
+    and dimensions are sniffed from the first few hundred decoded bytes.
+
+    Args:
+        image_data: Base64-encoded image data
+        mime_type: Client-declared MIME type of the image
+
+    Returns:
+        ImageInfo sniffed from the image header
+
+    Raises:
+        HTTPException: If the image is too large or not a supported image
+    """
+    _check_size(base64_decoded_size(image_data))
+    start = _payload_start(image_data)
+    try:
+        header = binascii.a2b_base64(_base64_prefix(image_data, start, SNIFF_BASE64_CHARS))
+    except (binascii.Error, ValueError) as e:
+        logger.warning(f"Invalid base64 image data: {str(e)}")
+        raise HTTPException(status_code=400, detail="Invalid image data")
+    return admit_image_header(header, mime_type)
+
+
+def admit_image_header(header: bytes, mime_type: str) -> ImageInfo:
+    """
+    Check the leading bytes of an image before reading the rest
+
+    Args:
+        header: The first SNIFF_BYTES bytes of the image
+        mime_type: Client-declared MIME type of the image
+
+    Returns:
+        ImageInfo sniffed from the image header
+
+    Raises:
+        HTTPException: If the data is not a supported image
+    """
+    return _check_info(sniff_image(header), mime_type)
+
+
+def validate_image(image_bytes: bytes, mime_type: str) -> ImageInfo:
     """
     Validate an image for processing
+
+    The format is taken from the image bytes rather than the declared
+    MIME type.
     
     Args:
-        image_data: Base64-encoded image data
-        mime_type: MIME type of the image
+        image_bytes: Decoded image bytes
+        mime_type: Client-declared MIME type of the image
         
+    Returns:
+        ImageInfo with the sniffed MIME type and dimensions
+
     Raises:
         HTTPException: If the image is invalid
     """
-    try:
-        # Check mime type
-        if mime_type not in settings.SUPPORTED_IMAGE_TYPES:
-            logger.warning(f"Unsupported image type: {mime_type}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Unsupported image type. Supported types: {', '.join(settings.SUPPORTED_IMAGE_TYPES)}"
-            )
-
-        # Decode image to check if it's valid
-        if "base64," in image_data:
-            # Remove the data URL prefix if present
-            image_data = image_data.split("base64,")[1]
-
-        try:
-            decoded_data = base64.b64decode(image_data)
-        except Exception as e:
-            logger.warning(f"Invalid base64 image data: {str(e)}")
-            raise HTTPException(status_code=400, detail="Invalid image data")
-
-        # Check image size
-        image_size_mb = len(decoded_data) / (1024 * 1024)
-        if image_size_mb > settings.MAX_IMAGE_SIZE_MB:
-            logger.warning(f"Image too large: {image_size_mb:.2f} MB")
-            raise HTTPException(
-                status_code=400,
-                detail=f"Image too large. Maximum size: {settings.MAX_IMAGE_SIZE_MB} MB"
-            )
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error validating image: {str(e)}")
-        raise HTTPException(status_code=400, detail="Invalid image")
+    if not image_bytes:
+        logger.warning("Empty image data")
+        raise HTTPException(status_code=400, detail="Invalid image data")
+    _check_size(len(image_bytes))
+    return _check_info(sniff_image(image_bytes), mime_type)
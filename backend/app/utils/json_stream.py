@@ -0,0 +1,133 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+# Event kinds emitted by JsonStreamParser
+ITEM = "item"
+FIELD = "field"
+
+Event = Tuple[str, str, Any]
+
+
+class JsonStreamParser:
+    """
+    Incremental parser for a streamed JSON object
+
+    Text is fed in arbitrary chunks. As soon as an element of a top-level
+    array property is complete it is emitted as (ITEM, property, element);
+    other top-level properties are emitted as (FIELD, property, value) once
+    complete. Anything before the opening brace (e.g. a code fence) is
+    ignored, and consumed text is discarded to keep the buffer small.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Position within the root object: key, colon, value or array
+        self._phase = "key"
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._value_depth = 0
+        self.done = False
+
+    def _expecting_value(self) -> bool:
+        return self._value_start is None and (
+            (self._depth == 1 and self._phase == "value") or
+            (self._depth == 2 and self._phase == "array")
+        )
+
+    def _emit(self, events: List[Event], text: str) -> None:
+        kind = ITEM if self._value_depth == 2 else FIELD
+        events.append((kind, self._key, json.loads(text)))
+        self._value_start = None
+
+    def feed(self, chunk: str) -> List[Event]:
+        """
+        Consume a chunk of text
+
+        Returns:
+            Events completed by this chunk
+
+        Raises:
+            ValueError: If a completed value is not valid JSON
+        """
+        self._buf += chunk
+        events: List[Event] = []
+        buf = self._buf
+        i = self._pos
+        while i < len(buf) and not self.done:
+            c = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._key_start is not None:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                        self._key_start = None
+                        self._phase = "colon"
+                    elif (self._value_start is not None and buf[self._value_start] == '"'
+                          and self._depth == self._value_depth):
+                        self._emit(events, buf[self._value_start:i + 1])
+            elif self._depth == 0:
+                if c == "{":
+                    self._depth = 1
+                    self._phase = "key"
+            elif c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._phase == "key":
+                    self._key_start = i
+                elif self._expecting_value():
+                    self._value_start = i
+                    self._value_depth = self._depth
+            elif c in "{[":
+                if c == "[" and self._depth == 1 and self._expecting_value():
+                    # Elements of a top-level array are emitted one by one
+                    self._phase = "array"
+                elif self._expecting_value():
+                    self._value_start = i
+                    self._value_depth = self._depth
+                self._depth += 1
+            elif c in "}]":
+                self._depth -= 1
+                if self._value_start is not None:
+                    if self._depth == self._value_depth and buf[self._value_start] in "{[":
+                        self._emit(events, buf[self._value_start:i + 1])
+                    elif self._depth < self._value_depth:
+                        self._emit(events, buf[self._value_start:i].strip())
+                if self._depth == 1 and self._phase == "array":
+                    self._phase = "value"
+                elif self._depth == 0:
+                    self.done = True
+            elif c == ",":
+                if (self._value_start is not None and self._depth == self._value_depth
+                        and buf[self._value_start] not in '{["'):
+                    self._emit(events, buf[self._value_start:i].strip())
+                if self._depth == 1:
+                    self._phase = "key"
+            elif c == ":":
+                if self._depth == 1 and self._phase == "colon":
+                    self._phase = "value"
+            elif not c.isspace() and self._expecting_value():
+                # Number, true, false or null
+                self._value_start = i
+                self._value_depth = self._depth
+            i += 1
+
+        # Drop text that no pending value or key refers to
+        keep_from = min(
+            (start for start in (self._value_start, self._key_start) if start is not None),
+            default=i
+        )
+        self._buf = buf[keep_from:]
+        self._pos = i - keep_from
+        if self._value_start is not None:
+            self._value_start -= keep_from
+        if self._key_start is not None:
+            self._key_start -= keep_from
+        return events
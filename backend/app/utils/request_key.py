@@ -0,0 +1,50 @@
+import hashlib
+import json
+from typing import Any, Dict
+
+
+def normalize_text(value: str) -> str:
+    """
+    Normalize free-text request fields for use in keys
+
+    Collapses whitespace and casefolds so that trivially different
+    spellings of the same request share a key.
+    """
+    return " ".join(value.split()).casefold()
+
+
+def image_digest(image_bytes: bytes) -> str:
+    """
+    Digest identifying an image by its decoded bytes
+
+    Args:
+        image_bytes: Decoded image bytes
+    """
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def build_request_key(feature: str, params: Dict[str, Any], model: str, version: str) -> str:
+    """
+    Build a stable key identifying an upstream request
+
+    Args:
+        feature: Feature name (e.g. "tiny_lesson")
+        params: Request parameters; string values are normalized
+        model: Name of the model that produces the response
+        version: Version of the prompt template
+
+    Returns:
+        Hex digest identifying the request
+    """
+    normalized = {
+        name: normalize_text(value) if isinstance(value, str) else value
+        for name, value in params.items()
+    }
+    payload = json.dumps(
+        {"feature": feature, "params": normalized,
+            "model": model, "version": version},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
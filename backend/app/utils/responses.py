@@ -0,0 +1,18 @@
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class EncodedJSONResponse(Response):
+    """
+    Response of JSON bytes that are already encoded and validated
+
+    FastAPI returns Response objects as they are, so an endpoint returning
+    one skips validating and serializing against its response_model. The
+    route keeps its response_model for the OpenAPI schema.
+    """
+    media_type = "application/json"
+
+
+def encode_json(response: BaseModel) -> bytes:
+    """Encode a validated response model as compact UTF-8 JSON"""
+    return response.__pydantic_serializer__.to_json(response)
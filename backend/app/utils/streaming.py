@@ -0,0 +1,137 @@
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from app.services.concurrency_limiter import UpstreamOverloadedError
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# OpenAPI description of streaming endpoints
+STREAM_RESPONSES: Dict[int, Dict[str, Any]] = {
+    200: {
+        "description": "One event per completed item, then a done event",
+        "content": {"application/x-ndjson": {}, "text/event-stream": {}},
+    }
+}
+
+
+def _encode(event: Dict[str, Any], sse: bool) -> bytes:
+    data = json.dumps(event, ensure_ascii=False)
+    if sse:
+        return f"event: {event['type']}\ndata: {data}\n\n".encode("utf-8")
+    return (data + "\n").encode("utf-8")
+
+
+def stream_items(items: AsyncIterator[Tuple[str, Any]], request: Request) -> StreamingResponse:
+    """
+    Stream (field, item) pairs as NDJSON, or as SSE when the client accepts it
+
+    Each item becomes an {"type": "item", "field", "data"} event. The stream
+    ends with a "done" event carrying the time to first item and the total
+    time, or an "error" event if generation fails midway (with retryAfter
+    when the upstream is over capacity).
+
+    Args:
+        items: Async iterator of (field, item) pairs from a service
+        request: Incoming request, used for content negotiation
+
+    Returns:
+        StreamingResponse emitting one event per item
+    """
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        start = time.perf_counter()
+        first_item_seconds = None
+        count = 0
+        try:
+            async for field, item in items:
+                if first_item_seconds is None:
+                    first_item_seconds = time.perf_counter() - start
+                count += 1
+                data = item.model_dump() if isinstance(item, BaseModel) else item
+                yield _encode({"type": "item", "field": field, "data": data}, sse)
+        except UpstreamOverloadedError as e:
+            # The response has already started, so the 503 becomes an event
+            logger.warning(f"Shed stream {request.url.path}: {str(e)}")
+            yield _encode({
+                "type": "error",
+                "detail": "Service is busy. Please try again later.",
+                "retryAfter": e.retry_after,
+            }, sse)
+            return
+        except Exception as e:
+            logger.error(f"Error streaming {request.url.path}: {str(e)}")
+            yield _encode({"type": "error", "detail": "Failed to generate response"}, sse)
+            return
+
+        total_seconds = time.perf_counter() - start
+        logger.info(
+            f"Streamed {count} items for {request.url.path}: first item after "
+            f"{first_item_seconds or 0:.3f}s, total {total_seconds:.3f}s"
+        )
+        yield _encode({
+            "type": "done",
+            "items": count,
+            "firstItemSeconds": first_item_seconds,
+            "totalSeconds": total_seconds,
+        }, sse)
+
+    return StreamingResponse(
+        body(), media_type="text/event-stream" if sse else "application/x-ndjson")
+
+
+def stream_batch(results: AsyncIterator[Tuple[int, Optional[Any], Optional[str]]], request: Request) -> StreamingResponse:
+    """
+    Stream batch item results as they finish, as NDJSON or SSE
+
+    Each result becomes an {"type": "item", "index", "data"} event, or an
+    {"type": "itemError", "index", "detail"} event for a failed item. The
+    stream ends with a "done" event carrying the item counts and timings.
+
+    Args:
+        results: Async iterator of (index, result, error) tuples from fan_out
+        request: Incoming request, used for content negotiation
+
+    Returns:
+        StreamingResponse emitting one event per item
+    """
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def body():
+        start = time.perf_counter()
+        first_item_seconds = None
+        count = 0
+        failed = 0
+        async for index, result, error in results:
+            if first_item_seconds is None:
+                first_item_seconds = time.perf_counter() - start
+            count += 1
+            if error is not None:
+                failed += 1
+                yield _encode({"type": "itemError", "index": index, "detail": error}, sse)
+                continue
+            data = result.model_dump() if isinstance(result, BaseModel) else result
+            yield _encode({"type": "item", "index": index, "data": data}, sse)
+
+        total_seconds = time.perf_counter() - start
+        logger.info(
+            f"Streamed {count} batch items ({failed} failed) for {request.url.path}: "
+            f"first item after {first_item_seconds or 0:.3f}s, total {total_seconds:.3f}s"
+        )
+        yield _encode({
+            "type": "done",
+            "items": count,
+            "failed": failed,
+            "firstItemSeconds": first_item_seconds,
+            "totalSeconds": total_seconds,
+        }, sse)
+
+    return StreamingResponse(
+        body(), media_type="text/event-stream" if sse else "application/x-ndjson")
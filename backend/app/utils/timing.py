@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+from fastapi.routing import APIRoute
+
+
+class RequestTimings:
+    """
+    Time spent in each phase of one request
+
+    Phases entered more than once, such as retried upstream calls, add up.
+    """
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.handler_started: Optional[float] = None
+        self.endpoint_finished: Optional[float] = None
+
+    def add(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        """Return the phases and the total as a Server-Timing header value"""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+    def log_fields(self, total: float) -> str:
+        """Return the phases and the total as key=value pairs for a log line"""
+        fields = [f"{name}_ms={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        return " ".join([f"total_ms={total * 1000:.1f}"] + fields)
+
+
+# Set per request by the timing middleware
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Time a phase of the current request
+
+    Does nothing outside a request, such as in prefetches and pre-generation.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def record_phase(name: str, seconds: float) -> None:
+    """Add time measured elsewhere to a phase of the current request"""
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    """Wrap an endpoint to time request parsing before it and serialization after it"""
+
+    @functools.wraps(endpoint)
+    async def timed(*args, **kwargs):
+        timings = current_timings.get()
+        if timings is None or timings.handler_started is None:
+            return await endpoint(*args, **kwargs)
+        # Reading the body, decoding JSON, validating the request model and dependencies
+        timings.add("parse", time.perf_counter() - timings.handler_started)
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            timings.endpoint_finished = time.perf_counter()
+
+    return timed
+
+
+class TimedRoute(APIRoute):
+    """
+    Route recording the parse and serialize phases of the current request
+
+    Parsing is everything FastAPI does before calling the endpoint and
+    serialization is building and encoding the response model after it.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if asyncio.iscoroutinefunction(endpoint):
+            endpoint = _timed_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timings = current_timings.get()
+            if timings is None:
+                return await handler(request)
+            timings.handler_started = time.perf_counter()
+            response = await handler(request)
+            if timings.endpoint_finished is not None:
+                timings.add("serialize", time.perf_counter() - timings.endpoint_finished)
+            return response
+
+        return timed_handler
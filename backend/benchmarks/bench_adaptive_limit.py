@@ -0,0 +1,109 @@
+"""
+Benchmark adaptive upstream concurrency limiting during a brownout
+
+Requests arrive at a fixed rate against a fake upstream whose latency
+grows once more calls are in flight than it has capacity for, faster than
+linearly with --contention above 1 so that throughput drops as it is
+overloaded. Midway the upstream capacity drops for a while. Clients give
+up after a timeout but, as with a real HTTP server, the work continues. Compares a fixed limit
+with an unbounded queue (the previous behaviour) against the adaptive
+limiter with a bounded queue.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_adaptive_limit --rate 12 --duration 45
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.services.concurrency_limiter import AdaptiveLimiter, UpstreamOverloadedError  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.schema_registry import TINY_LESSON  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+
+async def run(args, limiter: AdaptiveLimiter):
+    gemini_service.limiters["text"] = limiter
+    start = time.perf_counter()
+
+    def capacity() -> float:
+        elapsed = time.perf_counter() - start
+        in_brownout = args.duration / 3 <= elapsed < args.duration * 2 / 3
+        return args.brownout_capacity if in_brownout else args.capacity
+
+    gemini_service.client = FakeGeminiClient(
+        latency=lambda: args.latency * max(1.0, limiter.in_flight / capacity()) ** args.contention)
+    outcomes = {"ok": [], "shed": [], "client_timeout": 0, "wasted": 0, "min_limit": limiter.limit}
+
+    async def serve():
+        return await gemini_service.call_gemini_with_function("lesson", TINY_LESSON)
+
+    async def client():
+        sent = time.perf_counter()
+        # The server keeps working after the client has given up
+        task = asyncio.create_task(serve())
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout=args.client_timeout)
+            outcomes["ok"].append(time.perf_counter() - sent)
+        except UpstreamOverloadedError:
+            outcomes["shed"].append(time.perf_counter() - sent)
+        except asyncio.TimeoutError:
+            outcomes["client_timeout"] += 1
+            try:
+                await task
+                outcomes["wasted"] += 1
+            except Exception:
+                pass
+
+    clients = []
+    while time.perf_counter() - start < args.duration:
+        clients.append(asyncio.create_task(client()))
+        outcomes["min_limit"] = min(outcomes["min_limit"], limiter.limit)
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*clients)
+    return len(clients), outcomes
+
+
+def report(label: str, total: int, outcomes):
+    ok = sorted(outcomes["ok"])
+    shed = outcomes["shed"]
+    print(f"{label:9} requests={total} ok={len(ok)} "
+          f"ok_p50={statistics.median(ok) if ok else 0:.2f}s "
+          f"ok_p95={ok[int(len(ok) * 0.95) - 1] if ok else 0:.2f}s "
+          f"shed_503={len(shed)} shed_p50={statistics.median(shed) if shed else 0:.2f}s "
+          f"client_timeouts={outcomes['client_timeout']} wasted_upstream_calls={outcomes['wasted']} "
+          f"min_limit={int(outcomes['min_limit'])}")
+
+
+async def run_all(args):
+    fixed = AdaptiveLimiter(
+        "text", max_limit=args.max_limit, max_queue=10 ** 9, max_wait=10 ** 9, adaptive=False)
+    report("fixed", *await run(args, fixed))
+    adaptive = AdaptiveLimiter(
+        "text", max_limit=args.max_limit, min_limit=2, max_queue=args.max_queue, max_wait=args.max_wait)
+    report("adaptive", *await run(args, adaptive))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=12, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--latency", type=float, default=1.0, help="Upstream latency within capacity")
+    parser.add_argument("--capacity", type=float, default=24, help="Upstream calls served at full speed")
+    parser.add_argument("--brownout-capacity", type=float, default=4)
+    parser.add_argument("--contention", type=float, default=1.5,
+                        help="Exponent of the latency growth beyond capacity")
+    parser.add_argument("--client-timeout", type=float, default=10)
+    parser.add_argument("--max-limit", type=int, default=24)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=5)
+    args = parser.parse_args()
+    asyncio.run(run_all(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark the batch lesson endpoints against one request per purpose
+
+A classroom client needing lessons for many purposes either sends one
+/terms request per purpose in sequence or a single /terms/batch request.
+Upstream latency varies per call, so the streaming variant is also timed
+to the first item.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_batch --items 40
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("PURPOSE_MATCH_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+
+def _items(count: int):
+    return [
+        {"sourceLanguage": "English", "targetLanguage": "Spanish", "purpose": f"lesson unit {i}"}
+        for i in range(count)
+    ]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def measure(client: httpx.AsyncClient, items: int):
+    payload = _items(items)
+    start = time.perf_counter()
+    for item in payload:
+        (await client.post("/terms", json=item)).raise_for_status()
+    print(f"sequential /terms      total={time.perf_counter() - start:.2f}s requests={items}")
+
+    start = time.perf_counter()
+    response = await client.post("/terms/batch", json={"items": payload})
+    failed = sum(1 for item in response.json()["items"] if item["error"])
+    print(f"/terms/batch           total={time.perf_counter() - start:.2f}s failed={failed}")
+
+    start = time.perf_counter()
+    first = None
+    async with client.stream("POST", "/terms/batch/stream", json={"items": payload}) as response:
+        async for line in response.aiter_lines():
+            event = json.loads(line)
+            if first is None and event["type"] in ("item", "itemError"):
+                first = time.perf_counter() - start
+    print(f"/terms/batch/stream    first={first:.2f}s total={time.perf_counter() - start:.2f}s")
+
+
+async def run(items: int):
+    # A real server is needed: the in-process ASGI transport buffers bodies
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            await measure(client, items)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--min-latency", type=float, default=0.5)
+    parser.add_argument("--max-latency", type=float, default=3.0)
+    args = parser.parse_args()
+
+    random.seed(0)
+    gemini_service.client = FakeGeminiClient(
+        latency=lambda: random.uniform(args.min_latency, args.max_latency))
+    print(f"items={args.items} concurrency={settings.BATCH_MAX_CONCURRENCY} "
+          f"latency={args.min_latency}-{args.max_latency}s")
+    asyncio.run(run(args.items))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark speculative descriptor prefetch after object detection
+
+Simulates users who detect objects, look at the result for a moment and
+then tap one object, reporting tap latency with prefetch off and on. A
+second run saturates the upstream with foreground requests to check that
+prefetches are shed rather than competing with them.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_descriptor_prefetch --users 10 --think 1.0 --interval 1.0
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from PIL import Image  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.word_cam import descriptor_prefetcher, word_cam_service  # noqa: E402
+from benchmarks.fake_gemini import CANNED_ARGS, FakeGeminiClient  # noqa: E402
+
+
+def make_image(seed: int) -> bytes:
+    image = Image.new("RGB", (640, 480), (seed * 37 % 256, seed * 91 % 256, seed * 13 % 256))
+    output = io.BytesIO()
+    image.save(output, format="JPEG")
+    return output.getvalue()
+
+
+async def user_session(seed: int, think: float, arrival: float) -> float:
+    await asyncio.sleep(arrival)
+    image = make_image(seed)
+    detected = await word_cam_service.detect_objects(
+        "English", "Spanish", image, "image/jpeg", 640, 480)
+    await asyncio.sleep(think)
+    start = time.perf_counter()
+    await word_cam_service.generate_object_descriptors(
+        "English", "Spanish", detected.objects[seed % len(detected.objects)].name,
+        image, "image/jpeg")
+    return time.perf_counter() - start
+
+
+async def run(users: int, think: float, interval: float, background_load: int, seed_offset: int):
+    async def load():
+        # Foreground descriptor requests for unrelated images
+        await asyncio.gather(*(
+            word_cam_service.generate_object_descriptors(
+                "English", "French", "cup", make_image(seed_offset + 1000 + i), "image/jpeg")
+            for i in range(background_load)
+        ))
+
+    load_task = asyncio.create_task(load()) if background_load else None
+    latencies = await asyncio.gather(*(
+        user_session(seed_offset + i, think, i * interval) for i in range(users)))
+    if load_task:
+        await load_task
+    return latencies
+
+
+async def run_all(args):
+    settings.IMAGE_CACHE_ENABLED = False
+    objects = len(CANNED_ARGS["detect_objects"]["objects"])
+    for label, enabled, background_load, offset in (
+        ("prefetch=off", False, 0, 0),
+        ("prefetch=on", True, 0, 100),
+        ("prefetch=on,saturated", True, settings.MAX_CONCURRENT_UPSTREAM_CALLS, 200),
+    ):
+        fake = FakeGeminiClient(latency=args.latency)
+        gemini_service.client = fake
+        settings.DESCRIPTOR_PREFETCH_ENABLED = enabled
+        before = descriptor_prefetcher.stats()
+        latencies = await run(
+            args.users, args.think, args.interval, background_load, offset)
+        # Let leftover prefetches finish so their calls are counted here
+        while descriptor_prefetcher.pending:
+            await asyncio.sleep(0.05)
+        after = descriptor_prefetcher.stats()
+        delta = {name: after[name] - before[name]
+                 for name in ("scheduled", "skipped", "hits", "joined", "shed")}
+        print(f"{label} tap_latency_s mean={statistics.mean(latencies):.3f} "
+              f"max={max(latencies):.3f} upstream_calls={fake.calls} "
+              f"objects_per_detection={objects} {delta}")
+    await descriptor_prefetcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--think", type=float, default=1.0,
+                        help="Seconds between detection and the tap")
+    parser.add_argument("--interval", type=float, default=1.0,
+                        help="Seconds between user arrivals")
+    parser.add_argument("--latency", type=float, default=1.5)
+    args = parser.parse_args()
+    asyncio.run(run_all(args))
+
+
+if __name__ == "__main__":
+    main()
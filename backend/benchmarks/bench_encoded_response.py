@@ -0,0 +1,133 @@
+"""
+Benchmark CPU per cached response with and without pre-encoded JSON
+
+Serves cached lessons through the app, in-process, from the endpoints that
+return the cache's encoded bytes and from equivalent legacy endpoints that
+decode the cached lesson into its model and let FastAPI validate and
+serialize it against response_model. Also times the response work alone,
+from cache hit to encoded body, without the HTTP stack both paths share.
+--scale repeats the canned items to make lessons larger.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_encoded_response --requests 2000 --scale 1 10
+"""
+import argparse
+import asyncio
+import copy
+import logging
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+from fastapi import APIRouter  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.grammar import GrammarRequest, GrammarResponse  # noqa: E402
+from app.models.tiny_lesson import TinyLessonRequest, TinyLessonResponse  # noqa: E402
+from app.services.cache import response_cache  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.grammar import grammar_service  # noqa: E402
+from app.services.tiny_lesson import tiny_lesson_service  # noqa: E402
+from app.utils.timing import TimedRoute  # noqa: E402
+from benchmarks.fake_gemini import CANNED_ARGS, FakeGeminiClient  # noqa: E402
+
+legacy = APIRouter(prefix="/legacy", route_class=TimedRoute)
+
+
+@legacy.post("/terms", response_model=TinyLessonResponse)
+async def legacy_tiny_lesson(request: TinyLessonRequest):
+    return await tiny_lesson_service.generate_tiny_lesson(
+        request.sourceLanguage, request.targetLanguage, request.purpose)
+
+
+@legacy.post("/grammar", response_model=GrammarResponse)
+async def legacy_grammar(request: GrammarRequest):
+    return await grammar_service.generate_grammar_lesson(
+        request.sourceLanguage, request.targetLanguage, request.purpose)
+
+
+def scaled_payloads(scale: int):
+    """Canned arguments with every list repeated scale times"""
+    payloads = copy.deepcopy(CANNED_ARGS)
+    for args in payloads.values():
+        for name, value in args.items():
+            if isinstance(value, list):
+                args[name] = value * scale
+    return payloads
+
+
+async def measure(client: httpx.AsyncClient, path: str, body, requests: int) -> float:
+    """CPU seconds per request"""
+    await client.post(path, json=body)
+    start = time.process_time()
+    for _ in range(requests):
+        await client.post(path, json=body)
+    return (time.process_time() - start) / requests
+
+
+async def measure_handler(route, key: str, requests: int):
+    """CPU seconds per cache hit turned into a response body, decoded and pre-encoded"""
+
+    async def generate():
+        raise AssertionError("Lesson is not cached")
+
+    async def decoded():
+        response = await response_cache.get_or_generate(key, route.response_model, generate)
+        return await serialize_response(field=route.response_field, response_content=response, dump_json=True)
+
+    async def encoded():
+        return await response_cache.get_or_generate_json(key, generate)
+
+    assert await decoded() == await encoded()
+    results = []
+    for handle in (decoded, encoded):
+        start = time.process_time()
+        for _ in range(requests):
+            await handle()
+        results.append((time.process_time() - start) / requests)
+    return results
+
+
+async def run(args):
+    app.include_router(legacy)
+    settings.PURPOSE_MATCH_ENABLED = False
+    response_cache.enabled = True
+    body = {"sourceLanguage": "English", "targetLanguage": "Spanish", "purpose": "ordering coffee"}
+    routes = {route.path: route for route in legacy.routes}
+    services = {"/terms": tiny_lesson_service, "/grammar": grammar_service}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for scale in args.scale:
+            gemini_service.client = FakeGeminiClient(latency=0, payloads=scaled_payloads(scale))
+            for path in ("/terms", "/grammar"):
+                scaled = {**body, "purpose": f"{body['purpose']} x{scale}"}
+                encoded = await client.post(path, json=scaled)
+                decoded = await client.post(f"/legacy{path}", json=scaled)
+                assert encoded.status_code == decoded.status_code == 200
+                assert encoded.content == decoded.content
+                before = await measure(client, f"/legacy{path}", scaled, args.requests)
+                after = await measure(client, path, scaled, args.requests)
+                # Lessons are cached by now, so only cache hits are timed
+                key = services[path].request_key(*scaled.values())
+                handler_before, handler_after = await measure_handler(
+                    routes[f"/legacy{path}"], key, args.requests)
+                print(f"{path:9} scale={scale:<3} body={len(encoded.content) / 1024:6.1f}KiB  "
+                      f"request {before * 1e6:5.0f}us -> {after * 1e6:5.0f}us  "
+                      f"response work {handler_before * 1e6:5.1f}us -> {handler_after * 1e6:5.1f}us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 10])
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark hedged upstream calls against a long-tailed latency distribution
+
+Requests arrive at a fixed rate against a fake upstream where most calls
+take around --latency seconds but a share --slow-share are several times
+slower, as when a call lands on a busy upstream replica. Compares request
+latency percentiles and upstream calls without hedging and with hedging at
+the configured percentile.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_hedging --requests 1000 --rate 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.hedging import Hedger  # noqa: E402
+from app.services.schema_registry import GRAMMAR_LESSON  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+
+def long_tail(args):
+    def sample() -> float:
+        latency = random.uniform(0.8, 1.2) * args.latency
+        if random.random() < args.slow_share:
+            latency *= random.uniform(3, args.slow_factor)
+        return latency
+    return sample
+
+
+async def run(args, hedger):
+    random.seed(args.seed)
+    fake = FakeGeminiClient(latency=long_tail(args))
+    gemini_service.client = fake
+    gemini_service.hedgers = {"grammar": hedger} if hedger else {}
+    latencies = []
+
+    async def client():
+        sent = time.perf_counter()
+        await gemini_service.call_gemini_with_function("lesson", GRAMMAR_LESSON, endpoint="grammar")
+        latencies.append(time.perf_counter() - sent)
+
+    clients = []
+    for _ in range(args.requests):
+        clients.append(asyncio.create_task(client()))
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*clients)
+    return fake.calls, sorted(latencies)
+
+
+def report(label: str, calls: int, latencies, hedger):
+    def pct(p: float) -> float:
+        return latencies[min(int(p * len(latencies)), len(latencies) - 1)]
+    extra = f" hedged={hedger.hedged} hedge_wins={hedger.hedge_wins} denied={hedger.denied}" if hedger else ""
+    # Cancelled calls never complete, so add the hedges to the completed calls
+    started = calls + (hedger.hedged if hedger else 0)
+    print(f"{label:10} requests={len(latencies)} upstream_calls={started} "
+          f"p50={statistics.median(latencies):.2f}s p95={pct(0.95):.2f}s "
+          f"p99={pct(0.99):.2f}s max={latencies[-1]:.2f}s{extra}")
+
+
+async def run_all(args):
+    report("unhedged", *await run(args, None), None)
+    hedger = Hedger(percentile=args.percentile, budget_ratio=args.budget_ratio)
+    report("hedged", *await run(args, hedger), hedger)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=30, help="Requests per second")
+    parser.add_argument("--latency", type=float, default=0.5, help="Usual upstream latency")
+    parser.add_argument("--slow-share", type=float, default=0.03)
+    parser.add_argument("--slow-factor", type=float, default=10, help="Largest slowdown of a slow call")
+    parser.add_argument("--percentile", type=float, default=0.95)
+    parser.add_argument("--budget-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run_all(args))
+
+
+if __name__ == "__main__":
+    main()
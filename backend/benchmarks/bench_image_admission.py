@@ -0,0 +1,57 @@
+"""
+Benchmark rejecting bad inline images before and after decoding
+
+Compares the header/length admission checks with a full base64 decode for
+an oversized image and for non-image data of the same size.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_image_admission --image-mb 6
+"""
+import argparse
+import base64
+import os
+import timeit
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.utils.image_utils import admit_image_data, decode_image_data, validate_image  # noqa: E402
+
+
+def reject_after_decode(image_data: str) -> None:
+    try:
+        validate_image(decode_image_data(image_data), "image/jpeg")
+    except HTTPException:
+        pass
+
+
+def reject_before_decode(image_data: str) -> None:
+    try:
+        admit_image_data(image_data, "image/jpeg")
+    except HTTPException:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--image-mb", type=float, default=6.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    size = int(args.image_mb * 1024 * 1024)
+    cases = {
+        "oversized_jpeg": b"\xff\xd8\xff\xe0" + os.urandom(size - 4),
+        "not_an_image": b"GIF89a" + os.urandom(4 * 1024 * 1024),
+    }
+    for name, data in cases.items():
+        image_data = "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+        after = timeit.timeit(lambda: reject_after_decode(image_data), number=args.repeat)
+        before = timeit.timeit(lambda: reject_before_decode(image_data), number=args.repeat)
+        print(f"{name} ({len(data) / 1024 / 1024:.1f} MB): "
+              f"decode_then_reject_us={after / args.repeat * 1e6:.0f} "
+              f"admit_reject_us={before / args.repeat * 1e6:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark the Word Cam image result cache
+
+Measures perceptual lookup cost against an index of random 64-bit hashes,
+then checks that recompressed and resized copies of synthetic photos hit
+the cache while unrelated images miss.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_image_cache --entries 1000000
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from app.services.image_cache import HammingIndex, ImageResultCache  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def make_photo(rng: random.Random, size=(1024, 768)) -> Image.Image:
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randrange(80, 500), rng.randrange(80, 400)
+        draw.ellipse([x, y, x + w, y + h], fill=tuple(rng.randrange(256) for _ in range(3)))
+    return image.filter(ImageFilter.GaussianBlur(4))
+
+
+def encode(image: Image.Image, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def bench_index(entries: int, queries: int, max_distance: int, rng: random.Random) -> None:
+    tree = HammingIndex(max_distance)
+    hashes = [rng.getrandbits(64) for _ in range(entries)]
+    start = time.perf_counter()
+    for i, value in enumerate(hashes):
+        tree.add(value, i)
+    build_seconds = time.perf_counter() - start
+
+    latencies, found = [], 0
+    for _ in range(queries):
+        target = rng.randrange(entries)
+        query = flip_bits(hashes[target], rng.randint(0, max_distance), rng)
+        start = time.perf_counter()
+        results = tree.search(query, max_distance)
+        latencies.append(time.perf_counter() - start)
+        found += any(value == target for _, value in results)
+
+    print(f"index entries={entries} build={build_seconds:.1f}s max_distance={max_distance}")
+    print(f"index recall={found / queries:.3f} "
+          f"lookup_ms p50={percentile(latencies, 50) * 1e3:.2f} "
+          f"p99={percentile(latencies, 99) * 1e3:.2f} "
+          f"mean={statistics.mean(latencies) * 1e3:.2f}")
+
+
+async def bench_hit_rate(photos: int, max_distance: int, rng: random.Random) -> None:
+    cache = ImageResultCache(ttl=3600, max_bytes=64 * 1024 * 1024, max_distance=max_distance)
+    context = {"sourceLanguage": "English", "targetLanguage": "Spanish"}
+    images = [make_photo(rng) for _ in range(photos * 2)]
+    stored, unrelated = images[:photos], images[photos:]
+
+    for image in stored:
+        lookup = await cache.lookup("detect_objects", context, encode(image, 90),
+                                    "model", "1", image.size)
+        cache.store(lookup, b'{"objects": []}')
+
+    outcomes = {"exact": 0, "recompressed": 0, "resized": 0, "unrelated": 0}
+    for image in stored:
+        outcomes["exact"] += (await cache.lookup(
+            "detect_objects", context, encode(image, 90), "model", "1", image.size)).entry is not None
+        outcomes["recompressed"] += (await cache.lookup(
+            "detect_objects", context, encode(image, 70), "model", "1", image.size)).entry is not None
+        resized = image.resize((image.width * 3 // 4, image.height * 3 // 4))
+        outcomes["resized"] += (await cache.lookup(
+            "detect_objects", context, encode(resized, 85), "model", "1", resized.size)).entry is not None
+    for image in unrelated:
+        outcomes["unrelated"] += (await cache.lookup(
+            "detect_objects", context, encode(image, 90), "model", "1", image.size)).entry is not None
+
+    print(" ".join(f"{name}_hit_rate={count / photos:.3f}" for name, count in outcomes.items()))
+    print(f"stats={cache.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    parser.add_argument("--photos", type=int, default=50)
+    parser.add_argument("--max-distance", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    bench_index(args.entries, args.queries, args.max_distance, rng)
+    asyncio.run(bench_hit_rate(args.photos, args.max_distance, rng))
+
+
+if __name__ == "__main__":
+    main()
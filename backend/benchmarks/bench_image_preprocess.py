@@ -0,0 +1,96 @@
+"""
+Benchmark /detect-objects with and without server-side image downscaling
+
+Sends phone-camera sized JPEGs to the multipart endpoint against a fake
+Gemini client whose latency grows with the image bytes it receives, and
+reports bytes sent upstream and end-to-end latency per request. The result
+cache is disabled so every request reaches the fake client.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_image_preprocess --requests 5 --upload-mbps 10
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.image_preprocessor import image_preprocessor  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+
+def make_photo(rng: random.Random, size=(4032, 3024)) -> bytes:
+    """A camera-sized JPEG with shapes and sensor-like noise"""
+    image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(30):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        w, h = rng.randrange(200, 1500), rng.randrange(200, 1200)
+        draw.rectangle([x, y, x + w, y + h], fill=tuple(rng.randrange(256) for _ in range(3)))
+    image = image.filter(ImageFilter.GaussianBlur(3))
+    noise = Image.effect_noise(size, 24).convert("RGB")
+    image = Image.blend(image, noise, 0.12)
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=92)
+    return output.getvalue()
+
+
+async def run(photos, fake: FakeGeminiClient):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        for photo in photos:
+            start = time.perf_counter()
+            response = await client.post(
+                "/detect-objects/upload",
+                data={"sourceLanguage": "English", "targetLanguage": "Spanish",
+                      "width": "4032", "height": "3024"},
+                files={"image": ("photo.jpg", photo, "image/jpeg")}
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            coordinates = response.json()["objects"][0]["coordinates"]
+    return latencies, coordinates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=1.0,
+                        help="Upstream seconds per call excluding upload")
+    parser.add_argument("--upload-mbps", type=float, default=10.0,
+                        help="Simulated upstream bandwidth in megabits per second")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    photos = [make_photo(rng) for _ in range(args.requests)]
+    settings.IMAGE_CACHE_ENABLED = False
+    print(f"photo_kb={statistics.mean(len(p) for p in photos) / 1024:.0f} "
+          f"size=4032x3024 upload_mbps={args.upload_mbps}")
+
+    for enabled in (False, True):
+        fake = FakeGeminiClient(
+            latency=args.latency, upload_bytes_per_second=args.upload_mbps * 1e6 / 8)
+        gemini_service.client = fake
+        image_preprocessor.enabled = enabled
+        latencies, coordinates = asyncio.run(run(photos, fake))
+        print(f"preprocess={'on' if enabled else 'off'} "
+              f"upstream_kb_per_request={fake.bytes_sent / args.requests / 1024:.0f} "
+              f"latency_s mean={statistics.mean(latencies):.2f} max={max(latencies):.2f} "
+              f"first_box={coordinates}")
+    image_preprocessor.close()
+
+
+if __name__ == "__main__":
+    main()
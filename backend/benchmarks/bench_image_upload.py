@@ -0,0 +1,77 @@
+"""
+Benchmark /object-descriptors with inline images versus uploaded image IDs
+
+Sends descriptor requests for distinct objects in one photo, as the Word Cam
+details screen does, and reports request body size and server CPU time per
+request. The result cache is disabled so every request reaches the fake
+Gemini client.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_image_upload --requests 50 --image-kb 2048
+"""
+import argparse
+import asyncio
+import base64
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+JPEG_HEADER = b"\xff\xd8\xff\xe0"
+
+
+async def run(requests: int, image_bytes: bytes) -> None:
+    image_base64 = "data:image/jpeg;base64," + base64.b64encode(image_bytes).decode("ascii")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        upload = await client.post("/images", json={
+            "inlineData": {"data": image_base64, "mimeType": "image/jpeg"}})
+        upload.raise_for_status()
+        upload_bytes = len(upload.request.content)
+        image_id = upload.json()["imageId"]
+
+        for mode, image in (
+            ("inline", {"inlineData": {"data": image_base64, "mimeType": "image/jpeg"}}),
+            ("image_id", {"imageId": image_id}),
+        ):
+            body_bytes = 0
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            for i in range(requests):
+                response = await client.post("/object-descriptors", json={
+                    "sourceLanguage": "English",
+                    "targetLanguage": "Spanish",
+                    "object": f"object {i}",
+                    "image": image,
+                })
+                response.raise_for_status()
+                body_bytes += len(response.request.content)
+            cpu = time.process_time() - cpu_start
+            wall = time.perf_counter() - wall_start
+            print(f"mode={mode} request_kb={body_bytes / requests / 1024:.1f} "
+                  f"cpu_ms_per_request={cpu / requests * 1e3:.2f} "
+                  f"wall_ms_per_request={wall / requests * 1e3:.2f}")
+        print(f"one-time upload_kb={upload_bytes / 1024:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--image-kb", type=int, default=2048)
+    args = parser.parse_args()
+
+    settings.IMAGE_CACHE_ENABLED = False
+    gemini_service.client = FakeGeminiClient(latency=0.0)
+    image_bytes = JPEG_HEADER + os.urandom(args.image_kb * 1024 - len(JPEG_HEADER))
+    asyncio.run(run(args.requests, image_bytes))
+
+
+if __name__ == "__main__":
+    main()
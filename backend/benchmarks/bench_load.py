@@ -0,0 +1,288 @@
+"""
+Load-test each feature endpoint against the fake Gemini backend
+
+Starts the app with an in-process fake Gemini client, served by uvicorn on
+a local port (or called in-process with --transport asgi), and drives each
+endpoint with a closed loop of N clients for --duration seconds at each
+concurrency level. Reports requests per second, latency percentiles,
+status codes and resident memory per endpoint and level.
+
+By default every request is distinct and the caches, purpose matching and
+the conversation pool are off, so each request reaches the fake upstream;
+--warm repeats one request per endpoint with them on, to measure the
+cached path.
+
+Results can be saved as JSON with --output and compared to an earlier run
+with --compare, which exits non-zero when throughput fell or p95 latency
+rose by more than --tolerance.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_load --concurrency 1 4 16 64 --duration 10 --output load.json
+    python -m benchmarks.bench_load --compare load.json --feature-latency word_cam=lognormal:1.5,0.4
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.cache import response_cache  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from benchmarks.fake_gemini import CANNED_ARGS, FakeGeminiClient, latency_distribution  # noqa: E402
+
+# Functions the fake answers for each feature
+FEATURE_FUNCTIONS = {
+    "tiny_lesson": ["generate_tiny_lesson"],
+    "grammar": ["generate_grammar_lesson"],
+    "slang_hang": ["generate_slang_conversation"],
+    "word_cam": ["detect_objects", "generate_object_descriptors"],
+}
+
+
+def _image(width: int, height: int) -> str:
+    """A base64 JPEG with enough detail to make preprocessing do real work"""
+    tile = (width // 8, height // 8)
+    noise = Image.frombytes("RGB", tile, random.Random(0).randbytes(tile[0] * tile[1] * 3))
+    image = noise.resize((width, height), Image.BILINEAR)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def endpoints(args):
+    """Path and request body builder per feature; bodies vary by index unless warm"""
+    image = _image(args.image_width, args.image_height)
+
+    def unique(i: int) -> str:
+        return "" if args.warm else f" {i}"
+
+    return {
+        "tiny_lesson": ("/terms", lambda i: {
+            "sourceLanguage": "English", "targetLanguage": "Spanish",
+            "purpose": f"ordering coffee{unique(i)}"}),
+        "grammar": ("/grammar", lambda i: {
+            "sourceLanguage": "English", "targetLanguage": "Spanish",
+            "purpose": f"ordering coffee{unique(i)}"}),
+        # Conversations depend only on the language pair
+        "slang_hang": ("/conversation", lambda i: {
+            "sourceLanguage": "English", "targetLanguage": f"Spanish{unique(i)}"}),
+        # Dimensions are part of the request key, so they make requests distinct
+        "word_cam": ("/detect-objects", lambda i: {
+            "sourceLanguage": "English", "targetLanguage": "Spanish",
+            "image": {"inlineData": {"data": image, "mimeType": "image/jpeg"}},
+            "imageDimensions": {"width": args.image_width + (0 if args.warm else i),
+                                "height": args.image_height}}),
+    }
+
+
+def fake_client(args) -> FakeGeminiClient:
+    latency = {"default": latency_distribution(args.latency)}
+    failure_rate = {"default": args.failure_rate}
+    for feature, spec in args.feature_latency:
+        for name in FEATURE_FUNCTIONS[feature]:
+            latency[name] = latency_distribution(spec)
+    for feature, rate in args.feature_failure_rate:
+        for name in FEATURE_FUNCTIONS[feature]:
+            failure_rate[name] = float(rate)
+    payloads = dict(CANNED_ARGS)
+    if args.payloads:
+        with open(args.payloads) as f:
+            payloads.update(json.load(f))
+    return FakeGeminiClient(latency=latency, payloads=payloads, failure_rate=failure_rate)
+
+
+def memory_mb():
+    """Current and peak resident memory of this process, in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        current = None
+    return current, peak
+
+
+def percentile(latencies, p: float) -> float:
+    return latencies[min(int(p * len(latencies)), len(latencies) - 1)] if latencies else 0.0
+
+
+async def run_level(client: httpx.AsyncClient, path: str, body, concurrency: int, duration: float, counter):
+    latencies = []
+    statuses = Counter()
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            i = next(counter)
+            sent = time.perf_counter()
+            try:
+                response = await client.post(path, json=body(i))
+                statuses[response.status_code] += 1
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - sent)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    current, peak = memory_mb()
+    return {
+        "concurrency": concurrency,
+        "requests": sum(statuses.values()),
+        "ok": len(latencies),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "rps": len(latencies) / elapsed,
+        "p50": statistics.median(latencies) if latencies else 0.0,
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": latencies[-1] if latencies else 0.0,
+        "rssMb": current,
+        "peakRssMb": peak,
+    }
+
+
+@asynccontextmanager
+async def serve(args):
+    """Serve the app and yield a client for it over the chosen transport"""
+    if args.transport == "asgi":
+        async with app.router.lifespan_context(app):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                         timeout=args.timeout) as client:
+                yield client
+        return
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=args.timeout,
+                                     limits=limits) as client:
+            yield client
+    finally:
+        server.should_exit = True
+        await task
+
+
+async def run_all(args):
+    gemini_service.client = fake_client(args)
+    if not args.warm:
+        response_cache.enabled = False
+        settings.IMAGE_CACHE_ENABLED = False
+        settings.PURPOSE_MATCH_ENABLED = False
+        settings.CONVERSATION_POOL_ENABLED = False
+    targets = endpoints(args)
+    results = []
+    counter = iter(range(sys.maxsize))
+    async with serve(args) as client:
+        for feature in args.features:
+            path, body = targets[feature]
+            for concurrency in args.concurrency:
+                result = {"endpoint": path, **await run_level(
+                    client, path, body, concurrency, args.duration, counter)}
+                results.append(result)
+                print(f"{path:16} c={concurrency:<4} ok={result['ok']:<6} rps={result['rps']:7.1f} "
+                      f"p50={result['p50']:.3f}s p95={result['p95']:.3f}s p99={result['p99']:.3f}s "
+                      f"rss={result['rssMb'] or 0:.0f}MB statuses={result['statuses']}")
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path: str, tolerance: float) -> int:
+    """Print changes from a baseline run and return the number of regressions"""
+    with open(baseline_path) as f:
+        baseline = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\ncompared to {baseline_path}:")
+    for result in results:
+        before = baseline.get((result["endpoint"], result["concurrency"]))
+        if before is None:
+            continue
+        rps_change = result["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        p95_change = result["p95"] / before["p95"] - 1 if before["p95"] else 0.0
+        regressed = rps_change < -tolerance or p95_change > tolerance
+        regressions += regressed
+        print(f"{result['endpoint']:16} c={result['concurrency']:<4} rps {rps_change:+.1%} "
+              f"p95 {p95_change:+.1%}{'  REGRESSION' if regressed else ''}")
+    return regressions
+
+
+def feature_setting(value: str):
+    feature, _, setting = value.partition("=")
+    if feature not in FEATURE_FUNCTIONS or not setting:
+        raise argparse.ArgumentTypeError(f"Expected FEATURE=VALUE with a feature in {list(FEATURE_FUNCTIONS)}")
+    return feature, setting
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--features", nargs="+", choices=list(FEATURE_FUNCTIONS), default=list(FEATURE_FUNCTIONS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per concurrency level")
+    parser.add_argument("--latency", default="longtail:0.8,0.03,10",
+                        help="Upstream latency distribution; see fake_gemini.latency_distribution")
+    parser.add_argument("--feature-latency", type=feature_setting, action="append", default=[],
+                        metavar="FEATURE=DISTRIBUTION")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--feature-failure-rate", type=feature_setting, action="append", default=[],
+                        metavar="FEATURE=RATE")
+    parser.add_argument("--payloads", help="JSON file of function-call arguments by function name")
+    parser.add_argument("--warm", action="store_true", help="Repeat one request with caching on")
+    parser.add_argument("--image-width", type=int, default=1600)
+    parser.add_argument("--image-height", type=int, default=1200)
+    parser.add_argument("--transport", choices=["http", "asgi"], default="http")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Save results to this JSON file")
+    parser.add_argument("--compare", help="Compare with the results saved in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative change")
+    args = parser.parse_args()
+    # Shed and failed requests each log, which would drown the results
+    logging.disable(logging.CRITICAL)
+    random.seed(args.seed)
+    results = asyncio.run(run_all(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "args": vars(args),
+                "results": results,
+            }, f, indent=2)
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
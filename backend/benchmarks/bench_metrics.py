@@ -0,0 +1,95 @@
+"""
+Benchmark the cost of recording metrics and of answering a scrape
+
+Times histogram observations and counter increments in a tight loop, a
+request through the timing middleware for scale, and rendering
+/metrics from the merged snapshots of --workers worker processes.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_metrics --observations 1000000 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.metrics import MetricsRegistry, http_request_duration, metrics  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+ROUTES = ("/tiny-lesson", "/grammar", "/slang-hang", "/word-cam")
+
+
+def bench_recording(args):
+    registry = MetricsRegistry()
+    histogram = registry.histogram("bench_seconds", "Benchmark", ("method", "route", "status"))
+    counter = registry.counter("bench_total", "Benchmark", ("route",))
+    values = [random.expovariate(1.0) for _ in range(1000)]
+
+    start = time.perf_counter()
+    for i in range(args.observations):
+        histogram.observe(values[i % 1000], "POST", ROUTES[i % 4], "200")
+    observe_ns = (time.perf_counter() - start) / args.observations * 1e9
+
+    start = time.perf_counter()
+    for i in range(args.observations):
+        counter.inc(ROUTES[i % 4])
+    inc_ns = (time.perf_counter() - start) / args.observations * 1e9
+    print(f"histogram observe: {observe_ns:.0f}ns  counter inc: {inc_ns:.0f}ns")
+
+
+async def bench_requests(args):
+    gemini_service.client = FakeGeminiClient(latency=0)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        start = time.perf_counter()
+        for _ in range(args.requests):
+            await client.get("/")
+        per_request = (time.perf_counter() - start) / args.requests
+        print(f"GET / through the middleware: {per_request * 1e6:.0f}us per request")
+
+        start = time.perf_counter()
+        response = await client.get("/metrics")
+        print(f"GET /metrics (one worker): {(time.perf_counter() - start) * 1e3:.1f}ms, "
+              f"{len(response.text.splitlines())} lines")
+
+
+def bench_merge(args):
+    # Record traffic on this worker, then stand its snapshot in for the other workers
+    for i in range(10000):
+        http_request_duration.observe(random.expovariate(2.0), "POST", ROUTES[i % 4], "200")
+    with tempfile.TemporaryDirectory() as directory:
+        data = json.dumps(metrics.snapshot())
+        for worker in range(args.workers - 1):
+            MetricsRegistry._write(os.path.join(directory, f"metrics-{worker}.json"), data)
+        start = time.perf_counter()
+        others = metrics.read_snapshots(directory, max_age=60)
+        text = metrics.render(metrics.merge([metrics.snapshot()] + others))
+        elapsed = time.perf_counter() - start
+    print(f"scrape merging {args.workers} workers: {elapsed * 1e3:.1f}ms, {len(text)} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--observations", type=int, default=1000000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    random.seed(1)
+    bench_recording(args)
+    asyncio.run(bench_requests(args))
+    bench_merge(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Benchmark upstream micro-batching of concurrent /terms generations
+
+Bursts of distinct purposes for one language pair arrive spread over a
+short interval. Reports upstream calls (the RPM quota used) and request
+latency with micro-batching off and on; merged calls take longer the more
+lessons they return, as set by --item-latency.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_micro_batch --requests 200 --spread 2
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("PURPOSE_MATCH_ENABLED", "false")
+
+from app.config import settings  # noqa: E402
+from app.services.concurrency_limiter import AdaptiveLimiter  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.tiny_lesson import tiny_lesson_batcher, tiny_lesson_service  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+
+async def request(purpose: str, delay: float) -> float:
+    await asyncio.sleep(delay)
+    start = time.perf_counter()
+    await tiny_lesson_service.generate_tiny_lesson("English", "Spanish", purpose)
+    return time.perf_counter() - start
+
+
+async def run(requests: int, spread: float, seed: int):
+    rng = random.Random(seed)
+    return await asyncio.gather(*(
+        request(f"purpose {seed}-{i}", rng.uniform(0, spread)) for i in range(requests)))
+
+
+async def run_all(args):
+    for seed, (enabled, max_size, max_wait_ms) in enumerate((
+        (False, 1, 0),
+        (True, 2, 50),
+        (True, 4, 50),
+        (True, 4, 200),
+        (True, 8, 200),
+    )):
+        fake = FakeGeminiClient(latency=args.latency, output_item_latency=args.item_latency)
+        gemini_service.client = fake
+        # Admit every call, so only batching shapes upstream load
+        gemini_service.limiters["text"] = AdaptiveLimiter("text", max_limit=10 ** 6, adaptive=False)
+        settings.MICRO_BATCH_ENABLED = enabled
+        tiny_lesson_batcher.max_size = max_size
+        tiny_lesson_batcher.max_wait = max_wait_ms / 1000
+        latencies = sorted(await run(args.requests, args.spread, seed))
+        label = f"batch={max_size} wait={max_wait_ms}ms" if enabled else "off"
+        print(f"{label:22} upstream_calls={fake.calls:4} "
+              f"saved={1 - fake.calls / args.requests:5.1%} "
+              f"p50={statistics.median(latencies):.2f}s "
+              f"p95={latencies[int(len(latencies) * 0.95) - 1]:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--spread", type=float, default=2.0,
+                        help="Seconds over which the requests arrive")
+    parser.add_argument("--latency", type=float, default=1.5)
+    parser.add_argument("--item-latency", type=float, default=0.3,
+                        help="Extra seconds per additional lesson in a merged call")
+    args = parser.parse_args()
+
+    print(f"requests={args.requests} spread={args.spread}s latency={args.latency}s "
+          f"item_latency={args.item_latency}s")
+    asyncio.run(run_all(args))
+
+
+if __name__ == "__main__":
+    main()
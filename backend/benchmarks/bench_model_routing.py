@@ -0,0 +1,119 @@
+"""
+Benchmark latency-aware model routing during a slowdown of the primary model
+
+Requests arrive at a fixed rate against a fake upstream where the primary
+model answers in --primary-latency seconds and the fast model in
+--fast-latency, until the primary slows to --slow-latency for the middle
+third of the run. Compares request latency and outcomes per phase with
+routing disabled (every request on the primary) and enabled.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_model_routing --rate 8 --duration 60
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+from collections import Counter
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.config import settings  # noqa: E402
+from app.services.concurrency_limiter import AdaptiveLimiter  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.model_router import ModelRouter  # noqa: E402
+from app.services.schema_registry import GRAMMAR_LESSON  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+PHASES = ("before", "slowdown", "after")
+
+
+class ModelLatencyClient(FakeGeminiClient):
+    """Fake client whose latency depends on the model called"""
+
+    def __init__(self, latencies):
+        super().__init__()
+        self.latencies = latencies
+        self.models = Counter()
+
+    async def _generate_content_async(self, *, model, contents, config=None):
+        self.models[model] += 1
+        await asyncio.sleep(self.latencies(model))
+        return self._respond(contents, config)
+
+
+async def run(args, router):
+    start = time.perf_counter()
+
+    def phase() -> str:
+        return PHASES[min(int((time.perf_counter() - start) / (args.duration / 3)), 2)]
+
+    def latency(model: str) -> float:
+        if model != settings.GEMINI_MODEL:
+            return args.fast_latency
+        return args.slow_latency if phase() == "slowdown" else args.primary_latency
+
+    fake = ModelLatencyClient(latency)
+    gemini_service.client = fake
+    gemini_service.router = router
+    gemini_service.limiters["text"] = AdaptiveLimiter(
+        "text", max_limit=settings.MAX_CONCURRENT_UPSTREAM_CALLS - settings.UPSTREAM_VISION_MAX_CONCURRENCY,
+        min_limit=settings.UPSTREAM_MIN_CONCURRENCY)
+    outcomes = {name: {"ok": [], "failed": 0} for name in PHASES}
+
+    async def client():
+        sent = time.perf_counter()
+        sent_in = phase()
+        try:
+            await gemini_service.call_gemini_with_function("lesson", GRAMMAR_LESSON, endpoint="grammar")
+            outcomes[sent_in]["ok"].append(time.perf_counter() - sent)
+        except Exception:
+            outcomes[sent_in]["failed"] += 1
+
+    clients = []
+    while time.perf_counter() - start < args.duration:
+        clients.append(asyncio.create_task(client()))
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*clients)
+    return outcomes, fake.models
+
+
+def report(label: str, outcomes, models):
+    for name in PHASES:
+        ok = sorted(outcomes[name]["ok"])
+        print(f"{label:8} {name:8} ok={len(ok)} failed={outcomes[name]['failed']} "
+              f"p50={statistics.median(ok) if ok else 0:.2f}s "
+              f"p95={ok[int(len(ok) * 0.95) - 1] if ok else 0:.2f}s")
+    print(f"{label:8} calls per model: {dict(models)}")
+
+
+async def run_all(args):
+    report("fixed", *await run(args, None))
+    router = ModelRouter(
+        primary=settings.GEMINI_MODEL,
+        fast=settings.GEMINI_VISION_MODEL,
+        max_latency=args.max_latency,
+        max_queue=settings.MODEL_ROUTING_MAX_QUEUE,
+        probe_ratio=settings.MODEL_ROUTING_PROBE_RATIO)
+    report("routed", *await run(args, router))
+    print(f"decisions: {router.stats()['decisions']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=8, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--primary-latency", type=float, default=2.0)
+    parser.add_argument("--slow-latency", type=float, default=12.0)
+    parser.add_argument("--fast-latency", type=float, default=0.8)
+    parser.add_argument("--max-latency", type=float, default=settings.MODEL_ROUTING_MAX_LATENCY_SECONDS)
+    args = parser.parse_args()
+    # Shed and failed calls each log, which would drown the results
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run_all(args))
+
+
+if __name__ == "__main__":
+    main()
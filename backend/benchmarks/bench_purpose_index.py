@@ -0,0 +1,118 @@
+"""
+Benchmark near-duplicate purpose matching
+
+Fills one language pair with synthetic purposes, then looks up trivially
+perturbed variants of stored purposes (expected hits), stored purposes with
+one letter of a noun changed and unseen purposes (both expected misses),
+reporting hit rate, false-match rates and lookup latency.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_purpose_index --entries 100000
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.services.purpose_index import PurposeIndex  # noqa: E402
+
+VERBS = ["ordering", "buying", "booking", "asking about", "paying for", "renting",
+         "returning", "finding", "cancelling", "checking", "choosing", "describing"]
+ARTICLES = ["a", "the", "some", "my"]
+CONTEXTS = ["at a cafe", "at the airport", "in a hotel", "at the market", "at work",
+            "on the phone", "at a pharmacy", "at the bank", "online", "with friends"]
+FIXED_WORDS = {word for phrase in VERBS + CONTEXTS for word in phrase.split()}
+
+
+def _word(rng: random.Random) -> str:
+    return "".join(rng.choice("bcdfghjklmnprstvz") + rng.choice("aeiou")
+                   for _ in range(rng.randint(2, 4)))
+
+
+def make_purposes(count: int, rng: random.Random):
+    nouns = list({_word(rng) for _ in range(count)})
+    purposes = set()
+    while len(purposes) < count:
+        purposes.add(" ".join([
+            rng.choice(VERBS), rng.choice(nouns), rng.choice(nouns), rng.choice(CONTEXTS)]))
+    return list(purposes)
+
+
+def perturb(purpose: str, rng: random.Random) -> str:
+    words = purpose.split()
+    choice = rng.randrange(4)
+    if choice == 0:
+        return "  " + purpose.upper() + " "
+    if choice == 1:
+        return " ".join([words[0], rng.choice(ARTICLES)] + words[1:])
+    if choice == 2:
+        return purpose.capitalize() + "?"
+    return purpose.replace("ing ", " ", 1)
+
+
+def misspell(purpose: str, rng: random.Random) -> str:
+    """Change one letter of a noun, which then names a different thing"""
+    words = purpose.split()
+    i = rng.choice([i for i, word in enumerate(words) if word not in FIXED_WORDS])
+    noun = words[i]
+    j = rng.randrange(len(noun))
+    letters = "aeiou" if noun[j] in "aeiou" else "bcdfghjklmnprstvz"
+    words[i] = noun[:j] + rng.choice(letters.replace(noun[j], "")) + noun[j + 1:]
+    return " ".join(words)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=5_000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    scope = ("tiny_lesson", "english", "spanish")
+    purposes = make_purposes(args.entries + args.queries, rng)
+    stored, unseen = purposes[:args.entries], purposes[args.entries:]
+
+    index = PurposeIndex(threshold=args.threshold, max_entries=args.entries)
+    start = time.perf_counter()
+    for purpose in stored:
+        index.add(scope, purpose)
+    build_seconds = time.perf_counter() - start
+
+    latencies, hits, misspelled_matches, false_matches = [], 0, 0, 0
+    for original in rng.sample(stored, args.queries):
+        start = time.perf_counter()
+        match = index.lookup(scope, perturb(original, rng))
+        latencies.append(time.perf_counter() - start)
+        hits += match == original
+    for original in rng.sample(stored, args.queries):
+        start = time.perf_counter()
+        match = index.lookup(scope, misspell(original, rng))
+        latencies.append(time.perf_counter() - start)
+        misspelled_matches += match is not None
+    for purpose in unseen:
+        start = time.perf_counter()
+        match = index.lookup(scope, purpose)
+        latencies.append(time.perf_counter() - start)
+        false_matches += match is not None
+
+    print(f"entries={len(index)} build={build_seconds:.1f}s threshold={args.threshold}")
+    print(f"variant_hit_rate={hits / args.queries:.3f} "
+          f"misspelled_match_rate={misspelled_matches / args.queries:.3f} "
+          f"unseen_false_match_rate={false_matches / len(unseen):.3f} "
+          f"rejected={index.rejected_matches}")
+    print(f"lookup_us p50={percentile(latencies, 50) * 1e6:.0f} "
+          f"p99={percentile(latencies, 99) * 1e6:.0f} "
+          f"mean={statistics.mean(latencies) * 1e6:.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Microbenchmark of rate limit checks across many distinct clients
+
+Compares the token bucket backends with the previous limiter, which kept
+a timestamp list per client and never forgot a client. Each round checks
+every client once; reports time per check and memory held afterwards.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_rate_limit --clients 100000 --rounds 3
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.services.rate_limiter import (  # noqa: E402
+    MemoryRateLimitBackend,
+    RateLimiter,
+    SQLiteRateLimitBackend,
+)
+
+
+class ListRateLimiter:
+    """The previous limiter: a list of timestamps per client, rebuilt per check"""
+
+    def __init__(self, limit: int, window_size: float = 60):
+        self.requests = {}
+        self.window_size = window_size
+        self.limit = limit
+
+    def check(self, client_id: str):
+        current_time = time.time()
+        self.requests[client_id] = [
+            timestamp for timestamp in self.requests.get(client_id, [])
+            if current_time - timestamp < self.window_size
+        ]
+        if len(self.requests[client_id]) >= self.limit:
+            return False, 0.0
+        self.requests[client_id].append(current_time)
+        return True, 0.0
+
+
+def _run(limiter, ids, rounds: int, hot_checks: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for client_id in ids:
+            limiter.check(client_id)
+    spread = time.perf_counter() - start
+
+    # One busy client hammering its own bucket
+    start = time.perf_counter()
+    for _ in range(hot_checks):
+        limiter.check("hot-client")
+    return spread, time.perf_counter() - start
+
+
+def measure(label: str, create, clients: int, rounds: int, hot_checks: int):
+    ids = [f"client-{i}" for i in range(clients)]
+    spread, hot = _run(create(), ids, rounds, hot_checks)
+
+    # Memory is measured in a separate run, tracing slows every allocation
+    tracemalloc.start()
+    limiter = create()
+    _run(limiter, ids, 1, 1)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{label:10} spread={spread / (clients * rounds) * 1e6:6.2f}us/check "
+          f"hot={hot / hot_checks * 1e6:6.2f}us/check memory={memory / 1e6:6.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=100_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--hot-checks", type=int, default=20_000)
+    parser.add_argument("--per-minute", type=int, default=60)
+    args = parser.parse_args()
+
+    print(f"clients={args.clients} rounds={args.rounds} per_minute={args.per_minute}")
+    measure("list", lambda: ListRateLimiter(args.per_minute),
+            args.clients, args.rounds, args.hot_checks)
+    measure("memory", lambda: RateLimiter(MemoryRateLimitBackend(args.clients * 2), args.per_minute),
+            args.clients, args.rounds, args.hot_checks)
+    with tempfile.TemporaryDirectory() as directory:
+        paths = (os.path.join(directory, f"rl{i}.db") for i in range(2))
+        measure("sqlite", lambda: RateLimiter(SQLiteRateLimitBackend(next(paths)), args.per_minute),
+                args.clients, args.rounds, args.hot_checks)
+
+    # Idle clients are forgotten: buckets refill in capacity / rate seconds
+    backend = MemoryRateLimitBackend(args.clients * 2)
+    limiter = RateLimiter(backend, per_minute=6000, burst=1)
+    for i in range(args.clients):
+        limiter.check(f"client-{i}")
+    time.sleep(0.02)
+    limiter.check("late-client")
+    print(f"memory backend after clients idled: tracked={backend.clients()} evicted={backend.evicted}")
+
+
+if __name__ == "__main__":
+    main()
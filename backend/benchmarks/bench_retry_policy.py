@@ -0,0 +1,131 @@
+"""
+Benchmark upstream retries during a brownout and an outage
+
+Requests arrive at a fixed rate against a fake upstream that fails a small
+share of calls, a large share during a brownout and every call during an
+outage, each lasting the middle third of the run. Compares the previous
+policy (three attempts for any error, 1 s then 2 s apart, no budget)
+against the retry budget with full jitter, deadline and circuit breaker.
+Reports the upstream calls made per request (load amplification), the
+calls made while the upstream was failing, and request latency.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_retry_policy --rate 20 --duration 30
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from app.services.concurrency_limiter import AdaptiveLimiter, UpstreamOverloadedError  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.retry_policy import CircuitBreaker, RetryBudget, RetryPolicy  # noqa: E402
+from app.services.schema_registry import TINY_LESSON  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+
+class FixedRetries:
+    """The previous policy: every error retried, without jitter or budget"""
+
+    def __init__(self, max_attempts: int = 3):
+        self.max_attempts = max_attempts
+        self.budget = RetryBudget(0, 0)
+
+    async def call(self, operation, breaker=None):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                return await operation()
+            except Exception:
+                if attempt == self.max_attempts:
+                    raise
+                await asyncio.sleep(min(10, 2 ** (attempt - 1)))
+
+
+async def run(args, policy, breaker: CircuitBreaker, bad_failure_rate: float):
+    start = time.perf_counter()
+
+    def in_bad_period() -> bool:
+        elapsed = time.perf_counter() - start
+        return args.duration / 3 <= elapsed < args.duration * 2 / 3
+
+    fake = FakeGeminiClient(
+        latency=args.latency,
+        failure_rate=lambda: bad_failure_rate if in_bad_period() else args.failure_rate)
+    gemini_service.client = fake
+    gemini_service.retry_policy = policy
+    gemini_service.breakers["text"] = breaker
+    # Admit every call, so only the retry policy shapes upstream load
+    gemini_service.limiters["text"] = AdaptiveLimiter("text", max_limit=10 ** 6, adaptive=False)
+    outcomes = {"ok": [], "failed": [], "fast_fail": 0, "bad_period_calls": 0}
+
+    counted = fake._respond
+
+    def respond(contents, config):
+        if in_bad_period():
+            outcomes["bad_period_calls"] += 1
+        return counted(contents, config)
+
+    fake._respond = respond
+
+    async def client():
+        sent = time.perf_counter()
+        try:
+            await gemini_service.call_gemini_with_function("lesson", TINY_LESSON)
+            outcomes["ok"].append(time.perf_counter() - sent)
+        except UpstreamOverloadedError:
+            outcomes["fast_fail"] += 1
+            outcomes["failed"].append(time.perf_counter() - sent)
+        except Exception:
+            outcomes["failed"].append(time.perf_counter() - sent)
+
+    clients = []
+    while time.perf_counter() - start < args.duration:
+        clients.append(asyncio.create_task(client()))
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.gather(*clients)
+    return len(clients), fake.calls, outcomes
+
+
+def report(label: str, total: int, calls: int, outcomes):
+    latencies = sorted(outcomes["ok"] + outcomes["failed"])
+    print(f"{label:20} requests={total} ok={len(outcomes['ok'])} failed={len(outcomes['failed'])} "
+          f"(fast={outcomes['fast_fail']}) upstream_calls={calls} "
+          f"amplification={calls / total:.2f}x bad_period_calls={outcomes['bad_period_calls']} "
+          f"p50={statistics.median(latencies):.2f}s p99={latencies[int(len(latencies) * 0.99) - 1]:.2f}s "
+          f"max={latencies[-1]:.2f}s")
+
+
+async def run_all(args):
+    for scenario, bad_failure_rate in (("brownout", args.brownout_failure_rate), ("outage", 1.0)):
+        no_breaker = CircuitBreaker("text", failure_threshold=10 ** 9, reset_timeout=0)
+        report(f"{scenario}/fixed", *await run(args, FixedRetries(), no_breaker, bad_failure_rate))
+        policy = RetryPolicy(
+            max_attempts=3, base_delay=args.base_delay, max_delay=8.0, deadline=args.deadline,
+            budget=RetryBudget(args.budget_ratio, 10))
+        breaker = CircuitBreaker("text", failure_threshold=5, reset_timeout=args.reset_timeout)
+        report(f"{scenario}/budgeted", *await run(args, policy, breaker, bad_failure_rate))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rate", type=float, default=20, help="Requests per second")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--latency", type=float, default=0.2, help="Upstream latency")
+    parser.add_argument("--failure-rate", type=float, default=0.02, help="Failures outside the bad period")
+    parser.add_argument("--brownout-failure-rate", type=float, default=0.5)
+    parser.add_argument("--base-delay", type=float, default=0.5)
+    parser.add_argument("--deadline", type=float, default=30)
+    parser.add_argument("--budget-ratio", type=float, default=0.1)
+    parser.add_argument("--reset-timeout", type=float, default=2)
+    args = parser.parse_args()
+    # Every failed call logs an error, which would drown the results
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run_all(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark per-request schema and response-model work
+
+Compares the per-request work around a Gemini function call before and
+after the schema registry: building the function declaration, Tool and
+GenerateContentConfig and copying the returned arguments field by field
+into the response model, against reusing the registry's prebuilt config
+and validating the arguments with its cached TypeAdapter. Reports CPU time
+and peak allocation per request for the grammar and detect-objects
+functions.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_schema_registry --requests 5000
+"""
+import argparse
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+
+from google.genai import types  # noqa: E402
+
+from app.models.grammar import GrammarExample, GrammarResponse, GrammarTopic  # noqa: E402
+from app.models.word_cam import DetectedObject, DetectObjectsResponse  # noqa: E402
+from app.services.schema_registry import DETECT_OBJECTS, GRAMMAR_LESSON  # noqa: E402
+from benchmarks.fake_gemini import CANNED_ARGS  # noqa: E402
+
+
+def legacy_config(declaration: types.FunctionDeclaration) -> types.GenerateContentConfig:
+    return types.GenerateContentConfig(
+        temperature=0.2,
+        top_p=0.95,
+        top_k=64,
+        tools=[types.Tool(function_declarations=[declaration])]
+    )
+
+
+def legacy_grammar(args):
+    """Per-request work of the grammar service before the registry"""
+    legacy_config(types.FunctionDeclaration(
+        name="generate_grammar_lesson",
+        description="Generate grammar topics and examples for a specific language learning context",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "relevantGrammar": types.Schema(
+                    type=types.Type.ARRAY,
+                    description="List of grammar topics relevant to the purpose",
+                    items=types.Schema(
+                        type=types.Type.OBJECT,
+                        properties={
+                            "topic": types.Schema(
+                                type=types.Type.STRING,
+                                description="The grammar topic relevant to the context"),
+                            "description": types.Schema(
+                                type=types.Type.STRING,
+                                description="Description of the grammar rule"),
+                            "examples": types.Schema(
+                                type=types.Type.ARRAY,
+                                description="Examples of the grammar rule in use",
+                                items=types.Schema(
+                                    type=types.Type.OBJECT,
+                                    properties={
+                                        "sentence": types.Schema(
+                                            type=types.Type.STRING,
+                                            description="An example sentence demonstrating the grammar rule"),
+                                        "explanation": types.Schema(
+                                            type=types.Type.STRING,
+                                            description="Explanation of how the grammar rule is applied in the sentence")
+                                    },
+                                    required=["sentence", "explanation"]))
+                        },
+                        required=["topic", "description", "examples"]))
+            },
+            required=["relevantGrammar"])))
+    return GrammarResponse(relevantGrammar=[
+        GrammarTopic(
+            topic=topic.get("topic", ""),
+            description=topic.get("description", ""),
+            examples=[
+                GrammarExample(sentence=example.get("sentence", ""), explanation=example.get("explanation", ""))
+                for example in topic.get("examples", [])
+            ])
+        for topic in args.get("relevantGrammar", [])
+    ])
+
+
+def legacy_detect_objects(args):
+    """Per-request work of the detect-objects service before the registry"""
+    legacy_config(types.FunctionDeclaration(
+        name="detect_objects",
+        description="Detect objects in an image and provide translations",
+        parameters=types.Schema(
+            type=types.Type.OBJECT,
+            properties={
+                "objects": types.Schema(
+                    type=types.Type.ARRAY,
+                    description="List of detected objects",
+                    items=types.Schema(
+                        type=types.Type.OBJECT,
+                        properties={
+                            "name": types.Schema(type="string", description="Name of the detected object"),
+                            "pronunciation": types.Schema(type="string", description="Pronunciation of the object name"),
+                            "translation": types.Schema(type="string", description="Translation of the object name"),
+                            "coordinates": types.Schema(
+                                type=types.Type.ARRAY,
+                                description="Bounding box coordinates [x1, y1, x2, y2]",
+                                items=types.Schema(type=types.Type.NUMBER),
+                                minItems=4,
+                                maxItems=4)
+                        },
+                        required=["name", "translation", "coordinates"]))
+            },
+            required=["objects"])))
+    return DetectObjectsResponse(objects=[
+        DetectedObject(
+            name=obj.get("name", ""),
+            pronunciation=obj.get("pronunciation", ""),
+            translation=obj.get("translation", ""),
+            coordinates=obj.get("coordinates", [0, 0, 0, 0]))
+        for obj in args.get("objects", [])
+    ])
+
+
+def measure_cpu(run, args, requests: int) -> float:
+    """CPU seconds per request"""
+    run(args)
+    start = time.process_time()
+    for _ in range(requests):
+        run(args)
+    return (time.process_time() - start) / requests
+
+
+def measure_peak(run, args) -> int:
+    """Peak bytes allocated while handling one request"""
+    run(args)
+    tracemalloc.start()
+    run(args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    cases = [
+        ("grammar", legacy_grammar, GRAMMAR_LESSON.validate, CANNED_ARGS["generate_grammar_lesson"]),
+        ("detect_objects", legacy_detect_objects, DETECT_OBJECTS.validate, CANNED_ARGS["detect_objects"]),
+    ]
+    for name, legacy, registry, call_args in cases:
+        assert legacy(call_args) == registry(call_args)
+        for label, run in (("per-call", legacy), ("registry", registry)):
+            cpu = measure_cpu(run, call_args, args.requests)
+            peak = measure_peak(run, call_args)
+            print(f"{name:15} {label:9} cpu={cpu * 1e6:7.1f}us  peak_alloc={peak / 1024:6.1f}KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark time to first item of the streaming lesson endpoints
+
+Compares the latency of the buffered /grammar, /terms and /conversation
+endpoints with the time to first item and total time of their /stream
+variants, against a fake Gemini client that streams its JSON response
+evenly over the configured latency.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_streaming --latency 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("CONVERSATION_POOL_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from benchmarks.fake_gemini import CANNED_ARGS, FakeGeminiClient  # noqa: E402
+
+ENDPOINTS = [
+    ("/grammar", {"sourceLanguage": "English", "targetLanguage": "Spanish", "purpose": "ordering food"}),
+    ("/terms", {"sourceLanguage": "English", "targetLanguage": "Spanish", "purpose": "ordering food"}),
+    ("/conversation", {"sourceLanguage": "English", "targetLanguage": "Spanish"}),
+]
+
+
+def _payloads():
+    """Canned payloads with lesson-sized item counts"""
+    payloads = dict(CANNED_ARGS)
+    topic = CANNED_ARGS["generate_grammar_lesson"]["relevantGrammar"][0]
+    payloads["generate_grammar_lesson"] = {"relevantGrammar": [topic] * 5}
+    lesson = CANNED_ARGS["generate_tiny_lesson"]
+    payloads["generate_tiny_lesson"] = {
+        "vocabulary": lesson["vocabulary"] * 4, "phrases": lesson["phrases"] * 4}
+    return payloads
+
+
+async def measure(client: httpx.AsyncClient, path: str, body: dict):
+    start = time.perf_counter()
+    response = await client.post(path, json=body)
+    response.raise_for_status()
+    buffered = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_item = None
+    async with client.stream("POST", path + "/stream", json=body) as response:
+        async for line in response.aiter_lines():
+            event = json.loads(line)
+            if event["type"] == "item" and first_item is None:
+                first_item = time.perf_counter() - start
+            elif event["type"] == "error":
+                raise RuntimeError(event["detail"])
+    total = time.perf_counter() - start
+    return buffered, first_item, total
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run():
+    # A real server is needed: the in-process ASGI transport buffers bodies
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None) as client:
+            for path, body in ENDPOINTS:
+                buffered, first_item, total = await measure(client, path, body)
+                print(f"{path:14} buffered={buffered:.3f}s stream_first_item={first_item:.3f}s "
+                      f"stream_total={total:.3f}s")
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=2.0)
+    args = parser.parse_args()
+    gemini_service.client = FakeGeminiClient(latency=args.latency, payloads=_payloads())
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
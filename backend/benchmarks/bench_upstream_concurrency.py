@@ -0,0 +1,63 @@
+"""
+Benchmark concurrent /terms requests against a slow fake Gemini client
+
+With a non-blocking upstream path, N concurrent requests should finish in
+roughly one call's latency rather than N times it.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_upstream_concurrency --requests 20 --latency 0.5
+    python -m benchmarks.bench_upstream_concurrency --thread-pool
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from benchmarks.fake_gemini import FakeGeminiClient  # noqa: E402
+
+
+async def run(requests: int, latency: float) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            response = await client.post("/terms", json={
+                "sourceLanguage": "English",
+                "targetLanguage": "Spanish",
+                "purpose": f"ordering food #{i}",
+            })
+            response.raise_for_status()
+
+        # Warm up routing and model validation outside the timed section
+        await one(-1)
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--thread-pool", action="store_true",
+                        help="Use the thread-pool fallback instead of the async client")
+    args = parser.parse_args()
+
+    gemini_service.client = FakeGeminiClient(latency=args.latency)
+    gemini_service.use_async_client = not args.thread_pool
+
+    elapsed = asyncio.run(run(args.requests, args.latency))
+    mode = "thread pool" if args.thread_pool else "async client"
+    print(f"mode={mode} requests={args.requests} upstream_latency={args.latency:.3f}s")
+    print(f"elapsed={elapsed:.3f}s serial_estimate={args.requests * args.latency:.3f}s "
+          f"ratio_to_one_call={elapsed / args.latency:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+In-process stand-in for the google-genai client
+
+The fake answers generate_content with a canned function call for whichever
+function the request declares, after a simulated upstream latency. A
+declaration with a requestIndex parameter is answered with one call per
+"Context N:" line of the prompt, as merged requests expect. Calls can be
+made to fail with an upstream error to exercise retries. Latency and
+failure rate can be set per function, so each feature can be given its own
+profile. It exposes both the blocking (client.models) and async
+(client.aio.models) surfaces so either GeminiService code path can be
+exercised without network access or API quota.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Union
+
+from google.genai import errors, types
+
+# Canned function-call arguments for each feature
+CANNED_ARGS: Dict[str, Dict[str, Any]] = {
+    "generate_tiny_lesson": {
+        "vocabulary": [
+            {"term": "café", "transliteration": "", "translation": "coffee"},
+            {"term": "la cuenta", "transliteration": "", "translation": "the bill"},
+            {"term": "el camarero", "transliteration": "", "translation": "the waiter"},
+        ],
+        "phrases": [
+            {"phrase": "Un café, por favor", "transliteration": "", "translation": "A coffee, please"},
+            {"phrase": "¿Cuánto cuesta?", "transliteration": "", "translation": "How much is it?"},
+        ],
+    },
+    "generate_grammar_lesson": {
+        "relevantGrammar": [
+            {
+                "topic": "Polite requests with 'querer'",
+                "description": "Use the conditional 'quisiera' to make polite requests.",
+                "examples": [
+                    {"sentence": "Quisiera un café.", "explanation": "Conditional of 'querer' softens the request."},
+                    {"sentence": "Quisiera pagar.", "explanation": "Followed by an infinitive."},
+                ],
+            },
+        ],
+    },
+    "generate_slang_conversation": {
+        "context": "Two friends meeting at a bar",
+        "dialogue": [
+            {"speaker": "Ana", "message": "¡Qué guay verte!", "notes": "'Guay' means cool."},
+            {"speaker": "Luis", "message": "¡Lo mismo digo, tía!", "notes": "'Tía' is a casual way to address a friend."},
+        ],
+    },
+    "detect_objects": {
+        "objects": [
+            {"name": "taza", "pronunciation": "", "translation": "cup", "coordinates": [10, 20, 110, 140]},
+            {"name": "mesa", "pronunciation": "", "translation": "table", "coordinates": [0, 100, 640, 480]},
+        ],
+    },
+    "generate_object_descriptors": {
+        "descriptors": [
+            {"descriptor": "blanca", "exampleSentence": "La taza es blanca."},
+            {"descriptor": "caliente", "exampleSentence": "El café está caliente."},
+        ],
+    },
+}
+
+
+# A fixed value, a zero-argument callable sampling it, or either keyed by
+# function name with "default" for the other functions
+PerFunction = Union[float, Callable[[], float], Dict[str, Union[float, Callable[[], float]]]]
+
+
+def latency_distribution(spec: str) -> Callable[[], float]:
+    """
+    Parse a latency distribution
+
+    Args:
+        spec: One of "fixed:SECONDS", "uniform:LOW,HIGH",
+            "lognormal:MEDIAN,SIGMA" or "longtail:SECONDS,SHARE,FACTOR",
+            where a share of calls are up to factor times slower
+
+    Returns:
+        A zero-argument callable sampling seconds from the distribution
+
+    Raises:
+        ValueError: If the spec is not understood
+    """
+    kind, _, params = spec.partition(":")
+    try:
+        values = [float(value) for value in params.split(",")] if params else []
+        if kind == "fixed" and len(values) == 1:
+            return lambda: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda: random.uniform(values[0], values[1])
+        if kind == "lognormal" and len(values) == 2:
+            return lambda: values[0] * math.exp(random.gauss(0, values[1]))
+        if kind == "longtail" and len(values) == 3:
+            latency, share, factor = values
+
+            def sample() -> float:
+                sampled = random.uniform(0.8, 1.2) * latency
+                if random.random() < share:
+                    sampled *= random.uniform(2, factor)
+                return sampled
+            return sample
+    except ValueError:
+        pass
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def _per_function(value: Any, name: Optional[str]) -> float:
+    """Resolve a per-function setting and sample it if it is a callable"""
+    if isinstance(value, dict):
+        value = value.get(name, value.get("default", 0.0))
+    return value() if callable(value) else value
+
+
+def _declared_function_name(config: Optional[types.GenerateContentConfig]) -> str:
+    """Return the name of the first function declared in the request config"""
+    for tool in (config.tools or []) if config else []:
+        for declaration in tool.function_declarations or []:
+            return declaration.name
+    raise ValueError("Request declares no function")
+
+
+def _declares_request_index(config: Optional[types.GenerateContentConfig]) -> bool:
+    """Whether the declared function takes a requestIndex (a merged request)"""
+    for tool in (config.tools or []) if config else []:
+        for declaration in tool.function_declarations or []:
+            return "requestIndex" in (declaration.parameters.properties or {})
+    return False
+
+
+def _merged_indexes(contents: Any) -> list:
+    """Numbers of the contexts listed in a merged request's prompt"""
+    return [int(i) for i in re.findall(r"Context (\d+):", contents if isinstance(contents, str) else "")]
+
+
+def _payload_name_for_schema(payloads: Dict[str, Dict[str, Any]], config: Optional[types.GenerateContentConfig]) -> str:
+    """Return the payload whose fields match the requested response schema"""
+    schema = config.response_schema if config else None
+    properties = set(schema.properties or {}) if schema else set()
+    for name, payload in payloads.items():
+        if set(payload) == properties:
+            return name
+    raise ValueError("Request schema matches no canned payload")
+
+
+def _function_name(payloads: Dict[str, Dict[str, Any]], config: Optional[types.GenerateContentConfig]) -> Optional[str]:
+    """Return the function a request is for, by declaration or response schema"""
+    try:
+        if config and config.response_schema:
+            return _payload_name_for_schema(payloads, config)
+        return _declared_function_name(config)
+    except ValueError:
+        return None
+
+
+def build_function_call_response(name: str, args: Dict[str, Any]) -> types.GenerateContentResponse:
+    """Build a GenerateContentResponse carrying a single function call"""
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(
+                    role="model",
+                    parts=[types.Part(function_call=types.FunctionCall(name=name, args=args))]
+                )
+            )
+        ]
+    )
+
+
+def build_function_calls_response(calls: list) -> types.GenerateContentResponse:
+    """Build a GenerateContentResponse carrying several function calls"""
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(
+                    role="model",
+                    parts=[
+                        types.Part(function_call=types.FunctionCall(name=name, args=args))
+                        for name, args in calls
+                    ]
+                )
+            )
+        ]
+    )
+
+
+def build_text_response(text: str) -> types.GenerateContentResponse:
+    """Build a GenerateContentResponse carrying a text part"""
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(role="model", parts=[types.Part(text=text)])
+            )
+        ]
+    )
+
+
+class FakeGeminiClient:
+    """
+    Fake google-genai client with a fixed or sampled upstream latency
+
+    Streaming calls return the canned payload as JSON text split into
+    stream_chunks pieces spread evenly over the sampled latency. Inline
+    image bytes add their transfer time at upload_bytes_per_second.
+
+    Args:
+        latency: Seconds per call, or a zero-argument callable returning
+            them, either of which may be keyed by function name
+        payloads: Function-call arguments keyed by function name
+        stream_chunks: Number of chunks a streamed response is split into
+        upload_bytes_per_second: Simulated upstream bandwidth, unlimited if None
+        output_item_latency: Extra seconds per additional result of a merged request
+        failure_rate: Share of calls that fail, or a zero-argument callable
+            returning it, either of which may be keyed by function name
+        failure_code: HTTP status of the injected failures
+    """
+
+    def __init__(
+        self,
+        latency: PerFunction = 1.0,
+        payloads: Optional[Dict[str, Dict[str, Any]]] = None,
+        stream_chunks: int = 20,
+        upload_bytes_per_second: Optional[float] = None,
+        output_item_latency: float = 0.0,
+        failure_rate: PerFunction = 0.0,
+        failure_code: int = 503
+    ):
+        self.latency = latency
+        self.payloads = payloads or CANNED_ARGS
+        self.stream_chunks = stream_chunks
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.output_item_latency = output_item_latency
+        self.failure_rate = failure_rate
+        self.failure_code = failure_code
+        self.calls = 0
+        self.failures = 0
+        self.bytes_sent = 0
+        self.models = SimpleNamespace(generate_content=self._generate_content)
+        self.aio = SimpleNamespace(
+            models=SimpleNamespace(
+                generate_content=self._generate_content_async,
+                generate_content_stream=self._generate_content_stream_async
+            )
+        )
+
+    def _sample_latency(self, config: Optional[types.GenerateContentConfig] = None) -> float:
+        return _per_function(self.latency, _function_name(self.payloads, config))
+
+    def _call_latency(self, contents: Any, config: Optional[types.GenerateContentConfig] = None) -> float:
+        """Sampled latency plus the transfer time of inline image bytes"""
+        sent = sum(
+            len(part.inline_data.data)
+            for part in (contents if isinstance(contents, list) else [])
+            if getattr(part, "inline_data", None) is not None
+        )
+        self.bytes_sent += sent
+        transfer = sent / self.upload_bytes_per_second if self.upload_bytes_per_second else 0.0
+        extra_items = max(len(_merged_indexes(contents)) - 1, 0)
+        return self._sample_latency(config) + transfer + extra_items * self.output_item_latency
+
+    def _maybe_fail(self, config: Optional[types.GenerateContentConfig] = None) -> None:
+        rate = _per_function(self.failure_rate, _function_name(self.payloads, config))
+        if random.random() < rate:
+            self.failures += 1
+            error = errors.ServerError if self.failure_code >= 500 else errors.ClientError
+            status = "RESOURCE_EXHAUSTED" if self.failure_code == 429 else "UNAVAILABLE"
+            raise error(self.failure_code, {"error": {
+                "code": self.failure_code, "message": "Injected failure", "status": status}})
+
+    def _respond(self, contents: Any, config: Optional[types.GenerateContentConfig]) -> types.GenerateContentResponse:
+        self.calls += 1
+        self._maybe_fail(config)
+        if config and config.response_schema:
+            return build_text_response(self._json_text(config))
+        name = _declared_function_name(config)
+        if _declares_request_index(config):
+            return build_function_calls_response([
+                (name, {**self.payloads[name], "requestIndex": index})
+                for index in _merged_indexes(contents)
+            ])
+        return build_function_call_response(name, self.payloads[name])
+
+    def _json_text(self, config: Optional[types.GenerateContentConfig]) -> str:
+        name = _payload_name_for_schema(self.payloads, config)
+        return json.dumps(self.payloads[name], ensure_ascii=False)
+
+    def _generate_content(self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None):
+        time.sleep(self._call_latency(contents, config))
+        return self._respond(contents, config)
+
+    async def _generate_content_async(self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None):
+        await asyncio.sleep(self._call_latency(contents, config))
+        return self._respond(contents, config)
+
+    async def _generate_content_stream_async(self, *, model: str, contents: Any, config: Optional[types.GenerateContentConfig] = None):
+        self.calls += 1
+        self._maybe_fail(config)
+        text = self._json_text(config)
+        size = -(-len(text) // self.stream_chunks)
+        delay = self._sample_latency(config) / self.stream_chunks
+
+        async def chunks():
+            for start in range(0, len(text), size):
+                await asyncio.sleep(delay)
+                yield build_text_response(text[start:start + size])
+
+        return chunks()
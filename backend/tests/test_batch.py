@@ -0,0 +1,128 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi import HTTPException  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tiny_lesson import TinyLessonResponse  # noqa: E402
+from app.services.tiny_lesson import tiny_lesson_service  # noqa: E402
+from app.utils.batch import check_batch_size, fan_out  # noqa: E402
+
+
+class DelayedHandler:
+    """Doubles an item after it in seconds/100, failing on negative items"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.started = []
+        self.cancelled = 0
+
+    async def __call__(self, item):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.started.append(item)
+        try:
+            await asyncio.sleep(abs(item) / 100)
+            if item < 0:
+                raise RuntimeError(f"item {item} failed")
+            return item * 2
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+
+
+def _collect(items, handler, concurrency):
+    async def run():
+        return [result async for result in fan_out(items, handler, concurrency, "Failed")]
+
+    return asyncio.run(run())
+
+
+def test_results_arrive_in_completion_order_with_their_index():
+    """Fast items are yielded first, each tagged with its position in the batch"""
+    results = _collect([3, 1, 2], DelayedHandler(), concurrency=3)
+
+    assert results == [(1, 2, None), (2, 4, None), (0, 6, None)]
+
+
+def test_failed_items_are_reported_without_failing_the_batch():
+    """A failing item carries the client-facing error, the others their result"""
+    results = _collect([1, -2, 3], DelayedHandler(), concurrency=3)
+
+    assert sorted(results) == [(0, 2, None), (1, None, "Failed"), (2, 6, None)]
+
+
+def test_concurrency_is_bounded_and_items_start_in_order():
+    """At most concurrency items run at once, taken from the front of the batch"""
+    handler = DelayedHandler()
+    items = [1] * 10 + [2, 3]
+
+    results = _collect(items, handler, concurrency=3)
+
+    assert handler.max_running == 3
+    assert handler.started == items
+    assert sorted(index for index, _, _ in results) == list(range(len(items)))
+
+
+def test_closing_the_iterator_cancels_remaining_items():
+    """A client that stops reading cancels the work still running"""
+    handler = DelayedHandler()
+
+    async def run():
+        results = fan_out([1, 50, 50, 50], handler, 2, "Failed")
+        first = await results.__anext__()
+        await results.aclose()
+        return first
+
+    assert asyncio.run(run()) == (0, 2, None)
+    assert handler.cancelled == 2
+    assert handler.started == [1, 50, 50]
+    assert handler.running == 0
+
+
+def test_oversized_batches_are_rejected(monkeypatch):
+    """Batches over BATCH_MAX_ITEMS fail with 400 before any work starts"""
+    monkeypatch.setattr(settings, "BATCH_MAX_ITEMS", 2)
+
+    check_batch_size([1, 2])
+    with pytest.raises(HTTPException) as error:
+        check_batch_size([1, 2, 3])
+    assert error.value.status_code == 400
+
+
+def test_batch_endpoint_returns_items_in_request_order(monkeypatch):
+    """The batch response lists every item at its index, failed ones with an error"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+    async def fake_generate(source_language, target_language, purpose):
+        if purpose == "fail":
+            raise RuntimeError("upstream failed")
+        await asyncio.sleep(0.03 if purpose == "slow" else 0)
+        return TinyLessonResponse(vocabulary=[{"term": purpose, "translation": purpose}], phrases=[])
+
+    monkeypatch.setattr(tiny_lesson_service, "generate_tiny_lesson", fake_generate)
+    purposes = ["slow", "fail", "fast"]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/terms/batch", json={"items": [
+                {"sourceLanguage": "English", "targetLanguage": "Spanish", "purpose": purpose}
+                for purpose in purposes]})
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert [item["index"] for item in items] == [0, 1, 2]
+    assert items[0]["result"]["vocabulary"][0]["term"] == "slow"
+    assert items[1] == {"index": 1, "result": None, "error": "Failed to generate tiny lesson"}
+    assert items[2]["result"]["vocabulary"][0]["term"] == "fast"
@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+from app.models.grammar import GrammarResponse  # noqa: E402
+from app.services.cache import ResponseCache  # noqa: E402
+from app.services.lesson_store import LessonStore  # noqa: E402
+from app.services.model_router import mark_fallback, prefer_fast  # noqa: E402
+from app.utils.timing import RequestTimings, current_timings  # noqa: E402
+
+LESSON = GrammarResponse(relevantGrammar=[])
+
+
+async def _not_cached():
+    raise AssertionError("Lesson is not cached")
+
+
+def test_empty_lesson_store_is_consulted(tmp_path):
+    """A store with nothing in it yet is still read, without counting its rows"""
+    store = LessonStore(str(tmp_path / "lessons.db"))
+    cache = ResponseCache(ttl=60, stale_ttl=60, max_memory_bytes=1024 * 1024, store=store)
+    looked_up = []
+    get = store.get
+
+    def recording_get(key):
+        looked_up.append(key)
+        return get(key)
+
+    store.get = recording_get
+
+    async def generate():
+        # The CLI stores the lesson while this request generates it
+        store.put("other", "grammar", {}, LESSON.model_dump_json().encode("utf-8"))
+        return LESSON
+
+    async def run():
+        await cache.get_or_generate_json("key", generate)
+        return await cache.get_or_generate_json("other", _not_cached)
+
+    value = asyncio.run(run())
+
+    assert looked_up == ["key", "other"]
+    assert GrammarResponse.model_validate_json(value) == LESSON
+    assert cache.store_hits == 1
+
+
+def test_refresh_does_not_inherit_the_model_hint():
+    """A stale hit from a fast-hinted request refreshes with the primary and stores it"""
+    cache = ResponseCache(ttl=0, stale_ttl=60, max_memory_bytes=1024 * 1024)
+    hints = []
+
+    async def generate():
+        hints.append((prefer_fast.get(), current_timings.get()))
+        if prefer_fast.get():
+            mark_fallback()
+        return LESSON
+
+    async def run():
+        await cache.get_or_generate_json("key", generate)
+        prefer_fast.set(True)
+        current_timings.set(RequestTimings())
+        await cache.get_or_generate_json("key", generate)
+        await asyncio.gather(*cache._tasks)
+
+    asyncio.run(run())
+
+    assert hints == [(False, None), (False, None)]
+    assert cache.stale_hits == 1
+    assert cache.fallback_skips == 0
+    assert cache.refresh_failures == 0
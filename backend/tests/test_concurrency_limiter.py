@@ -0,0 +1,140 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import grammar  # noqa: E402
+from app.services.cache import ResponseCache  # noqa: E402
+from app.services.concurrency_limiter import AdaptiveLimiter, UpstreamOverloadedError  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+
+
+def test_calls_beyond_the_queue_are_shed():
+    """With every slot taken and the queue full, a call fails fast"""
+    limiter = AdaptiveLimiter("text", max_limit=1, max_queue=1, max_wait=10, adaptive=False)
+
+    async def run():
+        await limiter.acquire()
+        queued = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(UpstreamOverloadedError) as error:
+            await limiter.acquire()
+        limiter.release()
+        await queued
+        return error.value
+
+    error = asyncio.run(run())
+
+    assert error.bulkhead == "text"
+    assert error.retry_after >= 1
+    assert (limiter.admitted, limiter.queued, limiter.shed_queue_full) == (2, 1, 1)
+    assert limiter.in_flight == 1
+
+
+def test_queued_calls_are_shed_after_max_wait():
+    """A call waiting longer than max_wait for a slot fails and leaves the queue"""
+    limiter = AdaptiveLimiter("text", max_limit=1, max_queue=4, max_wait=0.01, adaptive=False)
+
+    async def run():
+        await limiter.acquire()
+        with pytest.raises(UpstreamOverloadedError):
+            await limiter.acquire()
+
+    asyncio.run(run())
+
+    assert limiter.shed_timeout == 1
+    assert limiter.queue_depth == 0
+    assert limiter.in_flight == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    """A client that goes away while queued frees its place"""
+    limiter = AdaptiveLimiter("text", max_limit=1, max_queue=4, max_wait=10, adaptive=False)
+
+    async def run():
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        limiter.release()
+
+    asyncio.run(run())
+
+    assert limiter.queue_depth == 0
+    assert limiter.in_flight == 0
+
+
+def test_overload_lowers_the_limit_and_success_raises_it():
+    """Overload multiplies the limit by backoff; successes add back one per limit calls"""
+    limiter = AdaptiveLimiter("text", max_limit=8, min_limit=2, backoff=0.5)
+    limiter.latency = 10.0
+
+    async def call(**outcome):
+        await limiter.acquire()
+        limiter.release(**outcome)
+
+    async def run():
+        await call(overloaded=True)
+        after_overload = limiter.limit
+        # Decreases happen at most once per usual call duration (10s here)
+        await call(overloaded=True)
+        repeated = limiter.limit
+        for _ in range(8):
+            await call(latency=0.01)
+        return after_overload, repeated
+
+    after_overload, repeated = asyncio.run(run())
+
+    assert after_overload == repeated == 4
+    assert 5 < limiter.limit < 6
+    assert limiter.decreases == 1
+
+
+def test_limit_stays_within_bounds():
+    """The limit never drops below min_limit or grows past max_limit"""
+    limiter = AdaptiveLimiter("text", max_limit=4, min_limit=2, backoff=0.1)
+
+    async def run():
+        await limiter.acquire()
+        limiter.release(overloaded=True)
+        low = limiter.limit
+        for _ in range(100):
+            await limiter.acquire()
+            limiter.release(latency=0.001)
+        return low
+
+    assert asyncio.run(run()) == 2
+    assert limiter.limit == 4
+
+
+def test_shed_request_maps_to_503_with_retry_after(monkeypatch):
+    """A request shed by the upstream limiter gets 503 and when to retry"""
+    limiter = AdaptiveLimiter("text", max_limit=1, max_queue=0, adaptive=False)
+    limiter.latency = 2.5
+    monkeypatch.setitem(gemini_service.limiters, "text", limiter)
+    monkeypatch.setattr(gemini_service, "hedgers", {})
+    monkeypatch.setattr(grammar, "response_cache", ResponseCache(
+        ttl=60, stale_ttl=60, max_memory_bytes=1024 * 1024))
+    monkeypatch.setattr(settings, "PURPOSE_MATCH_ENABLED", False)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+    async def run():
+        # Every slot is taken by another call
+        await limiter.acquire()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/grammar", json={
+                "sourceLanguage": "English", "targetLanguage": "Spanish", "purpose": "ordering coffee"})
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert response.json() == {"detail": "Service is busy. Please try again later."}
+    assert limiter.shed_queue_full >= 1
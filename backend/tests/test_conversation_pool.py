@@ -0,0 +1,141 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+from app.models.slang_hang import DialogueLine, SlangHangResponse  # noqa: E402
+from app.services import slang_hang  # noqa: E402
+from app.services.cache import ResponseCache  # noqa: E402
+from app.services.conversation_pool import ConversationPool  # noqa: E402
+from app.services.lesson_store import LessonStore  # noqa: E402
+from app.services.model_router import prefer_fast  # noqa: E402
+
+
+def _conversation(context: str) -> SlangHangResponse:
+    return SlangHangResponse(context=context, dialogue=[
+        DialogueLine(speaker="Ana", message="¿Qué onda?", notes="Casual greeting")])
+
+
+class FakeFetch:
+    """Fetches variant n as a conversation with context "n", recording calls"""
+
+    def __init__(self, shared: bool = True):
+        self.variants = []
+        self.shared = shared
+
+    async def __call__(self, source_language, target_language, variant):
+        self.variants.append(variant)
+        return _conversation(str(variant)), self.shared
+
+
+def test_miss_fetches_a_single_conversation():
+    """A request finding the pool empty costs one fetch and starts no refill"""
+    fetch = FakeFetch()
+    pool = ConversationPool(fetch, min_size=4)
+
+    async def run():
+        response = await pool.take("English", "Spanish", "client-a")
+        await asyncio.sleep(0)
+        return response
+
+    response = asyncio.run(run())
+
+    assert response.context == "0"
+    assert fetch.variants == [0]
+
+
+def test_clients_never_get_a_conversation_twice():
+    """Each client gets distinct conversations and each is served max_serves times"""
+    fetch = FakeFetch()
+    pool = ConversationPool(fetch, max_serves=2)
+
+    async def run():
+        served = {}
+        for client in ("a", "b", "a", "c", "a"):
+            response = await pool.take("English", "Spanish", client)
+            served.setdefault(client, []).append(response.context)
+        await pool.close()
+        return served
+
+    served = asyncio.run(run())
+
+    assert all(len(contexts) == len(set(contexts)) for contexts in served.values())
+    assert served["b"] == ["0"]
+    counts = {}
+    for contexts in served.values():
+        for context in contexts:
+            counts[context] = counts.get(context, 0) + 1
+    assert max(counts.values()) <= 2
+
+
+def test_fallback_answers_are_not_pooled():
+    """A conversation that may not be shared goes to its requester only"""
+    fetch = FakeFetch(shared=False)
+    pool = ConversationPool(fetch)
+
+    async def run():
+        first = await pool.take("English", "Spanish", "a")
+        second = await pool.take("English", "Spanish", "b")
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert (first.context, second.context) == ("0", "1")
+    assert pool.fallback_skips == 2
+
+
+def test_pool_is_seeded_from_the_lesson_store(monkeypatch, tmp_path):
+    """The pre-generated conversation of a pair is served without calling Gemini"""
+    store = LessonStore(str(tmp_path / "lessons.db"))
+    key = slang_hang.slang_hang_service.request_key("English", "Spanish")
+    store.put(key, "slang_hang", {"sourceLanguage": "English", "targetLanguage": "Spanish"},
+              _conversation("stored").model_dump_json().encode("utf-8"))
+    cache = ResponseCache(ttl=60, stale_ttl=60, max_memory_bytes=1024 * 1024, store=store)
+    monkeypatch.setattr(slang_hang, "response_cache", cache)
+    generated = []
+
+    async def fake_generate(source_language, target_language):
+        generated.append((source_language, target_language))
+        return _conversation("generated")
+
+    monkeypatch.setattr(slang_hang.slang_hang_service, "_generate_slang_conversation", fake_generate)
+    pool = ConversationPool(slang_hang.slang_hang_service._pooled_conversation)
+
+    async def run():
+        first = await pool.take("English", "Spanish", "a")
+        # The same client gets the next variant, generated and cached
+        second = await pool.take("English", "Spanish", "a")
+        await pool.close()
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert first.context == "stored"
+    assert second.context == "generated"
+    assert generated == [("English", "Spanish")]
+    assert cache.store_hits == 1
+    assert len(cache.memory) == 2
+
+
+def test_refill_does_not_inherit_the_model_hint():
+    """Refills started by a fast-hinted request ask for the primary model"""
+    hints = {}
+
+    async def fetch(source_language, target_language, variant):
+        hints[variant] = prefer_fast.get()
+        return _conversation(str(variant)), True
+
+    pool = ConversationPool(fetch, min_size=2, low_water_ratio=1)
+
+    async def run():
+        prefer_fast.set(True)
+        await pool.take("English", "Spanish", "a")
+        # Served from the pool, starting a refill
+        await pool.take("English", "Spanish", "b")
+        await asyncio.gather(*(p.refill_task for p in pool._pools.values()))
+
+    asyncio.run(run())
+
+    assert hints[0] is True
+    assert len(hints) > 1
+    assert not any(hint for variant, hint in hints.items() if variant > 0)
@@ -0,0 +1,138 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import pytest  # noqa: E402
+
+from app.services.hedging import Hedger, LatencyTracker  # noqa: E402
+
+
+class Call:
+    """Returns or raises after a delay, recording whether it was cancelled"""
+
+    def __init__(self, delay: float, result: str = None, error: Exception = None):
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.started = 0
+        self.cancelled = False
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def _hedger(delay: float = 0.01, tokens: float = 10) -> Hedger:
+    """Hedger that fires hedges after delay seconds"""
+    hedger = Hedger(percentile=0.5, budget_ratio=0, max_tokens=tokens, min_samples=5)
+    for _ in range(5):
+        hedger.latencies.add(delay)
+    return hedger
+
+
+def _run(hedger: Hedger, primary: Call, hedge: Call):
+    return asyncio.run(hedger.run(primary, hedge))
+
+
+def test_latency_percentiles():
+    """A percentile is the latency a share of recent calls finished within"""
+    tracker = LatencyTracker(window=100, refresh_every=1)
+    for latency in range(1, 101):
+        tracker.add(latency / 100)
+
+    assert tracker.percentile(0.5) == 0.51
+    assert tracker.percentile(0.95) == 0.96
+    assert tracker.percentile(1.0) == 1.0
+
+
+def test_no_hedging_before_enough_samples():
+    """Until min_samples latencies are known, calls are never hedged"""
+    hedger = Hedger(percentile=0.5, budget_ratio=1, min_samples=5)
+    hedge = Call(0, "hedge")
+
+    assert _run(hedger, Call(0.05, "primary"), hedge) == "primary"
+    assert hedge.started == 0
+    assert hedger.delay() is None
+
+
+def test_fast_primary_is_not_hedged():
+    """A call finishing within the usual latency costs nothing extra"""
+    hedger = _hedger(delay=0.5)
+    hedge = Call(0, "hedge")
+
+    assert _run(hedger, Call(0, "primary"), hedge) == "primary"
+    assert hedge.started == 0
+    assert hedger.hedged == 0
+
+
+def test_slow_primary_is_hedged_and_cancelled_when_the_hedge_wins():
+    """The first result wins and the slower call is cancelled"""
+    hedger = _hedger()
+    primary = Call(5, "primary")
+
+    assert _run(hedger, primary, Call(0, "hedge")) == "hedge"
+    assert primary.cancelled
+    assert (hedger.hedged, hedger.hedge_wins) == (1, 1)
+
+
+def test_primary_still_wins_if_it_finishes_first():
+    """A hedge that is slower than the primary is cancelled"""
+    hedger = _hedger()
+    hedge = Call(5, "hedge")
+
+    assert _run(hedger, Call(0.05, "primary"), hedge) == "primary"
+    assert hedge.cancelled
+    assert (hedger.hedged, hedger.hedge_wins) == (1, 0)
+
+
+def test_failed_call_falls_back_to_the_other():
+    """If one call fails, the other's result is used"""
+    hedger = _hedger()
+
+    assert _run(hedger, Call(0.05, error=RuntimeError("primary failed")), Call(0.1, "hedge")) == "hedge"
+    assert _run(hedger, Call(0.1, "primary"), Call(0.02, error=RuntimeError("hedge failed"))) == "primary"
+
+
+def test_both_failing_raises_the_primary_error():
+    """When every call fails the caller sees the primary's error"""
+    hedger = _hedger()
+
+    with pytest.raises(RuntimeError, match="primary failed"):
+        _run(hedger, Call(0.05, error=RuntimeError("primary failed")),
+             Call(0, error=RuntimeError("hedge failed")))
+
+
+def test_hedges_are_limited_by_the_budget():
+    """Without tokens left a slow call waits for itself"""
+    hedger = _hedger(tokens=1)
+    hedge = Call(0, "hedge")
+
+    assert _run(hedger, Call(0.03, "primary"), hedge) == "hedge"
+    assert _run(hedger, Call(0.03, "primary"), hedge) == "primary"
+    assert hedge.started == 1
+    assert (hedger.hedged, hedger.denied) == (1, 1)
+
+
+def test_cancelling_the_caller_cancels_both_calls():
+    """A client that goes away stops the primary and the hedge"""
+    hedger = _hedger()
+    primary, hedge = Call(5, "primary"), Call(5, "hedge")
+
+    async def run():
+        task = asyncio.create_task(hedger.run(primary, hedge))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+
+    assert hedge.started == 1
+    assert primary.cancelled and hedge.cancelled
@@ -0,0 +1,66 @@
+import asyncio
+import io
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+
+from app.services.image_cache import ImageResultCache, dhash  # noqa: E402
+
+CONTEXT = {"targetLanguage": "Spanish", "sourceLanguage": "English"}
+
+
+def _jpeg(draw, background: int = 200, quality: int = 90, size=(640, 480)) -> bytes:
+    image = Image.new("L", size, background)
+    draw(ImageDraw.Draw(image))
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _photo(quality: int = 90, size=(640, 480)) -> bytes:
+    image = Image.new("RGB", (640, 480), (40, 90, 160))
+    draw = ImageDraw.Draw(image)
+    draw.ellipse([60, 80, 300, 400], fill=(230, 200, 40))
+    draw.rectangle([360, 40, 600, 260], fill=(20, 20, 20))
+    image = image.filter(ImageFilter.GaussianBlur(4)).resize(size)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def _lookup_then_store(cache: ImageResultCache, image_bytes: bytes, value: bytes):
+    async def run():
+        lookup = await cache.lookup("detect_objects", CONTEXT, image_bytes, "model", "v1")
+        if lookup.entry is None:
+            cache.store(lookup, value)
+        return lookup
+
+    return asyncio.run(run())
+
+
+def test_distinct_low_contrast_images_do_not_collide():
+    """Faint text on a page and a faint line on a wall get their own responses"""
+    page = _jpeg(lambda draw: draw.text((100, 100), "menu: cafe 2 eur", fill=190))
+    wall = _jpeg(lambda draw: draw.line([(300, 50), (320, 400)], fill=192, width=3))
+    cache = ImageResultCache(ttl=60, max_bytes=1024 * 1024, perceptual=True)
+
+    assert dhash(page) is None and dhash(wall) is None
+    _lookup_then_store(cache, page, b'{"objects": ["menu"]}')
+    lookup = _lookup_then_store(cache, wall, b'{"objects": ["wall"]}')
+
+    assert lookup.entry is None
+    assert cache.perceptual_hits == 0
+    assert cache.misses == 2
+
+
+def test_recompressed_copy_hits_perceptual_tier():
+    """A recompressed, resized copy of a photo reuses its response when enabled"""
+    cache = ImageResultCache(ttl=60, max_bytes=1024 * 1024, perceptual=True)
+
+    _lookup_then_store(cache, _photo(), b'{"objects": ["sun"]}')
+    lookup = _lookup_then_store(cache, _photo(quality=60, size=(600, 450)), b"")
+
+    assert lookup.tier == "perceptual"
+    assert lookup.entry.value == b'{"objects": ["sun"]}'
@@ -0,0 +1,93 @@
+import json
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import pytest  # noqa: E402
+
+from app.utils.json_stream import FIELD, ITEM, JsonStreamParser  # noqa: E402
+
+LESSON = {
+    "context": "Ordering at a café, \"quickly\" {and} [politely]",
+    "vocabulary": [
+        {"term": "café", "translation": "coffee", "tags": ["drink", "hot"]},
+        {"term": "leche", "translation": "milk \\ dairy", "tags": []},
+    ],
+    "scores": [1, 2.5, -3e2, True, None],
+    "level": 3,
+    "draft": False,
+    "notes": None,
+}
+
+EXPECTED = [
+    (FIELD, "context", LESSON["context"]),
+    (ITEM, "vocabulary", LESSON["vocabulary"][0]),
+    (ITEM, "vocabulary", LESSON["vocabulary"][1]),
+    *[(ITEM, "scores", score) for score in LESSON["scores"]],
+    (FIELD, "level", 3),
+    (FIELD, "draft", False),
+    (FIELD, "notes", None),
+]
+
+
+def _parse(chunks):
+    parser = JsonStreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_events_do_not_depend_on_chunk_boundaries(size):
+    """Any split of the text yields the same events, in document order"""
+    text = json.dumps(LESSON, ensure_ascii=False, indent=1)
+    parser, events = _parse(text[i:i + size] for i in range(0, len(text), size))
+
+    assert events == EXPECTED
+    assert parser.done
+
+
+def test_items_are_emitted_as_soon_as_complete():
+    """An array element is available before the rest of the array arrives"""
+    parser = JsonStreamParser()
+
+    assert parser.feed('{"vocabulary": [{"term": "café"}, {"te') == [
+        (ITEM, "vocabulary", {"term": "café"})]
+    assert parser.feed('rm": "té"}') == [(ITEM, "vocabulary", {"term": "té"})]
+    assert parser.feed("]}") == []
+    assert parser.done
+
+
+def test_text_around_the_object_is_ignored():
+    """A code fence before the object and anything after it are skipped"""
+    parser, events = _parse(['```json\n{"level"', ': 2}\n```', '{"level": 5}'])
+
+    assert events == [(FIELD, "level", 2)]
+    assert parser.done
+
+
+def test_incomplete_object_is_not_done():
+    """A stream cut off mid-object leaves the parser unfinished"""
+    parser, events = _parse(['{"vocabulary": [{"term": "café"}, {"term": '])
+
+    assert events == [(ITEM, "vocabulary", {"term": "café"})]
+    assert not parser.done
+
+
+def test_consumed_text_is_discarded():
+    """The buffer holds only the value still being read"""
+    parser = JsonStreamParser()
+    parser.feed('{"items": [')
+    for _ in range(1000):
+        parser.feed('{"term": "café", "translation": "coffee"}, ')
+
+    assert len(parser._buf) < 100
+
+
+def test_invalid_value_raises():
+    """A completed value that is not JSON is reported"""
+    parser = JsonStreamParser()
+
+    with pytest.raises(ValueError):
+        parser.feed('{"level": tru, "draft": false}')
@@ -0,0 +1,102 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import pytest  # noqa: E402
+
+from app.models.tiny_lesson import TinyLessonResponse  # noqa: E402
+from app.services import tiny_lesson  # noqa: E402
+from app.services.micro_batcher import MicroBatcher  # noqa: E402
+from app.services.retry_policy import CircuitOpenError  # noqa: E402
+from app.services.schema_registry import MERGED_TINY_LESSON  # noqa: E402
+
+LESSON = {"vocabulary": [{"term": "café", "translation": "coffee"}],
+          "phrases": [{"phrase": "Un café, por favor", "translation": "A coffee, please"}]}
+
+
+class FakeGemini:
+    """Answers merged calls with the given lessons and records every call"""
+
+    def __init__(self, merged_indexes=(), error=None):
+        self.merged_indexes = merged_indexes
+        self.error = error
+        self.merged_endpoints = []
+        self.single_prompts = []
+
+    async def call_gemini_with_functions(self, prompt, function, endpoint=None):
+        self.merged_endpoints.append(endpoint)
+        if self.error:
+            raise self.error
+        return [{"name": MERGED_TINY_LESSON.name, "args": {**LESSON, "requestIndex": index}}
+                for index in self.merged_indexes]
+
+    async def call_gemini_with_function(self, prompt, function, endpoint=None):
+        self.single_prompts.append(prompt)
+        return TinyLessonResponse(**LESSON)
+
+
+def _batcher(monkeypatch, gemini: FakeGemini) -> MicroBatcher:
+    monkeypatch.setattr(tiny_lesson, "gemini_service", gemini)
+    return MicroBatcher(execute=tiny_lesson.tiny_lesson_service._generate_batch, max_size=2, max_wait=1)
+
+
+def _submit_both(batcher: MicroBatcher):
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(("English", "Spanish", False), "ordering coffee"),
+            batcher.submit(("English", "Spanish", False), "buying bread"),
+            return_exceptions=True
+        )
+
+    return asyncio.run(run())
+
+
+def test_failed_merged_call_fails_every_waiter(monkeypatch):
+    """An upstream error is raised to the whole batch instead of retried per lesson"""
+    gemini = FakeGemini(error=RuntimeError("upstream unavailable"))
+    batcher = _batcher(monkeypatch, gemini)
+
+    results = _submit_both(batcher)
+
+    assert [str(result) for result in results] == ["upstream unavailable"] * 2
+    assert gemini.merged_endpoints == ["tiny_lesson"]
+    assert gemini.single_prompts == []
+    assert batcher.failures == 1
+
+
+def test_waiters_of_a_failed_call_get_their_own_error(monkeypatch):
+    """Each waiter raises a copy of the batch's error with its type and attributes"""
+    gemini = FakeGemini(error=CircuitOpenError("text", 3.0))
+    batcher = _batcher(monkeypatch, gemini)
+
+    first, second = _submit_both(batcher)
+
+    assert first is not second
+    assert all(isinstance(error, CircuitOpenError) for error in (first, second))
+    assert (first.bulkhead, first.retry_after, str(first)) == (
+        second.bulkhead, second.retry_after, str(second)) == ("text", 3.0, "Upstream text circuit is open")
+
+
+def test_lessons_missing_from_merged_response_are_generated_alone(monkeypatch):
+    """Only the purposes the merged response left out get their own call"""
+    gemini = FakeGemini(merged_indexes=[1])
+    batcher = _batcher(monkeypatch, gemini)
+
+    results = _submit_both(batcher)
+
+    assert [lesson for lesson, fallback in results] == [TinyLessonResponse(**LESSON)] * 2
+    assert len(gemini.single_prompts) == 1
+    assert "ordering coffee" in gemini.single_prompts[0]
+
+
+@pytest.mark.parametrize("merged_indexes", [[0, 1], [1, 0, 0]])
+def test_merged_response_answers_every_purpose(monkeypatch, merged_indexes):
+    """A complete merged response costs one call, whatever order it comes in"""
+    gemini = FakeGemini(merged_indexes=merged_indexes)
+
+    results = _submit_both(_batcher(monkeypatch, gemini))
+
+    assert all(not isinstance(result, Exception) for result in results)
+    assert gemini.merged_endpoints == ["tiny_lesson"]
+    assert gemini.single_prompts == []
@@ -0,0 +1,123 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import grammar  # noqa: E402
+from app.services.cache import ResponseCache  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.hedging import Hedger  # noqa: E402
+from app.services.model_router import Generation, current_generation, mark_fallback  # noqa: E402
+
+GRAMMAR_ARGS = {"relevantGrammar": [{
+    "topic": "Polite requests",
+    "description": "Use the conditional to ask politely",
+    "examples": [{"sentence": "¿Podría darme un café?", "explanation": "Conditional of poder"}]
+}]}
+
+
+class FakeClient:
+    """Answers every call with a grammar lesson and records the models called"""
+
+    def __init__(self):
+        self.models_called = []
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content=self.generate_content))
+
+    async def generate_content(self, model, contents, config):
+        self.models_called.append(model)
+        return types.GenerateContentResponse(candidates=[types.Candidate(
+            content=types.Content(role="model", parts=[types.Part(
+                function_call=types.FunctionCall(name="generate_grammar_lesson", args=GRAMMAR_ARGS)
+            )])
+        )])
+
+
+def _setup(monkeypatch) -> FakeClient:
+    client = FakeClient()
+    monkeypatch.setattr(gemini_service, "client", client)
+    monkeypatch.setattr(gemini_service, "use_async_client", True)
+    monkeypatch.setattr(gemini_service, "hedgers", {})
+    monkeypatch.setattr(grammar, "response_cache", ResponseCache(
+        ttl=60, stale_ttl=60, max_memory_bytes=1024 * 1024))
+    monkeypatch.setattr(settings, "PURPOSE_MATCH_ENABLED", False)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    return client
+
+
+def _post(*headers):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                await client.post("/grammar", headers=request_headers, json={
+                    "sourceLanguage": "English", "targetLanguage": "Spanish", "purpose": "ordering coffee"})
+                for request_headers in headers
+            ]
+
+    return asyncio.run(run())
+
+
+def test_fast_hinted_answer_is_not_cached(monkeypatch):
+    """A lesson generated by the fast model is served to its requester only"""
+    client = _setup(monkeypatch)
+
+    responses = _post({"X-Prefer-Fast": "true"}, {}, {})
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert client.models_called == [gemini_service.router.fast, gemini_service.model]
+    assert grammar.response_cache.fallback_skips == 1
+    assert grammar.response_cache.hits == 1
+
+
+def test_primary_answer_is_cached(monkeypatch):
+    """A lesson generated by the primary model is reused, even by fast-hinted requests"""
+    client = _setup(monkeypatch)
+
+    responses = _post({}, {"X-Prefer-Fast": "true"})
+
+    assert [response.status_code for response in responses] == [200, 200]
+    assert client.models_called == [gemini_service.model]
+    assert grammar.response_cache.fallback_skips == 0
+
+
+def _hedged_call(monkeypatch, hedge_wins: bool):
+    """Run a hedged call whose hedge marks a fallback; return the result and the marker"""
+    hedger = Hedger(percentile=0.5, budget_ratio=0, max_tokens=10, min_samples=1)
+    hedger.latencies.add(0.01)
+    monkeypatch.setattr(gemini_service, "hedgers", {"grammar": hedger})
+    monkeypatch.setattr(gemini_service, "hedge_model", "hedge-model")
+
+    async def fake_generate_content(model, contents, config, bulkhead="text", endpoint=None):
+        if model == "hedge-model":
+            mark_fallback()
+            await asyncio.sleep(0 if hedge_wins else 5)
+            return "hedge"
+        await asyncio.sleep(5 if hedge_wins else 0.05)
+        return "primary"
+
+    monkeypatch.setattr(gemini_service, "_generate_content", fake_generate_content)
+
+    async def run():
+        generation = Generation()
+        current_generation.set(generation)
+        response = await gemini_service._call_upstream(
+            model=gemini_service.model, contents="", config=None, endpoint="grammar")
+        return response, generation.fallback
+
+    return asyncio.run(run())
+
+
+def test_losing_hedge_does_not_mark_a_fallback(monkeypatch):
+    """A primary answer stays shareable when the cancelled hedge used the fallback model"""
+    assert _hedged_call(monkeypatch, hedge_wins=False) == ("primary", False)
+
+
+def test_winning_hedge_marks_a_fallback(monkeypatch):
+    """An answer from the hedge model is not shared"""
+    assert _hedged_call(monkeypatch, hedge_wins=True) == ("hedge", True)
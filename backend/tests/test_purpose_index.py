@@ -0,0 +1,68 @@
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import pytest  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.services.purpose_index import PurposeIndex, purpose_scope  # noqa: E402
+
+SCOPE = purpose_scope("tiny_lesson", "English", "Spanish")
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("buying a car", "buying a cat"),
+    ("ordering coffee", "ordering toffee"),
+    ("renting a bike at the beach", "renting a bite at the beach"),
+    ("booking a table for dinner at a restaurant", "booking a cable for dinner at a restaurant"),
+])
+def test_purposes_a_letter_apart_do_not_match(stored, query):
+    """Different things with similar spellings get their own lessons"""
+    index = PurposeIndex(threshold=settings.PURPOSE_MATCH_THRESHOLD)
+    index.add(SCOPE, stored)
+
+    assert index.resolve(SCOPE, query) == query
+    assert index.similar_matches == 0
+    assert len(index) == 2
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("ordering coffee at the airport", "At the airport, ordering coffee"),
+    ("checking in at a hotel", "hotel check-in"),
+    ("buying train tickets", "Buying a train ticket?"),
+])
+def test_rearranged_purposes_match(stored, query):
+    """Purposes with the same content words reuse the stored lesson"""
+    index = PurposeIndex(threshold=settings.PURPOSE_MATCH_THRESHOLD)
+    index.add(SCOPE, stored)
+
+    assert index.resolve(SCOPE, query) == stored
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("complaining about a noisy hotel room at night", "complaining about a noisy hotel room"),
+    ("cancelling a hotel reservation for next weekend", "cancelling my hotel reservation for the weekend"),
+])
+def test_purposes_with_an_extra_word_match(stored, query):
+    """Purposes similar enough despite a different content word reuse the stored lesson"""
+    index = PurposeIndex(threshold=settings.PURPOSE_MATCH_THRESHOLD)
+    index.add(SCOPE, stored)
+
+    assert index.resolve(SCOPE, query) == stored
+    assert index.rejected_matches == 0
+
+
+def test_added_words_are_matched_at_lower_thresholds():
+    """Only the threshold decides whether an added word still matches"""
+    index = PurposeIndex(threshold=0.7)
+    index.add(SCOPE, "order coffee at a cafe")
+
+    assert index.resolve(SCOPE, "ordering coffee") == "order coffee at a cafe"
+
+
+def test_purposes_are_matched_within_their_scope():
+    """The same purpose for another language pair is not reused"""
+    index = PurposeIndex(threshold=settings.PURPOSE_MATCH_THRESHOLD)
+    index.add(SCOPE, "ordering coffee")
+
+    assert index.lookup(purpose_scope("tiny_lesson", "English", "French"), "ordering coffee") is None
@@ -0,0 +1,167 @@
+import asyncio
+import os
+import threading
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx  # noqa: E402
+
+from app import dependencies  # noqa: E402
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.tiny_lesson import TinyLessonResponse  # noqa: E402
+from app.services import rate_limiter  # noqa: E402
+from app.services.rate_limiter import MemoryRateLimitBackend, RateLimiter, SQLiteRateLimitBackend  # noqa: E402
+from app.services.tiny_lesson import tiny_lesson_service  # noqa: E402
+
+
+class FakeClock:
+    """Stands in for both clocks the backends read, advanced by hand"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _install_clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=clock, time=clock))
+    return clock
+
+
+def test_bucket_refills_at_the_configured_rate(monkeypatch):
+    """A drained bucket allows one more request per 60 / per_minute seconds"""
+    clock = _install_clock(monkeypatch)
+    limiter = RateLimiter(MemoryRateLimitBackend(100), per_minute=60, burst=3)
+
+    assert [limiter.check("a")[0] for _ in range(3)] == [True, True, True]
+    allowed, retry_after = limiter.check("a")
+    assert not allowed
+    assert retry_after == 1.0
+
+    clock.now += 0.5
+    assert limiter.check("a") == (False, 0.5)
+    clock.now += 0.5
+    assert limiter.check("a") == (True, 0.0)
+
+    # Refill stops at the burst size
+    clock.now += 3600
+    assert [limiter.check("a")[0] for _ in range(4)] == [True, True, True, False]
+
+
+def test_cost_above_capacity_takes_the_whole_bucket(monkeypatch):
+    """A request costing more than the burst is allowed from a full bucket only"""
+    clock = _install_clock(monkeypatch)
+    limiter = RateLimiter(MemoryRateLimitBackend(100), per_minute=60, burst=3)
+
+    assert limiter.check("a", cost=10) == (True, 0.0)
+    assert limiter.check("a") == (False, 1.0)
+    clock.now += 3
+    assert limiter.check("a", cost=10) == (True, 0.0)
+
+
+def test_least_recently_used_buckets_are_evicted(monkeypatch):
+    """Past max_clients the bucket checked longest ago is dropped, then idle ones"""
+    clock = _install_clock(monkeypatch)
+    backend = MemoryRateLimitBackend(max_clients=2)
+    limiter = RateLimiter(backend, per_minute=60, burst=3)
+
+    for client_id in ("a", "b", "a", "c"):
+        limiter.check(client_id)
+
+    assert list(backend._buckets) == ["a", "c"]
+    assert backend.evicted == 1
+
+    # Buckets idle long enough to be full again are dropped as well
+    clock.now += 3
+    limiter.check("d")
+    assert list(backend._buckets) == ["d"]
+    assert backend.evicted == 3
+
+
+def test_sqlite_buckets_are_shared_by_workers(monkeypatch, tmp_path):
+    """Backends on one file upsert into the same bucket and refill it the same way"""
+    clock = _install_clock(monkeypatch)
+    path = str(tmp_path / "rate_limits.db")
+    first = RateLimiter(SQLiteRateLimitBackend(path), per_minute=60, burst=2)
+    second = RateLimiter(SQLiteRateLimitBackend(path), per_minute=60, burst=2)
+
+    assert first.check("a") == (True, 0.0)
+    assert second.check("a") == (True, 0.0)
+    assert first.check("a") == (False, 1.0)
+    # A rejected check leaves the stored bucket as it was
+    assert second.check("a") == (False, 1.0)
+
+    clock.now += 1
+    assert second.check("a") == (True, 0.0)
+    assert first.check("a")[0] is False
+    assert first.backend.clients() == 1
+
+
+def test_sqlite_sweep_deletes_idle_buckets(monkeypatch, tmp_path):
+    """Buckets idle long enough to have refilled are deleted by the sweep"""
+    clock = _install_clock(monkeypatch)
+    backend = SQLiteRateLimitBackend(str(tmp_path / "rate_limits.db"), sweep_interval=10)
+    limiter = RateLimiter(backend, per_minute=60, burst=2)
+
+    limiter.check("a")
+    clock.now += 10
+    limiter.check("b")
+
+    assert backend.clients() == 1
+    assert backend.evicted == 1
+
+
+def test_sqlite_checks_run_off_the_event_loop(tmp_path):
+    """check_async hands blocking backends to a worker thread"""
+    limiter = RateLimiter(SQLiteRateLimitBackend(str(tmp_path / "rate_limits.db")), per_minute=60)
+    threads = []
+    check = limiter.check
+
+    def recording_check(client_id, cost=1):
+        threads.append(threading.current_thread())
+        return check(client_id, cost)
+
+    limiter.check = recording_check
+
+    assert asyncio.run(limiter.check_async("a")) == (True, 0.0)
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_batch_requests_are_charged_per_item(monkeypatch):
+    """A batch takes one token per item, so it can exhaust the client's bucket"""
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(dependencies, "rate_limiter", RateLimiter(
+        MemoryRateLimitBackend(100), per_minute=3))
+
+    async def fake_generate(source_language, target_language, purpose):
+        return TinyLessonResponse(vocabulary=[], phrases=[])
+
+    monkeypatch.setattr(tiny_lesson_service, "generate_tiny_lesson", fake_generate)
+    item = {"sourceLanguage": "English", "targetLanguage": "Spanish", "purpose": "ordering coffee"}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            batch = await client.post("/terms/batch", json={"items": [item] * 3})
+            single = await client.post("/terms/batch", json={"items": [item]})
+            return batch, single
+
+    batch, single = asyncio.run(run())
+
+    assert batch.status_code == 200
+    assert single.status_code == 429
+    assert int(single.headers["Retry-After"]) >= 1
+
+
+def test_sqlite_client_count_does_not_query_the_file(tmp_path):
+    """Stats report the bucket count from the last sweep without touching the database"""
+    backend = SQLiteRateLimitBackend(str(tmp_path / "rate_limits.db"))
+    limiter = RateLimiter(backend, per_minute=60)
+    limiter.check("a")
+    backend._conn.close()
+
+    assert limiter.stats()["clients"] == 1
@@ -0,0 +1,250 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.services import retry_policy  # noqa: E402
+from app.services.concurrency_limiter import UpstreamOverloadedError  # noqa: E402
+from app.services.retry_policy import (  # noqa: E402
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryBudget,
+    RetryPolicy,
+    is_retryable_error,
+)
+
+
+class UpstreamError(Exception):
+    """An upstream error with a status code, like the API client raises"""
+
+    def __init__(self, code: int):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class FlakyOperation:
+    """Fails with the given errors in turn, then succeeds"""
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.attempts = 0
+
+    async def __call__(self):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+def _policy(max_attempts=3, deadline=60.0, budget=None) -> RetryPolicy:
+    return RetryPolicy(max_attempts=max_attempts, base_delay=0.001, max_delay=0.001,
+                       deadline=deadline, budget=budget or RetryBudget(ratio=0.1, max_tokens=10))
+
+
+@pytest.mark.parametrize("error, retryable", [
+    (asyncio.TimeoutError(), True),
+    (httpx.ConnectError("refused"), True),
+    (UpstreamError(503), True),
+    (UpstreamError(429), True),
+    (UpstreamError(400), False),
+    (ValueError("no function call"), False),
+    (UpstreamOverloadedError("text", 1.0), False),
+])
+def test_only_transient_errors_are_retryable(error, retryable):
+    """Timeouts, transport errors, 429 and 5xx are retried, other errors are not"""
+    assert is_retryable_error(error) is retryable
+
+
+def test_budget_caps_retries_at_a_share_of_calls():
+    """Each call deposits ratio tokens, each retry spends one, up to max_tokens saved"""
+    budget = RetryBudget(ratio=0.5, max_tokens=2)
+
+    assert [budget.try_retry() for _ in range(3)] == [True, True, False]
+    budget.record_call()
+    assert not budget.try_retry()
+    budget.record_call()
+    assert budget.try_retry()
+
+    for _ in range(100):
+        budget.record_call()
+    assert budget.tokens == 2
+    assert (budget.calls, budget.retries, budget.denied) == (102, 3, 2)
+
+
+def test_retry_delays_stay_within_the_jitter_cap(monkeypatch):
+    """Delays are drawn between zero and a cap doubling from base to max"""
+    policy = RetryPolicy(max_attempts=5, base_delay=0.5, max_delay=8.0, deadline=60,
+                         budget=RetryBudget(0.1, 10))
+    bounds = []
+    monkeypatch.setattr(retry_policy, "random", SimpleNamespace(
+        uniform=lambda low, high: bounds.append((low, high)) or high))
+
+    assert [policy._delay(retry) for retry in range(6)] == [0.5, 1.0, 2.0, 4.0, 8.0, 8.0]
+    assert all(low == 0 for low, _ in bounds)
+
+    monkeypatch.undo()
+    for retry in range(6):
+        assert 0 <= policy._delay(retry) <= min(8.0, 0.5 * 2 ** retry)
+
+
+def test_transient_failures_are_retried_until_success():
+    """A call succeeds on a later attempt, spending budget for each retry"""
+    policy = _policy()
+    operation = FlakyOperation(UpstreamError(503), asyncio.TimeoutError())
+
+    assert asyncio.run(policy.call(operation)) == "ok"
+    assert operation.attempts == 3
+    assert policy.budget.retries == 2
+
+
+def test_permanent_failures_are_not_retried():
+    """A request error fails on its first attempt"""
+    policy = _policy()
+    operation = FlakyOperation(UpstreamError(400))
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(policy.call(operation))
+    assert operation.attempts == 1
+
+
+def test_empty_budget_stops_retries():
+    """With no tokens left the first transient error is raised"""
+    policy = _policy(budget=RetryBudget(ratio=0, max_tokens=0))
+    operation = FlakyOperation(UpstreamError(503))
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(policy.call(operation))
+    assert operation.attempts == 1
+    assert policy.budget.denied == 1
+
+
+def test_deadline_cuts_off_slow_attempts():
+    """An attempt still running at the deadline is abandoned and not retried"""
+    policy = _policy(deadline=0.05)
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        with pytest.raises(asyncio.TimeoutError):
+            await policy.call(slow)
+        return loop.time() - start
+
+    assert asyncio.run(run()) < 1
+    assert policy.budget.retries == 0
+
+
+def _breaker(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(retry_policy, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return CircuitBreaker("text", failure_threshold=2, reset_timeout=10), clock
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(breaker.before_call())
+
+
+def test_breaker_opens_after_consecutive_failures(monkeypatch):
+    """Threshold failures in a row open the circuit, a success in between resets the count"""
+    breaker, clock = _breaker(monkeypatch)
+
+    breaker.record_failure(breaker.before_call())
+    breaker.record_success(breaker.before_call())
+    breaker.record_failure(breaker.before_call())
+    assert breaker.state == "closed"
+    breaker.record_failure(breaker.before_call())
+    assert breaker.state == "open"
+
+    clock.now += 4
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_after == 6
+    assert breaker.rejected == 1
+
+
+def test_breaker_lets_one_probe_through_when_half_open(monkeypatch):
+    """After the reset timeout one call probes; others are rejected until it finishes"""
+    breaker, clock = _breaker(monkeypatch)
+    _open(breaker)
+
+    clock.now += 10
+    probe = breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success(probe)
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_failed_probe_opens_the_circuit_again(monkeypatch):
+    """A probe that fails opens the circuit for another reset timeout"""
+    breaker, clock = _breaker(monkeypatch)
+    _open(breaker)
+
+    clock.now += 10
+    breaker.record_failure(breaker.before_call())
+    assert breaker.state == "open"
+    assert breaker.opened == 2
+
+    clock.now += 9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 1
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_ignored_probe_frees_the_half_open_slot(monkeypatch):
+    """A probe ending in an error unrelated to upstream health lets another probe through"""
+    breaker, clock = _breaker(monkeypatch)
+    _open(breaker)
+
+    clock.now += 10
+    breaker.record_ignored(breaker.before_call())
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_calls_started_before_the_circuit_opened_change_nothing(monkeypatch):
+    """A slow call that was running when the circuit opened neither closes it nor frees the probe"""
+    breaker, clock = _breaker(monkeypatch)
+    slow = [breaker.before_call() for _ in range(3)]
+    _open(breaker)
+
+    breaker.record_success(slow[0])
+    assert breaker.state == "open"
+
+    clock.now += 10
+    probe = breaker.before_call()
+    breaker.record_ignored(slow[1])
+    breaker.record_failure(slow[2])
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success(probe)
+    assert breaker.state == "closed"
+    assert breaker.opened == 1
+
+
+def test_policy_fails_fast_while_the_circuit_is_open(monkeypatch):
+    """Calls through an open circuit raise without reaching the upstream"""
+    breaker, clock = _breaker(monkeypatch)
+    policy = _policy(max_attempts=1)
+    operation = FlakyOperation(UpstreamError(503), UpstreamError(503))
+
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            asyncio.run(policy.call(operation, breaker))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(policy.call(operation, breaker))
+    assert operation.attempts == 2
@@ -0,0 +1,147 @@
+import asyncio
+import os
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import pytest  # noqa: E402
+
+from app.services.single_flight import SingleFlight  # noqa: E402
+
+
+class SlowCall:
+    """Returns its call count once released, recording each call"""
+
+    def __init__(self, error: Exception = None):
+        self.error = error
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.calls
+
+
+def test_concurrent_calls_share_one_upstream_call():
+    """Callers arriving while a call is in flight get its result"""
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def run():
+        call.release = asyncio.Event()
+        waiters = [asyncio.create_task(flight.do("key", call)) for _ in range(5)]
+        await asyncio.sleep(0)
+        call.release.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(run()) == [1] * 5
+    assert call.calls == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "inFlight": 0}
+
+
+def test_finished_calls_are_not_reused():
+    """A call after the shared one completed starts a new upstream call"""
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def run():
+        call.release = asyncio.Event()
+        call.release.set()
+        return [await flight.do("key", call), await flight.do("key", call)]
+
+    assert asyncio.run(run()) == [1, 2]
+
+
+def test_cancelled_waiter_leaves_the_shared_call_running():
+    """A disconnecting client cancels only its own wait"""
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def run():
+        call.release = asyncio.Event()
+        first = asyncio.create_task(flight.do("key", call))
+        second = asyncio.create_task(flight.do("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        call.release.set()
+        return first, await second
+
+    first, result = asyncio.run(run())
+
+    assert first.cancelled()
+    assert result == 1
+    assert call.calls == 1
+
+
+def test_call_survives_every_waiter_cancelling():
+    """The shared call completes even with no waiter left, for the next caller to miss"""
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def run():
+        call.release = asyncio.Event()
+        waiter = asyncio.create_task(flight.do("key", call))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        task = flight._calls["key"]
+        call.release.set()
+        return await task
+
+    assert asyncio.run(run()) == 1
+    assert flight.stats()["inFlight"] == 0
+
+
+def test_errors_reach_every_waiter():
+    """A failed shared call raises its error to all callers and is then forgotten"""
+    flight = SingleFlight()
+    call = SlowCall(error=RuntimeError("upstream failed"))
+
+    async def run():
+        call.release = asyncio.Event()
+        waiters = [asyncio.create_task(flight.do("key", call)) for _ in range(3)]
+        await asyncio.sleep(0)
+        call.release.set()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert [str(result) for result in results] == ["upstream failed"] * 3
+    assert call.calls == 1
+    assert flight.stats()["inFlight"] == 0
+
+
+def test_keys_are_independent():
+    """Calls for different keys are not coalesced"""
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def run():
+        call.release = asyncio.Event()
+        call.release.set()
+        return await asyncio.gather(flight.do("a", call), flight.do("b", call))
+
+    assert sorted(asyncio.run(run())) == [1, 2]
+    assert call.calls == 2
+
+
+@pytest.mark.parametrize("waiters", [1, 3])
+def test_cancelling_the_shared_task_cancels_waiters(waiters):
+    """Shutdown cancelling the upstream call ends every wait"""
+    flight = SingleFlight()
+    call = SlowCall()
+
+    async def run():
+        call.release = asyncio.Event()
+        tasks = [asyncio.create_task(flight.do("key", call)) for _ in range(waiters)]
+        await asyncio.sleep(0)
+        flight._calls["key"].cancel()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert flight.stats()["inFlight"] == 0
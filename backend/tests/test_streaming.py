@@ -0,0 +1,30 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.schema_registry import TINY_LESSON  # noqa: E402
+from app.utils.json_stream import ITEM  # noqa: E402
+
+
+def test_unstreamed_fallback_keeps_the_endpoint(monkeypatch):
+    """Clients without an async API still route and hedge the call by endpoint"""
+    calls = []
+
+    async def fake_call_upstream(**kwargs):
+        calls.append(kwargs)
+        return SimpleNamespace(text='{"vocabulary": [{"term": "café"}], "phrases": []}')
+
+    monkeypatch.setattr(gemini_service, "use_async_client", False)
+    monkeypatch.setattr(gemini_service, "_call_upstream", fake_call_upstream)
+
+    async def run():
+        return [event async for event in gemini_service.stream_function_args(
+            "prompt", TINY_LESSON, endpoint="tiny_lesson")]
+
+    events = asyncio.run(run())
+
+    assert events == [(ITEM, "vocabulary", {"term": "café"})]
+    assert [call["endpoint"] for call in calls] == ["tiny_lesson"]
@@ -0,0 +1,212 @@
+import asyncio
+import base64
+import os
+import tracemalloc
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import httpx  # noqa: E402
+from google.genai import types  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.word_cam import DetectedObject, DetectObjectsResponse  # noqa: E402
+from app.services import word_cam  # noqa: E402
+from app.services.gemini_service import gemini_service  # noqa: E402
+from app.services.image_cache import ImageResultCache  # noqa: E402
+from app.utils.image_utils import base64_decoded_size  # noqa: E402
+
+IMAGE_SIZE = 4 * 1024 * 1024
+
+
+def _descriptor_response() -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(candidates=[types.Candidate(
+        content=types.Content(role="model", parts=[types.Part(
+            function_call=types.FunctionCall(
+                name="generate_object_descriptors",
+                args={"descriptors": [{"descriptor": "blanca",
+                                       "exampleSentence": "La taza es blanca."}]}
+            )
+        )])
+    )])
+
+
+def test_multipart_upload_peak_memory(monkeypatch):
+    """A multipart upload is held once; peak memory stays near 2x the image"""
+    image = b"\xff\xd8\xff\xe0" + os.urandom(IMAGE_SIZE - 4)
+    sent = []
+
+    async def fake_generate_content(model, contents, config, bulkhead="text", endpoint=None):
+        sent.append(contents[1].inline_data.data)
+        return _descriptor_response()
+
+    monkeypatch.setattr(settings, "IMAGE_CACHE_ENABLED", False)
+    monkeypatch.setattr(gemini_service, "_generate_content", fake_generate_content)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            def build(image_bytes):
+                return client.build_request(
+                    "POST",
+                    "/object-descriptors/upload",
+                    data={"sourceLanguage": "English", "targetLanguage": "Spanish", "object": "cup"},
+                    files={"image": ("cup.jpg", image_bytes, "image/jpeg")}
+                )
+
+            # Warm up lazy imports (e.g. Pillow plugins) outside the trace
+            await client.send(build(image[:1024]))
+            sent.clear()
+            request = build(image)
+            # Build the body before tracing so only server-side copies count
+            request.read()
+            tracemalloc.start()
+            try:
+                response = await client.send(request)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            return response, peak
+
+    response, peak = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert response.json()["descriptors"][0]["descriptor"] == "blanca"
+    assert sent == [image]
+    assert peak < 2.2 * IMAGE_SIZE
+
+
+def test_inline_image_decoded_once(monkeypatch):
+    """Inline base64 images reach the upstream call as decoded bytes"""
+    image = b"\x89PNG\r\n\x1a\n" + os.urandom(1024)
+    sent = []
+
+    async def fake_generate_content(model, contents, config, bulkhead="text", endpoint=None):
+        sent.append(contents[1].inline_data.data)
+        return _descriptor_response()
+
+    monkeypatch.setattr(settings, "IMAGE_CACHE_ENABLED", False)
+    monkeypatch.setattr(gemini_service, "_generate_content", fake_generate_content)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/object-descriptors", json={
+                "sourceLanguage": "English",
+                "targetLanguage": "Spanish",
+                "object": "cup",
+                "image": {"inlineData": {
+                    "data": "data:image/png;base64," + base64.b64encode(image).decode("ascii"),
+                    "mimeType": "image/png"
+                }}
+            })
+
+    response = asyncio.run(run())
+
+    assert response.status_code == 200
+    assert sent == [image]
+
+
+def test_wrapped_base64_is_admitted(monkeypatch):
+    """Base64 wrapped onto lines is measured and sniffed without its line breaks"""
+    image = b"\x89PNG\r\n\x1a\n" + os.urandom(1820 - 8)
+    wrapped = base64.encodebytes(image).decode("ascii")
+    sent = []
+
+    async def fake_generate_content(model, contents, config, bulkhead="text", endpoint=None):
+        sent.append(contents[1].inline_data.data)
+        return _descriptor_response()
+
+    monkeypatch.setattr(settings, "IMAGE_CACHE_ENABLED", False)
+    monkeypatch.setattr(gemini_service, "_generate_content", fake_generate_content)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/object-descriptors", json={
+                "sourceLanguage": "English",
+                "targetLanguage": "Spanish",
+                "object": "cup",
+                "image": {"inlineData": {"data": wrapped, "mimeType": "image/png"}}
+            })
+
+    response = asyncio.run(run())
+
+    assert base64_decoded_size(wrapped) == base64_decoded_size("data:image/png;base64,\r\n" + wrapped) == 1820
+    assert response.status_code == 200
+    assert sent == [image]
+
+
+def _detect_body(width: int, height: int) -> dict:
+    return {
+        "sourceLanguage": "English",
+        "targetLanguage": "Spanish",
+        "image": {"inlineData": {
+            "data": base64.b64encode(b"\x89PNG\r\n\x1a\n" + os.urandom(64)).decode("ascii"),
+            "mimeType": "image/png"
+        }},
+        "imageDimensions": {"width": width, "height": height}
+    }
+
+
+def test_non_positive_dimensions_rejected(monkeypatch):
+    """Zero or negative image dimensions fail validation before any upstream call"""
+    calls = []
+
+    async def fake_generate_content(model, contents, config, bulkhead="text", endpoint=None):
+        calls.append(endpoint)
+        raise AssertionError("Upstream should not be called")
+
+    monkeypatch.setattr(gemini_service, "_generate_content", fake_generate_content)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [
+                await client.post("/detect-objects", json=_detect_body(0, 0)),
+                await client.post("/detect-objects", json=_detect_body(-800, 600)),
+                await client.post(
+                    "/detect-objects/upload",
+                    data={"sourceLanguage": "English", "targetLanguage": "Spanish",
+                          "width": "0", "height": "600"},
+                    files={"image": ("photo.png", b"\x89PNG\r\n\x1a\n", "image/png")}
+                ),
+            ]
+
+    responses = asyncio.run(run())
+
+    assert [response.status_code for response in responses] == [422, 422, 422]
+    assert calls == []
+
+
+def test_cached_entry_with_zero_dimensions_is_a_miss(monkeypatch):
+    """An entry cached for unusable dimensions is regenerated rather than rescaled"""
+    cache = ImageResultCache(ttl=60, max_bytes=1024 * 1024, perceptual=False)
+    monkeypatch.setattr(word_cam, "image_result_cache", cache)
+    monkeypatch.setattr(settings, "IMAGE_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "DESCRIPTOR_PREFETCH_ENABLED", False)
+    image = b"\x89PNG\r\n\x1a\n" + os.urandom(64)
+    calls = []
+
+    async def fake_detect(self, *args):
+        calls.append(args)
+        return DetectObjectsResponse(objects=[DetectedObject(
+            name="taza", translation="cup", coordinates=[10, 20, 30, 40])])
+
+    monkeypatch.setattr(word_cam.WordCamService, "_detect_objects", fake_detect)
+
+    async def run():
+        lookup = await cache.lookup(
+            "detect_objects", {"sourceLanguage": "English", "targetLanguage": "Spanish"},
+            image, gemini_service.vision_model, word_cam.PROMPT_VERSION, dimensions=(800, 600))
+        # Simulate an entry stored before dimensions were validated
+        lookup.dimensions = (0, 0)
+        cache.store(lookup, b'{"objects": []}')
+        return await word_cam.word_cam_service.detect_objects(
+            "English", "Spanish", image, "image/png", 800, 600)
+
+    response = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert response.objects[0].coordinates == [10, 20, 30, 40]
+    assert word_cam.WordCamService._rescale_objects(response, (0, 0), (800, 600)) is response
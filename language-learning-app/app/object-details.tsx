@@ -1,12 +1,12 @@
 import ErrorView from "@/components/ErrorView";
 import LoadingIndicator from "@/components/LoadingIndicator";
 import Colors from "@/constants/colors";
-import { getObjectDescriptors } from "@/services/api";
+import { ApiError, getObjectDescriptors } from "@/services/api";
 import { useLanguageStore } from "@/store/languageStore";
 import { ObjectDescriptorsResponse } from "@/types/api";
 import { useLocalSearchParams } from "expo-router";
 import { RefreshCw } from "lucide-react-native";
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import {
   Image,
   ScrollView,
@@ -17,10 +17,11 @@ import {
 } from "react-native";
 
 export default function ObjectDetailsScreen() {
-  const { objectName, imageBase64, mimeType } = useLocalSearchParams<{
+  const { objectName, imageBase64, mimeType, imageId } = useLocalSearchParams<{
     objectName: string;
     imageBase64: string;
     mimeType: string;
+    imageId?: string;
   }>();
   const { sourceLanguage, targetLanguage } = useLanguageStore();
   const [descriptors, setDescriptors] =
@@ -28,6 +29,8 @@ export default function ObjectDetailsScreen() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const decodedImageBase64 = decodeURIComponent(imageBase64 || "");
+  // Set once the server has forgotten the uploaded image
+  const imageIdExpired = useRef(false);
 
   const fetchDescriptors = async () => {
     if (!objectName || !decodedImageBase64 || !mimeType) {
@@ -38,14 +41,28 @@ export default function ObjectDetailsScreen() {
 
     setLoading(true);
     setError(null);
-    try {
-      const data = await getObjectDescriptors(
+    const requestDescriptors = (id?: string) =>
+      getObjectDescriptors(
         sourceLanguage,
         targetLanguage,
         objectName,
         decodedImageBase64,
-        mimeType
+        mimeType,
+        id
       );
+    try {
+      const activeImageId = imageIdExpired.current ? undefined : imageId || undefined;
+      let data: ObjectDescriptorsResponse;
+      try {
+        data = await requestDescriptors(activeImageId);
+      } catch (err) {
+        // Uploaded images expire; send the image inline instead
+        if (!activeImageId || !(err instanceof ApiError) || err.status !== 404) {
+          throw err;
+        }
+        imageIdExpired.current = true;
+        data = await requestDescriptors();
+      }
       setDescriptors(data);
     } catch (err) {
       setError("Failed to load object descriptors. Please try again.");
@@ -1,7 +1,7 @@
 import ErrorView from "@/components/ErrorView";
 import LoadingIndicator from "@/components/LoadingIndicator";
 import Colors from "@/constants/colors";
-import { detectObjects } from "@/services/api";
+import { detectObjects, uploadImage } from "@/services/api";
 import { useLanguageStore } from "@/store/languageStore";
 import { DetectedObject } from "@/types/api";
 import * as FileSystem from "expo-file-system";
@@ -27,6 +27,7 @@ export default function WordCamScreen() {
   const { sourceLanguage, targetLanguage } = useLanguageStore();
   const [imageBase64, setImageBase64] = useState<string | null>(null);
   const [mimeType, setMimeType] = useState<string | null>(null);
+  const [imageId, setImageId] = useState<string | null>(null);
   const [imageDimensions, setImageDimensions] = useState<{
     width: number;
     height: number;
@@ -49,6 +50,9 @@ export default function WordCamScreen() {
     const loadImage = async () => {
       if (!imageUri) return;
 
+      // A new photo needs its own upload
+      setImageId(null);
+      setDetectedObjects([]);
       try {
         const { width, height } = await new Promise<{
           width: number;
@@ -68,7 +72,7 @@ export default function WordCamScreen() {
           reader.onload = () => {
             const base64 = reader.result as string;
             setImageBase64(base64);
-            processImage(base64, { width, height });
+            processImage(base64, { width, height }, null);
           };
           reader.readAsDataURL(blob);
         } else {
@@ -87,7 +91,7 @@ export default function WordCamScreen() {
           const fullBase64 = `data:${myMimeType};base64,${base64}`;
           setMimeType(myMimeType);
           setImageBase64(fullBase64);
-          processImage(fullBase64, { width, height });
+          processImage(fullBase64, { width, height }, null);
         }
       } catch (err) {
         console.error("Error loading image:", err);
@@ -101,20 +105,35 @@ export default function WordCamScreen() {
 
   const processImage = async (
     base64Image: string,
-    dimensionsImage: { width: number; height: number }
+    dimensionsImage: { width: number; height: number },
+    currentImageId: string | null
   ) => {
     setLoading(true);
     setError(null);
     try {
+      // Upload once so object details can refer to the image by ID
+      let uploadedImageId = currentImageId;
+      if (!uploadedImageId) {
+        try {
+          const upload = await uploadImage(base64Image, mimeType || "image/jpeg");
+          uploadedImageId = upload.imageId;
+          setImageId(uploadedImageId);
+        } catch (err) {
+          console.warn("Image upload failed, sending it inline:", err);
+        }
+      }
       const data = await detectObjects(
         sourceLanguage,
         targetLanguage,
         base64Image,
         dimensionsImage,
-        mimeType || "image/jpeg"
+        mimeType || "image/jpeg",
+        uploadedImageId ?? undefined
       );
       setDetectedObjects(data.objects);
     } catch (err) {
+      // The image ID may have expired; upload again on retry
+      setImageId(null);
       setError("Failed to detect objects. Please try again.");
       console.error(err);
     } finally {
@@ -204,6 +223,9 @@ export default function WordCamScreen() {
           objectName: object.name,
           imageBase64: encodeURIComponent(croppedImageBase64),
           mimeType: mimeType || "image/jpeg",
+          // Descriptors are requested for the uploaded photo by ID, which
+          // the server may already have prefetched; the crop is for display
+          imageId: imageId ?? "",
         },
       });
     } catch (error) {
@@ -215,6 +237,7 @@ export default function WordCamScreen() {
           objectName: object.name,
           imageBase64: encodeURIComponent(imageBase64 || ""),
           mimeType: mimeType || "image/jpeg",
+          imageId: imageId ?? "",
         },
       });
     }
@@ -222,7 +245,7 @@ export default function WordCamScreen() {
 
   const retryDetection = () => {
     if (imageBase64 && imageDimensions && mimeType) {
-      processImage(imageBase64, imageDimensions);
+      processImage(imageBase64, imageDimensions, imageId);
     }
   };
 
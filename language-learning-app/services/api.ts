@@ -2,12 +2,24 @@ import {
   ConversationResponse,
   DetectObjectsResponse,
   GrammarResponse,
+  ImageUploadResponse,
   ObjectDescriptorsResponse,
   TinyLessonResponse,
 } from "@/types/api";
 
 const API_URL = " http://0.0.0.0:8000";
 
+// Error for a response with a non-2xx status
+export class ApiError extends Error {
+  status: number;
+
+  constructor(status: number) {
+    super(`API error: ${status}`);
+    this.name = "ApiError";
+    this.status = status;
+  }
+}
+
 // Helper function to make API requests
 async function makeRequest<T>(path: string, messages: any): Promise<T> {
   try {
@@ -20,7 +32,7 @@ async function makeRequest<T>(path: string, messages: any): Promise<T> {
     });
 
     if (!response.ok) {
-      throw new Error(`API error: ${response.status}`);
+      throw new ApiError(response.status);
     }
 
     const data = await response.json();
@@ -74,24 +86,48 @@ export async function getConversation(
   return makeRequest<ConversationResponse>("/conversation", messages);
 }
 
+// Image sent by the ID returned from uploadImage, or inline without one
+function imagePayload(imageBase64: string, mimeType: string, imageId?: string) {
+  if (imageId) {
+    return { imageId: imageId };
+  }
+  return {
+    inlineData: {
+      data: imageBase64,
+      mimeType: mimeType,
+    },
+  };
+}
+
+// Function to upload an image once for later requests
+export async function uploadImage(
+  imageBase64: string,
+  mimeType: string
+): Promise<ImageUploadResponse> {
+  const messages = {
+    inlineData: {
+      data: imageBase64,
+      mimeType: mimeType,
+    },
+  };
+
+  return makeRequest<ImageUploadResponse>("/images", messages);
+}
+
 // Function to get object descriptors from image
 export async function getObjectDescriptors(
   sourceLanguage: string,
   targetLanguage: string,
   objectName: string,
   imageBase64: string,
-  mimeType: string
+  mimeType: string,
+  imageId?: string
 ): Promise<ObjectDescriptorsResponse> {
   const messages = {
     sourceLanguage: sourceLanguage,
     targetLanguage: targetLanguage,
     object: objectName,
-    image: {
-      inlineData: {
-        data: imageBase64,
-        mimeType: mimeType,
-      },
-    },
+    image: imagePayload(imageBase64, mimeType, imageId),
   };
 
   return makeRequest<ObjectDescriptorsResponse>(
@@ -106,17 +142,13 @@ export async function detectObjects(
   targetLanguage: string,
   imageBase64: string,
   dimensions: { width: number; height: number },
-  mimeType: string
+  mimeType: string,
+  imageId?: string
 ): Promise<DetectObjectsResponse> {
     const messages = {
       sourceLanguage: sourceLanguage,
       targetLanguage: targetLanguage,
-      image: {
-        inlineData: {
-          data: imageBase64,
-          mimeType: mimeType,
-        },
-      },
+      image: imagePayload(imageBase64, mimeType, imageId),
       imageDimensions: dimensions,
     };
   return makeRequest<DetectObjectsResponse>("/detect-objects", messages);
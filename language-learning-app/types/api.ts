@@ -61,6 +61,11 @@ export interface DetectObjectsResponse {
   objects: DetectedObject[];
 }
 
+export interface ImageUploadResponse {
+  imageId: string;
+  expiresInSeconds: number;
+}
+
 export interface ApiError {
   error: string;
 }